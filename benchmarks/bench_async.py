@@ -0,0 +1,168 @@
+"""
+Benchmark read throughput during a mixed workload: the previous threadpool request path against the async one.
+
+Readers page through the bids of a lot (GET /bids/) while lot creators create lots (POST /lots/). Each client is an
+asyncio task, as requests on the event loop of the API are.
+
+threadpool: every request runs as a sync endpoint on one shared pool of 40 threads (the default of the web framework),
+            with starting-bid inference inside the write on the writer thread and the request thread waiting for it.
+async:      reads run on the read executor, inference on the inference executor and writes are awaited without
+            holding a thread (database/aio.py).
+
+Inference is a stand-in of --inference-ms of numpy work, so the benchmark runs without trained model artifacts.
+
+Run from the repository root:
+    python -m benchmarks.bench_async --readers 64 --creators 64 --seconds 10 --inference-ms 20
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import datetime as _dt
+import os
+import tempfile
+import time
+
+import numpy as np
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.aio as _aio
+import database.database as _database
+import database.models as _models
+import database.schemas as _schemas
+import database.services as _services
+import database.writer as _writer
+
+
+# Threads of the shared pool sync endpoints run on.
+THREADPOOL_SIZE = 40
+
+LOT = _schemas.LotCreate(auctionID=1, numberOfItems=1, estimatedValue=100, startingBid=0, reserveBid=50, mainCategory='bench')
+
+
+def setup_database(location:str, bids:int) -> None:
+    engine = _sql.create_engine(f"sqlite:///{location}")
+    _database.Base.metadata.create_all(bind=engine)
+    with _orm.Session(engine) as db:
+        db.add(_models.Auction(id=1, relatedCompany='bench', auctionStart=_dt.datetime(2022, 1, 1),
+                               auctionEnd=_dt.datetime(2022, 1, 3), branchCategory='bench'))
+        db.add(_models.Lots(auctionID=1, lotNr=1, numberOfItems=1, estimatedValue=100, startingBid=10, reserveBid=10,
+                            mainCategory='bench', countryCode='NL', VAT=21, suffix='N/A', saleDate=_dt.datetime(1000, 1, 1),
+                            buyerAccountID=99999, currentBid=99999, sold=False))
+        db.add_all([
+            _models.Bids(auctionID=1, lotNr=1, bidNr=idx + 1, isCombination=False, accountID=idx, isCompany=False,
+                         bidPrice=float(idx), biddingDateTime=_dt.datetime(2022, 1, 2), closingDateTime=_dt.datetime(2022, 1, 3))
+            for idx in range(bids)
+            ])
+        db.commit()
+    engine.dispose()
+
+def inference(milliseconds:float) -> int:
+    """
+    Stand-in for the starting-bid inference: numpy work (releasing the GIL like the model does) for the given time.
+    """
+    matrix = np.random.rand(128, 128)
+    deadline = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < deadline:
+        matrix = np.tanh(matrix @ matrix)
+    return 100
+
+def create_lot_with_inference(db:_orm.Session, lot:_schemas.LotCreate, milliseconds:float, commit:bool=True):
+    # The previous create_lot: prediction inside the write transaction.
+    return _services.create_lot(db=db, lot=lot, commit=commit, startingBid=inference(milliseconds))
+
+def read_bids(session_factory) -> list:
+    db = session_factory()
+    try:
+        return _services.get_bids_by_IDs(db=db, auctionID=1, lotNr=1, skip=0, limit=10)
+    finally:
+        db.close()
+
+async def workload(read, create, readers:int, creators:int, seconds:float) -> dict:
+    counts = {'reads': 0, 'lots': 0}
+    deadline = time.perf_counter() + seconds
+
+    async def client(request, key):
+        while time.perf_counter() < deadline:
+            await request()
+            counts[key] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[client(read, 'reads') for _ in range(readers)],
+        *[client(create, 'lots') for _ in range(creators)]
+        )
+    elapsed = time.perf_counter() - start
+    return {'readsPerSecond': counts['reads'] / elapsed, 'lotsPerSecond': counts['lots'] / elapsed}
+
+async def run_threadpool(session_factory, write_queue, readers:int, creators:int, seconds:float, milliseconds:float) -> dict:
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=THREADPOOL_SIZE)
+    loop = asyncio.get_running_loop()
+
+    def create():
+        return write_queue.submit(create_lot_with_inference, lot=LOT, milliseconds=milliseconds, commit=False).result()
+
+    try:
+        return await workload(
+            read=lambda: loop.run_in_executor(pool, read_bids, session_factory),
+            create=lambda: loop.run_in_executor(pool, create),
+            readers=readers, creators=creators, seconds=seconds
+            )
+    finally:
+        pool.shutdown(wait=True)
+
+async def run_async(session_factory, write_queue, readers:int, creators:int, seconds:float, milliseconds:float,
+                    read_workers:int, inference_workers:int) -> dict:
+    runner = _aio.AsyncRunner(read_session_factory=session_factory, write_queue=write_queue, read_workers=read_workers,
+                              inference_workers=inference_workers)
+
+    async def create():
+        startingBid = await runner.infer(inference, milliseconds)
+        return await runner.write(_services.create_lot, lot=LOT, startingBid=startingBid)
+
+    try:
+        return await workload(
+            read=lambda: runner.query(_services.get_bids_by_IDs, auctionID=1, lotNr=1, skip=0, limit=10),
+            create=create,
+            readers=readers, creators=creators, seconds=seconds
+            )
+    finally:
+        runner.shutdown()
+
+def run(path:str, readers:int, creators:int, seconds:float, milliseconds:float, read_workers:int, inference_workers:int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, "bench.db")
+        setup_database(location, bids=1000)
+        engine = _database.create_engine_profile(location, profile='tuned')
+        read_engine = _database.create_engine_profile(location, profile='tuned', readonly=True, pool_size=read_workers)
+        session_factory = _orm.sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+        write_queue = _writer.WriteQueue(session_factory=_orm.sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+            ))
+        try:
+            if path == 'threadpool':
+                return asyncio.run(run_threadpool(session_factory, write_queue, readers, creators, seconds, milliseconds))
+            return asyncio.run(run_async(session_factory, write_queue, readers, creators, seconds, milliseconds,
+                                         read_workers, inference_workers))
+        finally:
+            write_queue.stop()
+            engine.dispose()
+            read_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=64, help="Concurrent clients reading bids.")
+    parser.add_argument("--creators", type=int, default=64, help="Concurrent clients creating lots.")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each run.")
+    parser.add_argument("--inference-ms", type=float, default=20, help="Duration of one starting-bid inference.")
+    parser.add_argument("--read-workers", type=int, default=_aio.READ_WORKERS, help="Read executor threads (and read pool connections).")
+    parser.add_argument("--inference-workers", type=int, default=_aio.INFERENCE_WORKERS, help="Inference executor threads.")
+    args = parser.parse_args()
+
+    for path in ('threadpool', 'async'):
+        result = run(path=path, readers=args.readers, creators=args.creators, seconds=args.seconds, milliseconds=args.inference_ms,
+                     read_workers=args.read_workers, inference_workers=args.inference_workers)
+        print(f"{path:>10} | {result['readsPerSecond']:>8,.0f} reads/s | {result['lotsPerSecond']:>6,.0f} lots/s")
+
+if __name__ == "__main__":
+    main()
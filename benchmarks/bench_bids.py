@@ -0,0 +1,125 @@
+"""
+Benchmark the bid placement path: bids/second of the legacy create_bid against the current one.
+
+Run from the repository root:
+    python -m benchmarks.bench_bids --bids 2000 --workers 4
+"""
+import argparse
+import datetime as _dt
+import multiprocessing
+import os
+import tempfile
+import time
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.models as _models
+import database.schemas as _schemas
+import database.services as _services
+
+
+def legacy_create_bid(db:_orm.Session, bid:_schemas.BidCreate):
+    """
+    The bid path before the atomic allocation: ORDER BY bidNr DESC lookup, auction query, commit and refresh.
+    """
+    queryRes = db.query(_models.Bids).filter(
+        _sql.and_(_models.Bids.auctionID == bid.auctionID, _models.Bids.lotNr == bid.lotNr)
+        ).order_by(_models.Bids.bidNr.desc()).first()
+    bidnumber = queryRes.bidNr + 1 if queryRes else 1
+    relatedAuction = db.query(_models.Auction).filter(_models.Auction.id == bid.auctionID).first()
+    db_bid = _models.Bids(
+        auctionID=bid.auctionID, lotNr=bid.lotNr, bidNr=bidnumber, isCombination=bid.isCombination,
+        accountID=bid.accountID, isCompany=bid.isCompany, bidPrice=bid.bidPrice,
+        biddingDateTime=_dt.datetime.now(), closingDateTime=relatedAuction.auctionEnd
+        )
+    db.add(db_bid)
+    db.commit()
+    db.refresh(db_bid)
+    return db_bid
+
+IMPLEMENTATIONS = {
+    'legacy': legacy_create_bid,
+    'current': _services.create_bid
+    }
+
+def setup_database(location:str) -> None:
+    engine = _sql.create_engine(f"sqlite:///{location}")
+    _database.Base.metadata.create_all(bind=engine)
+    with _orm.Session(engine) as db:
+        db.add(_models.Auction(id=1, relatedCompany='bench', auctionStart=_dt.datetime(2022, 1, 1),
+                               auctionEnd=_dt.datetime(2100, 1, 1), branchCategory='bench'))
+        db.add(_models.Lots(auctionID=1, lotNr=1, numberOfItems=1, estimatedValue=100, startingBid=10, reserveBid=10,
+                            mainCategory='bench', countryCode='NL', VAT=21, suffix='N/A', saleDate=_dt.datetime(1000, 1, 1),
+                            buyerAccountID=99999, currentBid=99999, sold=False))
+        db.commit()
+    engine.dispose()
+
+def place_bids(location:str, implementation:str, count:int) -> tuple:
+    """
+    Place count bids on the same lot and return the number of accepted and failed bids.
+    """
+    engine = _sql.create_engine(f"sqlite:///{location}", connect_args={"check_same_thread": False, "timeout": 30})
+    session = _orm.sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    create_bid = IMPLEMENTATIONS[implementation]
+    accepted, failed = 0, 0
+    with session() as db:
+        for idx in range(count):
+            bid = _schemas.BidCreate(auctionID=1, lotNr=1, isCombination=False, accountID=idx, isCompany=False,
+                                     bidPrice=float(idx), biddingDateTime=_dt.datetime.now())
+            try:
+                create_bid(db=db, bid=bid)
+                accepted += 1
+            except _sql.exc.SQLAlchemyError:
+                db.rollback()
+                failed += 1
+    engine.dispose()
+    return accepted, failed
+
+def _place_bids(args):
+    return place_bids(*args)
+
+def run(implementation:str, bids:int, workers:int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, "bench.db")
+        setup_database(location)
+
+        start = time.perf_counter()
+        if workers == 1:
+            results = [place_bids(location, implementation, bids)]
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                results = pool.map(_place_bids, [(location, implementation, bids // workers)] * workers)
+        seconds = time.perf_counter() - start
+
+        engine = _sql.create_engine(f"sqlite:///{location}")
+        with engine.connect() as conn:
+            stored, distinct = conn.execute(_sql.text("SELECT COUNT(*), COUNT(DISTINCT bidNr) FROM bids")).one()
+        engine.dispose()
+
+    accepted = sum(result[0] for result in results)
+    return {
+        'implementation': implementation,
+        'workers': workers,
+        'accepted': accepted,
+        'failed': sum(result[1] for result in results),
+        'stored': stored,
+        'duplicateBidNrs': stored - distinct,
+        'bidsPerSecond': accepted / seconds
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bids", type=int, default=2000, help="Total number of bids per run.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent worker processes for the concurrent run.")
+    args = parser.parse_args()
+
+    for workers in sorted({1, args.workers}):
+        for implementation in IMPLEMENTATIONS:
+            result = run(implementation=implementation, bids=args.bids, workers=workers)
+            print(f"{result['implementation']:>8} | workers {result['workers']:>2} | {result['bidsPerSecond']:>8,.0f} bids/s | "
+                  f"accepted {result['accepted']:>6} | failed {result['failed']:>5} | duplicate bidNrs {result['duplicateBidNrs']}")
+
+if __name__ == "__main__":
+    main()
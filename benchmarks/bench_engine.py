@@ -0,0 +1,104 @@
+"""
+Benchmark read and write throughput of the tuned engine profile against the previous defaults.
+
+The previous defaults are a plain create_engine("sqlite:///...") for writes and a new sqlite3 connection per query
+for reads (as Database.execute_query did). The tuned profile uses WAL, synchronous=NORMAL, mmap and a separate pool
+of read-only connections.
+
+Run from the repository root:
+    python -m benchmarks.bench_engine --rows 100000 --reads 5000 --writes 2000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import sqlalchemy as _sql
+
+import database.database as _database
+
+
+def setup_database(location:str, rows:int) -> None:
+    conn = sqlite3.connect(location)
+    conn.execute("CREATE TABLE bids (auctionID INTEGER, lotNr INTEGER, bidNr INTEGER, bidPrice FLOAT, PRIMARY KEY (auctionID, lotNr, bidNr))")
+    conn.executemany("INSERT INTO bids VALUES (?, ?, ?, ?)", ((idx // 1000, idx % 1000, 1, float(idx)) for idx in range(rows)))
+    conn.commit()
+    conn.close()
+
+def legacy_read(location:str, key:tuple) -> None:
+    conn = sqlite3.connect(location)
+    conn.execute("SELECT * FROM bids WHERE auctionID = ? AND lotNr = ?", key).fetchall()
+    conn.close()
+
+def pooled_read(engine, key:tuple) -> None:
+    conn = engine.raw_connection()
+    conn.execute("SELECT * FROM bids WHERE auctionID = ? AND lotNr = ?", key).fetchall()
+    conn.close()
+
+def write(engine, count:int, offset:int) -> None:
+    for idx in range(count):
+        with engine.begin() as conn:
+            conn.execute(_sql.text("INSERT INTO bids VALUES (:a, :l, :b, :p)"), {'a': -1, 'l': offset, 'b': idx, 'p': 1.0})
+
+def measure_reads(read, rows:int, reads:int, threads:int) -> float:
+    keys = [(random.randrange(rows // 1000 or 1), random.randrange(1000)) for _ in range(reads)]
+    def worker(part):
+        for key in part:
+            read(key)
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(keys[idx::threads],)) for idx in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return reads / (time.perf_counter() - start)
+
+def run(profile:str, rows:int, reads:int, writes:int, threads:int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, "bench.db")
+        setup_database(location, rows)
+
+        if profile == 'legacy':
+            writer = _sql.create_engine(f"sqlite:///{location}", connect_args={"check_same_thread": False})
+            read = lambda key: legacy_read(location, key)
+        else:
+            writer = _database.create_engine_profile(location, profile='tuned')
+            reader = _database.create_engine_profile(location, profile='tuned', readonly=True, pool_size=threads)
+            read = lambda key: pooled_read(reader, key)
+
+        start = time.perf_counter()
+        write(writer, writes, offset=0)
+        writesPerSecond = writes / (time.perf_counter() - start)
+
+        readsPerSecond = measure_reads(read, rows, reads, threads)
+
+        # Reads while a writer keeps committing, the situation of the API during bid bursts.
+        background = threading.Thread(target=write, args=(writer, writes, 1))
+        background.start()
+        mixedReadsPerSecond = measure_reads(read, rows, reads, threads)
+        background.join()
+
+        writer.dispose()
+        if profile != 'legacy':
+            reader.dispose()
+
+    return {'writes': writesPerSecond, 'reads': readsPerSecond, 'mixedReads': mixedReadsPerSecond}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Number of rows in the benchmark table.")
+    parser.add_argument("--reads", type=int, default=5000, help="Number of point reads per measurement.")
+    parser.add_argument("--writes", type=int, default=2000, help="Number of single-row write transactions.")
+    parser.add_argument("--threads", type=int, default=4, help="Number of concurrent reader threads.")
+    args = parser.parse_args()
+
+    for profile in ('legacy', 'tuned'):
+        result = run(profile=profile, rows=args.rows, reads=args.reads, writes=args.writes, threads=args.threads)
+        print(f"{profile:>7} | {result['writes']:>8,.0f} writes/s | {result['reads']:>8,.0f} reads/s | "
+              f"{result['mixedReads']:>8,.0f} reads/s during writes")
+
+if __name__ == "__main__":
+    main()
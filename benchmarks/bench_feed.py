@@ -0,0 +1,136 @@
+"""
+Load test the live bid feed: thousands of concurrent subscribers on one event loop, fed by a single bid writer.
+
+Every subscriber watches one lot of the auction, as the clients that used to poll GET /bids/ did. The writer commits
+bids at a fixed rate and publishes them after every commit, as POST /bids/ does. Reports the subscribe time, the
+delivered events and the latency from commit to delivery.
+
+Run from the repository root:
+    python -m benchmarks.bench_feed --subscribers 5000 --lots 50 --bids 1000 --rate 200
+"""
+import argparse
+import asyncio
+import datetime as _dt
+import os
+import statistics
+import tempfile
+import time
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.feed as _feed
+import database.models as _models
+
+
+def setup_database(location:str, lots:int) -> None:
+    engine = _sql.create_engine(f"sqlite:///{location}")
+    _database.Base.metadata.create_all(bind=engine)
+    with _orm.Session(engine) as db:
+        db.add(_models.Auction(id=1, relatedCompany='bench', auctionStart=_dt.datetime(2022, 1, 1),
+                               auctionEnd=_dt.datetime(2022, 1, 3), branchCategory='bench'))
+        for lotNr in range(1, lots + 1):
+            db.add(_models.Lots(auctionID=1, lotNr=lotNr, numberOfItems=1, estimatedValue=100, startingBid=10, reserveBid=10,
+                                mainCategory='bench', countryCode='NL', VAT=21, suffix='N/A', saleDate=_dt.datetime(1000, 1, 1),
+                                buyerAccountID=99999, currentBid=99999, sold=False))
+        db.commit()
+    engine.dispose()
+
+def write(location:str, feed:_feed.BidFeed, lots:int, bids:int, rate:float, published:dict) -> None:
+    """
+    Commit the bids round robin over the lots and publish each one after its commit.
+    """
+    engine = _database.create_engine_profile(location, profile='tuned')
+    conn = engine.raw_connection()
+    try:
+        interval = 1 / rate if rate else 0
+        start = time.perf_counter()
+        for idx in range(bids):
+            lotNr = idx % lots + 1
+            cursor = conn.execute(
+                "INSERT INTO bids (auctionID, lotNr, bidNr, isCombination, accountID, isCompany, bidPrice, biddingDateTime, closingDateTime) "
+                "VALUES (1, ?, ?, 0, ?, 0, ?, ?, '2022-01-03 00:00:00')",
+                (lotNr, idx // lots + 1, idx, float(idx), str(_dt.datetime.now()))
+                )
+            conn.commit()
+            published[cursor.lastrowid] = time.perf_counter()
+            feed.catch_up()
+            delay = start + (idx + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        conn.close()
+        engine.dispose()
+
+async def load(location:str, subscribers:int, lots:int, bids:int, rate:float, buffer:int) -> dict:
+    read_engine = _database.create_engine_profile(location, profile='tuned', readonly=True)
+    feed = _feed.BidFeed(read_engine=read_engine, buffer=buffer)
+    expected = {lotNr: bids // lots + (1 if lotNr <= bids % lots else 0) for lotNr in range(1, lots + 1)}
+    published = {}
+    latencies = []
+
+    start = time.perf_counter()
+    position = await asyncio.get_running_loop().run_in_executor(None, feed.head)
+    subscriptions = [feed.subscribe(auctionID=1, position=position, lotNr=idx % lots + 1) for idx in range(subscribers)]
+    subscribeSeconds = time.perf_counter() - start
+
+    async def consume(subscription:_feed.Subscription) -> int:
+        received = 0
+        try:
+            if not expected[subscription.lotNr]:
+                return received
+            async for event in subscription.events():
+                if event.startswith(b":"):
+                    continue
+                latencies.append(time.perf_counter() - published[int(event[4:event.index(b"\n")])])
+                received += 1
+                if received == expected[subscription.lotNr]:
+                    break
+        finally:
+            feed.unsubscribe(subscription)
+        return received
+
+    tasks = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+    start = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, write, location, feed, lots, bids, rate, published)
+    received = await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - start
+    read_engine.dispose()
+
+    latencies.sort()
+    return {
+        'subscribers': subscribers,
+        'subscribeSeconds': subscribeSeconds,
+        'delivered': sum(received),
+        'expected': sum(expected[idx % lots + 1] for idx in range(subscribers)),
+        'overflowed': sum(subscription.overflowed for subscription in subscriptions),
+        'eventsPerSecond': sum(received) / seconds,
+        'medianLatency': statistics.median(latencies) if latencies else float('nan'),
+        'p99Latency': latencies[int(len(latencies) * 0.99)] if latencies else float('nan')
+        }
+
+def run(subscribers:int, lots:int, bids:int, rate:float, buffer:int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, "bench.db")
+        setup_database(location, lots)
+        return asyncio.run(load(location, subscribers, lots, bids, rate, buffer))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5000, help="Largest number of concurrent subscribers.")
+    parser.add_argument("--lots", type=int, default=50, help="Number of lots the subscribers are spread over.")
+    parser.add_argument("--bids", type=int, default=1000, help="Number of bids committed per run.")
+    parser.add_argument("--rate", type=float, default=200, help="Bids committed per second, 0 for as fast as possible.")
+    parser.add_argument("--buffer", type=int, default=_feed.BUFFER, help="Events buffered per subscriber.")
+    args = parser.parse_args()
+
+    for subscribers in sorted({args.subscribers // 10 or 1, args.subscribers // 2 or 1, args.subscribers}):
+        result = run(subscribers=subscribers, lots=args.lots, bids=args.bids, rate=args.rate, buffer=args.buffer)
+        print(f"{result['subscribers']:>6} subscribers | subscribed in {result['subscribeSeconds']:>6.3f}s | "
+              f"delivered {result['delivered']:>8}/{result['expected']:<8} | overflowed {result['overflowed']:>5} | "
+              f"{result['eventsPerSecond']:>9,.0f} events/s | latency p50 {result['medianLatency'] * 1000:>7.2f}ms "
+              f"p99 {result['p99Latency'] * 1000:>7.2f}ms")
+
+if __name__ == "__main__":
+    main()
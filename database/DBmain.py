@@ -1,23 +1,111 @@
-from typing import List
+import datetime as _dt
+from typing import List, Optional
 import fastapi as _fastapi
-import sqlalchemy.orm as _orm
 
+import database.aio as _aio
+import database.export as _export
+import database.feed as _feed
+import database.features as _features
+import database.featurestore as _featurestore
+import database.intervals as _intervals
+import database.lotstate as _lotstate
+import database.pagination as _pagination
+import database.registry as _registry
+import database.responsecache as _responsecache
 import database.services as _services
+import database.settlement as _settlement
 import database.schemas as _schemas
+import database.writer as _writer
 
 app = _fastapi.FastAPI()
 _services.create_database()
 
+@app.on_event("startup")
+def load_bid_state():
+    # The live lot state and the bidder features are derived from the bids, rebuild them before serving so the bid path
+    # only applies the bids committed since.
+    _lotstate.store.rebuild()
+    _featurestore.store.rebuild()
+
+@app.on_event("startup")
+def start_settlement():
+    # Settles the auctions that closed while the API was down, then every auction at its end.
+    _settlement.scheduler.start()
+
+@app.on_event("shutdown")
+def stop_write_queue():
+    # Stop settling first, its writes go through the write queue. Commit whatever is still queued before the process exits.
+    _settlement.scheduler.stop()
+    _writer.write_queue.stop()
+    _aio.runner.shutdown()
+
+async def _write(operation, **kwargs):
+    """
+    Execute a write service on the single writer thread (group commit) and await its committed result.
+
+    Raises:
+        _fastapi.HTTPException: The write queue is full (backpressure).
+    """
+    try:
+        return await _aio.runner.write(operation, **kwargs)
+    except _writer.WriteQueueFull as e:
+        raise _fastapi.HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def _catch_up_auctions():
+    # Index the committed auctions for the overlap check and queue them for settlement.
+    _intervals.auction_intervals.catch_up()
+    _settlement.scheduler.catch_up()
+
+def _catch_up_bids():
+    # Apply the committed bids (and any bid committed by other writers) to the bidder features, the live lot state and the feed.
+    _featurestore.store.catch_up()
+    _lotstate.store.catch_up()
+    _feed.bid_feed.catch_up()
+
+def _cache_page(key:tuple, tag:tuple, generation:int, records:list, schema, nextCursor:Optional[str]) -> _responsecache.CachedResponse:
+    """
+    Serialize a page of records once through their response schema and cache it, with the cursor of the next page.
+    """
+    headers = {"X-Next-Cursor": nextCursor} if nextCursor else {}
+    content = _fastapi.encoders.jsonable_encoder([schema.from_orm(record) for record in records])
+    return _responsecache.cache.put(key, tag, generation, content, headers)
+
+def _respond(cached:_responsecache.CachedResponse, ifNoneMatch:Optional[str]) -> _fastapi.Response:
+    """
+    Answer with a serialized response, or with 304 Not Modified when the client already holds it (If-None-Match).
+    """
+    headers = {"ETag": cached.etag, **cached.headers}
+    if cached.matches(ifNoneMatch):
+        _responsecache.cache.not_modified()
+        return _fastapi.Response(status_code=304, headers=headers)
+    return _fastapi.Response(content=cached.body, media_type="application/json", headers=headers)
+
+def _decode_cursor(cursor:Optional[str], length:int, **scope) -> Optional[tuple]:
+    """
+    Decode a cursor query parameter into a primary key, checking it belongs to the requested auction/lot.
+
+    Raises:
+        _fastapi.HTTPException: The cursor is malformed or was issued for another auction/lot.
+    """
+    if cursor is None:
+        return None
+    try:
+        key = _pagination.decode_cursor(cursor, length)
+    except ValueError:
+        raise _fastapi.HTTPException(status_code=400, detail="Invalid cursor")
+    if any(key[position] != value for position, value in scope.values()):
+        raise _fastapi.HTTPException(status_code=400, detail="Cursor does not belong to the requested records")
+    return key
+
 @app.post("/auctions/", response_model=_schemas.Auction)
-def create_auction(
-    auction:_schemas.AuctionCreate, db:_orm.Session=_fastapi.Depends(_services.get_db)
+async def create_auction(
+    auction:_schemas.AuctionCreate
 ):
     """
     # Create auction if the related company does not already have an auction that overlays another of their auctions.
 
     ## Args:
         - auction (_schemas.AuctionCreate): The schema used to send data to/receive data from the auction table.
-        - db (_orm.Session, optional): Database session.
 
     ## Raises:
         - _fastapi.HTTPException: Overlay found in auction of the given related company.
@@ -25,52 +113,79 @@ def create_auction(
     ## Returns:
         - Auction created trigger.
     """
-    
-    db_auction = _services.check_auction_presence(
-        db=db, 
-        companyName=auction.relatedCompany, 
-        auctionStart=auction.auctionStart,
-        auctionEnd=auction.auctionEnd
-        )
+    # The overlap check runs inside the write on the writer thread, so two concurrent requests cannot both pass it.
+    result = await _write(_services.create_auctions_batch, auctions=[auction])
 
     # Only create auction if does not already exists.
-    if db_auction:
+    if result.errors:
         raise _fastapi.HTTPException(
-            status_code=400, detail="Auction already exists"
+            status_code=400, detail=result.errors[0].detail
         )
-    else:
-        return _services.create_auction(db=db, auction=auction)
+    _responsecache.cache.invalidate(('auctions',))
+    await _aio.runner.run(_catch_up_auctions)
+    return result.created[0]
+
+@app.post("/auctions/batch", response_model=_schemas.AuctionBatchResult)
+async def create_auctions_batch(
+    auctions:List[_schemas.AuctionCreate]
+):
+    """
+    # Create a schedule of auctions at once, checking all of them for overlaps in one pass and inserting them in one transaction.
+
+    ## Args:
+        - auctions (List[_schemas.AuctionCreate]): The auctions to be created, possibly for different companies.
+
+    ## Returns:
+        - The created auctions and, per auction overlapping an existing or earlier auction in the payload of the same company (by index in the payload), the reason it was not created.
+    """
+    result = await _write(_services.create_auctions_batch, auctions=auctions)
+    if result.created:
+        _responsecache.cache.invalidate(('auctions',))
+    await _aio.runner.run(_catch_up_auctions)
+    return result
 
 @app.get("/auctions/", response_model=List[_schemas.Auction])
-def read_auctions(
+async def read_auctions(
     skip:int=0,
     limit:int=10,
-    db:_orm.Session = _fastapi.Depends(_services.get_db)
+    cursor:Optional[str]=None,
+    ifNoneMatch:Optional[str]=_fastapi.Header(None, alias="If-None-Match")
 ):
     """
-    # Retrieve auctions from the auction table using the given skip and limit boundaries.
+    # Retrieve auctions from the auction table using the given cursor (or skip) and limit boundaries, served from the response cache when possible.
 
     ## Args:
-        - skip (int, optional): Number of records to skip before starting retrieval process. Defaults to 0.
+        - skip (int, optional): Number of records to skip before starting retrieval process, ignored when a cursor is given. Defaults to 0.
         - limit (int, optional): Maximal number of records to retrieve. Defaults to 10.
-        - db (_orm.Session, optional): Database session.
+        - cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        - ifNoneMatch (str, optional): If-None-Match header with the ETag of a previously received page. Defaults to None.
+
+    ## Raises:
+        - _fastapi.HTTPException: Invalid cursor.
 
     ## Returns:
-        - List of auctions retrieved.
+        - List of auctions retrieved, with its ETag and the cursor of the next page (X-Next-Cursor header), or 304 Not Modified.
     """
-    auctions = _services.get_auctions(db=db, skip=skip, limit=limit)
-    return auctions
+    after = _decode_cursor(cursor, 1)
+    key = ('auctions', skip, limit, cursor)
+    cached = _responsecache.cache.get(key)
+    if cached is None:
+        generation = _responsecache.cache.generation(('auctions',))
+        auctions = await _aio.runner.query(_services.get_auctions, skip=skip, limit=limit, after=after)
+        nextCursor = _pagination.next_cursor(auctions, limit, key=lambda auction: (auction.id,))
+        cached = _cache_page(key, ('auctions',), generation, auctions, _schemas.Auction, nextCursor)
+    return _respond(cached, ifNoneMatch)
 
 @app.post("/lots/", response_model=_schemas.Lot)
-def create_lot(
-    lot:_schemas.LotCreate, db:_orm.Session=_fastapi.Depends(_services.get_db)
+async def create_lot(
+    lot:_schemas.LotCreate, response:_fastapi.Response
 ):
     """
     # Create a lot for the given auction.
 
     ## Args:
         - lot (_schemas.LotCreate): The schema used to send data to/receive data from the lots table.
-        - db (_orm.Session, optional): Database Session.
+        - response (_fastapi.Response): Response on which the model version used for the starting bid is reported (X-Model-Version header).
 
     ## Raises:
         - _fastapi.HTTPException: Given auction ID has no reference in the auction table (Foreign key relation).
@@ -78,98 +193,363 @@ def create_lot(
     ## Returns:
         - Lot created trigger.
     """
-    db_auction = _services.get_auction_by_ID(db=db, auctionID=lot.auctionID)
+    db_auction = await _aio.runner.query(_services.get_auction_by_ID, auctionID=lot.auctionID)
     if not db_auction:
         raise _fastapi.HTTPException(
             status_code=500, detail= "Requested auction does not exist"
         )
     
     else:
-        return _services.create_lot(db=db, lot=lot)
+        # Loading or reloading the artifacts reads and unpickles them, keep that off the event loop.
+        model = await _aio.runner.infer(_registry.get_model)
+        response.headers["X-Model-Version"] = model.version
+        # Predict on the inference executor, the write transaction only inserts the lot.
+        startingBid = await _aio.runner.infer(
+            _services.get_starting_bid,
+            numberOfItems=lot.numberOfItems,
+            estimatedValue=lot.estimatedValue,
+            reserveBid=lot.reserveBid,
+            auctionDuration=_features.auction_duration(auctionStart=db_auction.auctionStart, auctionEnd=db_auction.auctionEnd),
+            category=lot.mainCategory,
+            model=model
+            )
+        db_lot = await _write(_services.create_lot, lot=lot, model=model, startingBid=startingBid)
+        _responsecache.cache.invalidate(('lots', lot.auctionID))
+        return db_lot
+
+@app.post("/lots/batch", response_model=_schemas.LotBatchResult)
+async def create_lots_batch(
+    lots:List[_schemas.LotCreate]
+):
+    """
+    # Create many lots at once, predicting all starting bids in a single inference pass and inserting them in one transaction.
+
+    ## Args:
+        - lots (List[_schemas.LotCreate]): The lots to be created, possibly for different auctions.
+
+    ## Returns:
+        - The created lots and, per failed item (by index in the payload), the reason it was not created.
+    """
+    model = await _aio.runner.infer(_registry.get_model)
+    auctions = await _aio.runner.query(_services.get_auctions_by_IDs, auctionIDs=[lot.auctionID for lot in lots])
+    startingBids = await _aio.runner.infer(_services.predict_lots_starting_bids, lots=lots, auctions=auctions, model=model)
+    result = await _write(_services.create_lots_batch, lots=lots, model=model, startingBids=startingBids)
+    _responsecache.cache.invalidate(*{('lots', lot.auctionID) for lot in result.created})
+    return result
 
 @app.get("/lots/", response_model=List[_schemas.Lot])
-def read_lots(
+async def read_lots(
     auctionID:int,
     skip:int=0,
     limit:int=10,
-    db:_orm.Session = _fastapi.Depends(_services.get_db)
+    cursor:Optional[str]=None,
+    ifNoneMatch:Optional[str]=_fastapi.Header(None, alias="If-None-Match")
 ):
     """
-    # Retrieve lots from the lots table of the given auction, using the given skip and limit boundaries.
+    # Retrieve lots from the lots table of the given auction, using the given cursor (or skip) and limit boundaries, served from the response cache when possible.
 
     ## Args:
         - auctionID (int): ID reference of the auction of which the lots are desired to be retrieved.
-        - skip (int, optional): Number of records to skip before starting retrieval process. Defaults to 0.
+        - skip (int, optional): Number of records to skip before starting retrieval process, ignored when a cursor is given. Defaults to 0.
         - limit (int, optional): Maximal number of records to retrieve. Defaults to 10.
-        - db (_orm.Session, optional): Database session.
+        - cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        - ifNoneMatch (str, optional): If-None-Match header with the ETag of a previously received page. Defaults to None.
 
     ## Raises:
+        - _fastapi.HTTPException: Invalid cursor.
         - _fastapi.HTTPException: Given auction ID has no reference in the auction table (Foreign key relation).
 
     ## Returns:
-        - List of lots retrieved.
+        - List of lots retrieved, with its ETag and the cursor of the next page (X-Next-Cursor header), or 304 Not Modified.
     """
-    db_auction = _services.get_auction_by_ID(db=db, auctionID=auctionID)
+    after = _decode_cursor(cursor, 2, auctionID=(0, auctionID))
+    key = ('lots', auctionID, skip, limit, cursor)
+    cached = _responsecache.cache.get(key)
+    if cached is not None:
+        return _respond(cached, ifNoneMatch)
+
+    generation = _responsecache.cache.generation(('lots', auctionID))
+    db_auction = await _aio.runner.query(_services.get_auction_by_ID, auctionID=auctionID)
     if not db_auction:
         raise _fastapi.HTTPException(
             status_code=500, detail= "Requested auction does not exist"
         )
     else:
-        return _services.get_lots_by_auctionID(db=db, auctionID=auctionID, skip=skip, limit=limit)
+        lots = await _aio.runner.query(_services.get_lots_by_auctionID, auctionID=auctionID, skip=skip, limit=limit, after=after)
+        nextCursor = _pagination.next_cursor(lots, limit, key=lambda lot: (lot.auctionID, lot.lotNr))
+        return _respond(_cache_page(key, ('lots', auctionID), generation, lots, _schemas.Lot, nextCursor), ifNoneMatch)
 
-@app.get("/bids/", response_model=List[_schemas.Bid])
-def read_bids(
+@app.get("/lots/statistics/", response_model=_schemas.LotStatistic)
+async def read_lot_statistics(
+    auctionID:int,
+    lotNr:int
+):
+    """
+    # Retrieve the statistics of the given auction and lot: datetime of the first bid, lot ending and duration in minutes.
+
+    ## Args:
+        - auctionID (int): ID reference of the auction of which (in combination with the lotNr) the statistics need to be retrieved.
+        - lotNr (int): Number reference of the lot of which (in combination with the auctionID) the statistics need to be retrieved.
+
+    ## Raises:
+        - _fastapi.HTTPException: No bids have been placed on the given auction and lot combination.
+
+    ## Returns:
+        - Statistics of the lot.
+    """
+    db_statistics = await _aio.runner.query(_services.get_lot_statistics, auctionID=auctionID, lotNr=lotNr)
+    if not db_statistics:
+        raise _fastapi.HTTPException(
+            status_code=500, detail= "Given LotID and/or AuctionID do not have any bids"
+        )
+    return db_statistics
+
+@app.get("/lots/{auctionID}/{lotNr}/state", response_model=_schemas.LotState)
+async def read_lot_state(
+    auctionID:int,
+    lotNr:int
+):
+    """
+    # Retrieve the live state of the given auction and lot (highest bid, leading account and number of bids) from memory.
+
+    ## Args:
+        - auctionID (int): ID reference of the auction of which (in combination with the lotNr) the state needs to be retrieved.
+        - lotNr (int): Number reference of the lot of which (in combination with the auctionID) the state needs to be retrieved.
+
+    ## Raises:
+        - _fastapi.HTTPException: No bids have been placed on the given auction and lot combination.
+
+    ## Returns:
+        - Live state of the lot.
+    """
+    # Bids may have been accepted by another worker process; catching up is a rowid range scan of the new bids only.
+    await _aio.runner.run(_lotstate.store.catch_up)
+    state = _lotstate.store.get(auctionID=auctionID, lotNr=lotNr)
+    if state is None:
+        raise _fastapi.HTTPException(
+            status_code=500, detail= "Given LotID and/or AuctionID do not have any bids"
+        )
+    return _schemas.LotState(auctionID=auctionID, lotNr=lotNr, **state)
+
+@app.get("/bids/",response_model=List[_schemas.Bid])
+async def read_bids(
     auctionID:int,
     lotNr:int,
     skip:int=0,
     limit:int=10,
-    db:_orm.Session = _fastapi.Depends(_services.get_db)
+    cursor:Optional[str]=None,
+    ifNoneMatch:Optional[str]=_fastapi.Header(None, alias="If-None-Match")
 ):
     """
-    # Retrieve bids from the bids table of the concerning auction and lot, using the given skip and limit boundaries
+    # Retrieve bids from the bids table of the concerning auction and lot, using the given cursor (or skip) and limit boundaries, served from the response cache when possible
 
     ## Args:
         - auctionID (int): ID reference of the auction of which (in combination with the lotID) bids need to be retrieved.
         - lotID (int): ID reference of the lot of which (in combination with the auctionID) bids need to be retrieved.
-        - skip (int, optional): Number of records to skip before starting retrieval process. Defaults to 0.
+        - skip (int, optional): Number of records to skip before starting retrieval process, ignored when a cursor is given. Defaults to 0.
         - limit (int, optional): Maximal number of records to retrieve. Defaults to 10.
-        - db (_orm.Session, optional): Database session.
+        - cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        - ifNoneMatch (str, optional): If-None-Match header with the ETag of a previously received page. Defaults to None.
     
     ## Raises:
+        - _fastapi.HTTPException: Invalid cursor.
         - _fastapi.HTTPException: Given Lot does not exist within the given auction.
 
     ## Returns:
-        - List of bids retrieved.
+        - List of bids retrieved, with its ETag and the cursor of the next page (X-Next-Cursor header), or 304 Not Modified.
     """
-    db_bids = _services.get_bids_by_IDs(db=db, auctionID=auctionID, lotNr=lotNr, skip=skip, limit=limit)
-    if not db_bids:
+    after = _decode_cursor(cursor, 3, auctionID=(0, auctionID), lotNr=(1, lotNr))
+    key = ('bids', auctionID, lotNr, skip, limit, cursor)
+    cached = _responsecache.cache.get(key)
+    if cached is not None:
+        return _respond(cached, ifNoneMatch)
+
+    generation = _responsecache.cache.generation(('bids', auctionID, lotNr))
+    db_bids = await _aio.runner.query(_services.get_bids_by_IDs, auctionID=auctionID, lotNr=lotNr, skip=skip, limit=limit, after=after)
+    # An empty page after a cursor only means the previous page was the last one.
+    if not db_bids and after is None:
         raise _fastapi.HTTPException(
             status_code=500, detail= "Given LotID and/or AuctionID do not exist"
         )
     else:
-        return db_bids
+        nextCursor = _pagination.next_cursor(db_bids, limit, key=lambda bid: (bid.auctionID, bid.lotNr, bid.bidNr))
+        return _respond(_cache_page(key, ('bids', auctionID, lotNr), generation, db_bids, _schemas.Bid, nextCursor), ifNoneMatch)
 
 @app.post("/bids/", response_model=_schemas.Bid)
-def create_bid(
-    bid:_schemas.BidCreate, db:_orm.Session=_fastapi.Depends(_services.get_db)
+async def create_bid(
+    bid:_schemas.BidCreate
 ):
     """
     # Create a bid for the given auction and lot combination.
 
     ## Args:
         - bid (_schemas.BidCreate): The schema used to send data to/receive data from the lots table.
-        - db (_orm.Session, optional): Database Session.
 
     ## Raises:
         - _fastapi.HTTPException: Given Lot does not exist within the given auction.
+        - _fastapi.HTTPException: The auction has ended.
 
     ## Returns:
         - Bid created trigger.
     """
-    db_lot = _services.get_auction_lot_combination(db=db, auctionID=bid.auctionID, lotNr=bid.lotNr)
+    db_lot = await _aio.runner.query(_services.get_auction_lot_combination, auctionID=bid.auctionID, lotNr=bid.lotNr)
     if not db_lot:
         raise _fastapi.HTTPException(
             status_code=500, detail= "Given LotID and/or AuctionID do not exist"
         )
     else:
-        return _services.create_bid(db=db, bid=bid)
\ No newline at end of file
+        # Reject late bids before they reach the write queue; the writer checks again at the moment of the insert.
+        auctionEnd = await _aio.runner.query(_services.get_auction_end, auctionID=bid.auctionID)
+        if auctionEnd is not None and _dt.datetime.now() > auctionEnd:
+            raise _fastapi.HTTPException(status_code=400, detail="The auction has ended")
+        db_bid = await _write(_services.create_bid, bid=bid)
+        if db_bid is None:
+            raise _fastapi.HTTPException(status_code=400, detail="The auction has ended")
+        # The bid is listed with its lot, and the lot listing shows the current bid and buyer.
+        _responsecache.cache.invalidate(('bids', bid.auctionID, bid.lotNr), ('lots', bid.auctionID))
+        await _aio.runner.run(_catch_up_bids)
+        return db_bid
+
+@app.get("/bids/feed/")
+async def read_bid_feed(
+    auctionID:int,
+    request:_fastapi.Request,
+    lotNr:Optional[int]=None,
+    afterBidNr:Optional[int]=None,
+    lastEventID:Optional[int]=_fastapi.Header(None, alias="Last-Event-ID")
+):
+    """
+    # Subscribe to the bids placed on the given auction (or lot) as a stream of Server-Sent Events.
+
+    ## Args:
+        - auctionID (int): ID reference of the auction of which the bids are pushed.
+        - request (_fastapi.Request): Request, used to notice the client disconnecting.
+        - lotNr (int, optional): Only push the bids of this lot. Defaults to None.
+        - afterBidNr (int, optional): Resume a lot subscription: first push the bids of the lot after this bid number. Defaults to None.
+        - lastEventID (int, optional): Last-Event-ID header sent by reconnecting clients: first push the bids after this event. Defaults to None.
+
+    ## Raises:
+        - _fastapi.HTTPException: Given auction (and lot) does not exist.
+
+    ## Returns:
+        - Event stream with one "bid" event per bid, with the bid as data and an increasing event id.
+    """
+    # A short lived session: a dependency would hold a pooled connection for as long as the stream is open.
+    if lotNr is None:
+        exists = await _aio.runner.query(_services.get_auction_by_ID, auctionID=auctionID)
+    else:
+        exists = await _aio.runner.query(_services.get_auction_lot_combination, auctionID=auctionID, lotNr=lotNr)
+    if not exists:
+        raise _fastapi.HTTPException(
+            status_code=500, detail= "Given LotID and/or AuctionID do not exist"
+        )
+
+    # Subscribe before reading the missed bids, so no bid falls in between; duplicates are skipped on the event id.
+    position = await _aio.runner.run(_feed.bid_feed.head)
+    subscription = _feed.bid_feed.subscribe(auctionID=auctionID, position=position, lotNr=lotNr)
+    try:
+        replay = await _aio.runner.run(
+            _feed.bid_feed.replay, auctionID=auctionID, lotNr=lotNr, afterEvent=lastEventID, afterBid=afterBidNr
+            )
+    except Exception:
+        _feed.bid_feed.unsubscribe(subscription)
+        raise
+
+    async def stream():
+        try:
+            async for event in subscription.events(replay):
+                if await request.is_disconnected():
+                    break
+                yield event
+        finally:
+            _feed.bid_feed.unsubscribe(subscription)
+
+    return _fastapi.responses.StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/bids/features/", response_model=_schemas.BidderFeatures)
+async def read_bidder_features(
+    auctionID:int,
+    lotNr:int,
+    accountID:int
+):
+    """
+    # Retrieve the bidding behaviour features (NOB, ABP, HBP, TOE and TOX) of a bidder in the given auction and lot.
+
+    ## Args:
+        - auctionID (int): ID reference of the auction in which the bids were placed.
+        - lotNr (int): Number reference of the lot in which the bids were placed.
+        - accountID (int): ID reference of the bidder.
+
+    ## Raises:
+        - _fastapi.HTTPException: The bidder did not place any bids in the given auction and lot.
+
+    ## Returns:
+        - Features of the bidder.
+    """
+    await _aio.runner.run(_featurestore.store.catch_up)
+    features = _featurestore.store.get(auctionID=auctionID, lotNr=lotNr, accountID=accountID)
+    if features is None:
+        raise _fastapi.HTTPException(
+            status_code=500, detail= "Given AccountID has no bids in the given LotID and/or AuctionID"
+        )
+    return {"auctionID": auctionID, "lotNr": lotNr, "accountID": accountID, **features}
+
+@app.get("/export/{table}")
+def export_table(
+    table:str,
+    format:str="ndjson",
+    columns:Optional[str]=None,
+    auctionID:Optional[int]=None,
+    lotNr:Optional[int]=None,
+    start:Optional[_dt.datetime]=None,
+    end:Optional[_dt.datetime]=None
+):
+    """
+    # Stream a whole table (auctions, lots or bids) straight from the database, in constant memory.
+
+    ## Args:
+        - table (str): Table to export: auctions, lots or bids.
+        - format (str, optional): Output format: ndjson, csv or arrow (Arrow IPC stream). Defaults to ndjson.
+        - columns (str, optional): Comma separated columns to export. Defaults to all columns.
+        - auctionID (int, optional): Only export records of this auction. Defaults to None.
+        - lotNr (int, optional): Only export records of this lot. Defaults to None.
+        - start (_dt.datetime, optional): Only export bids placed at or after this time. Defaults to None.
+        - end (_dt.datetime, optional): Only export bids placed before this time. Defaults to None.
+
+    ## Raises:
+        - _fastapi.HTTPException: Unknown table, format or column, or a filter that does not apply to the table.
+
+    ## Returns:
+        - Streaming response with the exported records.
+    """
+    try:
+        stream = _export.export(
+            table=table,
+            fmt=format,
+            columns=columns.split(',') if columns else None,
+            auctionID=auctionID,
+            lotNr=lotNr,
+            start=start,
+            end=end
+            )
+    except ValueError as e:
+        raise _fastapi.HTTPException(status_code=400, detail=str(e))
+    return _fastapi.responses.StreamingResponse(stream, media_type=_export.MEDIA_TYPES[format])
+
+@app.get("/metrics/")
+async def read_metrics():
+    """
+    # Report internal metrics of the API process.
+
+    ## Returns:
+        - Write queue depth, commit batch sizes and operation counters, the hit/miss counters of the service and response caches, the
+          subscriber and event counters of the bid feed, the counters and queue of the settlement scheduler and the size and
+          backlog of the read and inference executors.
+    """
+    return {
+        "writeQueue": _writer.write_queue.stats(),
+        "executors": _aio.runner.stats(),
+        "caches": dict(_services.get_cache_stats(), responses=_responsecache.cache.stats()),
+        "bidFeed": _feed.bid_feed.stats(),
+        "settlement": _settlement.scheduler.stats()
+        }
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Out-of-core bid statistics: the per-lot and per-bidder aggregates of src/Main.ipynb computed inside SQLite.
+
+Only the aggregated groups are returned to Python, so memory depends on the number of lots and bidders rather than on
+the number of bids. Partitions (auction ID ranges) can be aggregated in parallel processes.
+
+Usage (from the repository root):
+    python -m database.aggregates --processes 4 --output bid_statistic.csv
+"""
+import argparse
+import concurrent.futures
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+import database.database as _database
+
+
+LOT_COLUMNS = ['auctionID', 'lotNr', 'FirstBid', 'LotEnding', 'Duration']
+BID_COLUMNS = ['auctionID', 'lotNr', 'accountID', 'NOB', 'ABP', 'HBP', 'TOE', 'TOX', 'Duration']
+
+# Grouping on (auctionID, lotNr) follows the primary key of bids, so SQLite streams the groups without sorting.
+_LOT_AGGREGATE = """
+    SELECT auctionID, lotNr, MIN(biddingDateTime), MAX(closingDateTime)
+    FROM bids
+    WHERE auctionID BETWEEN ? AND ?
+    GROUP BY auctionID, lotNr
+    ORDER BY auctionID, lotNr"""
+_BIDDER_AGGREGATE = """
+    SELECT auctionID, lotNr, accountID, COUNT(bidPrice), AVG(bidPrice), MAX(bidPrice), MIN(biddingDateTime), MAX(biddingDateTime)
+    FROM bids
+    WHERE auctionID BETWEEN ? AND ?
+    GROUP BY auctionID, lotNr, accountID
+    ORDER BY auctionID, lotNr, accountID"""
+# Keep SQLite's own memory bounded: sorts spill to temporary files instead of growing in memory.
+_PRAGMAS = {
+    'temp_store': 'FILE',
+    'cache_size': -16384  # 16 MiB
+    }
+
+
+def connect(location:str=_database.DB_LOC) -> sqlite3.Connection:
+    """
+    Open a read-only connection for aggregation.
+    """
+    conn = sqlite3.connect(f"file:{location}?mode=ro", uri=True)
+    for pragma, value in _PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+def partitions(location:str=_database.DB_LOC, n:int=1) -> list:
+    """
+    Split the auction IDs of the bids table into n contiguous, inclusive (low, high) ranges of equal width.
+    """
+    conn = connect(location)
+    try:
+        low, high = conn.execute("SELECT MIN(auctionID), MAX(auctionID) FROM bids").fetchone()
+    finally:
+        conn.close()
+    if low is None:
+        return []
+    bounds = np.linspace(low, high + 1, max(1, min(n, high - low + 1)) + 1).astype(np.int64)
+    return [(int(lo), int(hi) - 1) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+def _to_datetime(values) -> pd.Series:
+    # NumPy parses the SQLite text timestamps with and without fractional seconds alike
+    return pd.Series(np.asarray(values, dtype='datetime64[ns]'))
+
+def _lot_frame(rows:list) -> pd.DataFrame:
+    lots = pd.DataFrame(rows, columns=['auctionID', 'lotNr', 'FirstBid', 'LotEnding'])
+    lots['FirstBid'] = _to_datetime(lots['FirstBid'])
+    lots['LotEnding'] = _to_datetime(lots['LotEnding'])
+    lots['Duration'] = (lots['LotEnding'] - lots['FirstBid']) / pd.Timedelta('1 minute')
+    return lots
+
+def aggregate_partition(location:str, low:int, high:int) -> tuple:
+    """
+    Aggregate the bids of the auctions in [low, high].
+
+    Returns:
+        tuple: Lot statistics and bid statistics of the partition, as DataFrames.
+    """
+    conn = connect(location)
+    try:
+        lots = _lot_frame(conn.execute(_LOT_AGGREGATE, (low, high)).fetchall())
+        bidders = pd.DataFrame(
+            conn.execute(_BIDDER_AGGREGATE, (low, high)).fetchall(),
+            columns=['auctionID', 'lotNr', 'accountID', 'NOB', 'ABP', 'HBP', 'TOE', 'TOX']
+            )
+    finally:
+        conn.close()
+
+    # Relative time of entry/exit within the lot window, values above 1 (or undefined) are set to 1 as in the notebook
+    bidders = bidders.merge(lots, on=['auctionID', 'lotNr'], how='left')
+    for column in ('TOE', 'TOX'):
+        relative = ((_to_datetime(bidders[column]) - bidders['FirstBid']) / pd.Timedelta('1 minute')) / bidders['Duration']
+        bidders[column] = np.where(relative <= 1, relative, 1.0)
+    return lots[LOT_COLUMNS], bidders[BID_COLUMNS]
+
+def _run(location:str, ranges:list, processes:int) -> list:
+    if processes <= 1 or len(ranges) <= 1:
+        return [aggregate_partition(location, low, high) for low, high in ranges]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(aggregate_partition, *zip(*[(location, low, high) for low, high in ranges])))
+
+def bid_statistics(location:str=_database.DB_LOC, processes:int=1, n_partitions:int=None) -> tuple:
+    """
+    Compute the lot statistics (FirstBid, LotEnding, Duration) and the bid statistics (NOB, ABP, HBP, TOE, TOX) of
+    create_bid_statistic in src/Main.ipynb without loading the bids table.
+
+    Args:
+        location (str, optional): Location of the database. Defaults to the API database.
+        processes (int, optional): Number of processes aggregating partitions in parallel. Defaults to 1.
+        n_partitions (int, optional): Number of auction ID ranges. Defaults to the number of processes.
+
+    Returns:
+        tuple: Lot statistics and bid statistics, as DataFrames ordered by their keys.
+    """
+    ranges = partitions(location, n_partitions or processes)
+    results = _run(location, ranges, processes)
+    if not results:
+        return pd.DataFrame(columns=LOT_COLUMNS), pd.DataFrame(columns=BID_COLUMNS)
+
+    # Partitions hold disjoint auctions and come back in range order, so concatenation keeps the key order
+    lots = pd.concat([lots for lots, _ in results], ignore_index=True)
+    bidders = pd.concat([bidders for _, bidders in results], ignore_index=True)
+    return lots, bidders
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1, help="Number of processes aggregating partitions in parallel.")
+    parser.add_argument("--partitions", type=int, default=None, help="Number of auction ID ranges. Defaults to the number of processes.")
+    parser.add_argument("--output", default=None, help="Write the bid statistics to this csv file.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lots, bidders = bid_statistics(processes=args.processes, n_partitions=args.partitions)
+    print(f"--- Aggregated {len(lots):,} lots and {len(bidders):,} bidders in {time.perf_counter() - start:.1f}s ---")
+    if args.output:
+        bidders.to_csv(args.output, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import functools
+import os
+import time
+
+import database.database as _database
+import database.writer as _writer
+
+
+# Threads running blocking database reads; one per connection of the read pool, so a read never waits for a connection.
+READ_WORKERS = int(os.environ.get("AUCTION_READ_WORKERS", _database.READ_POOL_SIZE))
+# Threads running starting-bid inference, kept apart so slow lot creations cannot starve the reads.
+INFERENCE_WORKERS = int(os.environ.get("AUCTION_INFERENCE_WORKERS", 2))
+# Seconds between attempts to queue a write while the write queue is full.
+WRITE_RETRY_INTERVAL = 0.01
+
+
+class AsyncRunner:
+    """
+    Async request path on top of the synchronous services: every kind of blocking work gets its own executor.
+
+    Reads run on a read executor sized to the read-only connection pool, inference runs on a separate inference
+    executor and writes are queued on the writer thread and awaited without holding any thread. Endpoints awaiting
+    these no longer share (and exhaust) the single threadpool of the web framework.
+
+    SQLite has no asynchronous driver that avoids threads; an async engine (aiosqlite) runs every connection on a thread
+    of its own as well. Dedicated executors give the same concurrency, and keep the services shared with the sync path.
+    """
+    def __init__(self, read_session_factory=None, write_queue:_writer.WriteQueue=None, read_workers:int=READ_WORKERS,
+                 inference_workers:int=INFERENCE_WORKERS):
+        self.read_session_factory = read_session_factory if read_session_factory is not None else _database.ReadSessionLocal
+        self.write_queue = write_queue if write_queue is not None else _writer.write_queue
+        self.read_workers = read_workers
+        self.inference_workers = inference_workers
+        self._read_executor = concurrent.futures.ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="read")
+        self._inference_executor = concurrent.futures.ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference")
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Run blocking (database) work on the read executor and await its result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, functools.partial(function, *args, **kwargs))
+
+    async def query(self, service, **kwargs):
+        """
+        Call a read service as service(db=session, **kwargs) with a read-only session on the read executor.
+        """
+        def call():
+            db = self.read_session_factory()
+            try:
+                return service(db=db, **kwargs)
+            finally:
+                db.close()
+        return await self.run(call)
+
+    async def infer(self, function, *args, **kwargs):
+        """
+        Run model inference on the inference executor and await its result.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._inference_executor, functools.partial(function, *args, **kwargs))
+
+    async def write(self, operation, **kwargs):
+        """
+        Queue a write service on the writer thread (group commit) and await its committed result.
+
+        Raises:
+            _writer.WriteQueueFull: The write queue stayed full for submit_timeout seconds (backpressure).
+        """
+        # Wait for room by sleeping on the event loop, so a full queue never ties up a thread of the read executor.
+        deadline = time.monotonic() + self.write_queue.submit_timeout
+        while True:
+            try:
+                future = self.write_queue.submit_nowait(operation, commit=False, **kwargs)
+                break
+            except _writer.WriteQueueFull:
+                if time.monotonic() >= deadline:
+                    self.write_queue.record_rejected()
+                    raise
+                await asyncio.sleep(min(WRITE_RETRY_INTERVAL, max(deadline - time.monotonic(), 0)))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """
+        Wait for the running work and stop the executors.
+        """
+        self._read_executor.shutdown(wait=True)
+        self._inference_executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """
+        Return the size and backlog (submitted, not yet started work) of the executors.
+        """
+        return {
+            'readWorkers': self.read_workers,
+            'readBacklog': self._read_executor._work_queue.qsize(),
+            'inferenceWorkers': self.inference_workers,
+            'inferenceBacklog': self._inference_executor._work_queue.qsize()
+            }
+
+
+runner = AsyncRunner()
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+# Search range and precision of the starting bid, in euros.
+LOW = 10
+HIGH = 100000
+STEP = 1
+THRESHOLD = 0.5
+PROBES = 15
+
+
+def search(nrOfLots:int, saleProbability, low:float=LOW, high:float=HIGH, step:float=STEP, threshold:float=THRESHOLD,
+           probes:int=PROBES) -> tuple:
+    """
+    Find, for every lot at once, the highest starting bid on the step grid in [low, high] whose sale probability reaches
+    the threshold, using a (probes + 1)-ary search.
+
+    Every round evaluates probes prices inside the remaining interval of each unfinished lot in a single batched call and
+    keeps the sub-interval between the highest selling probe and the probe above it. The sale probability is expected to
+    decrease with the starting bid, which makes this the sale/no-sale boundary and costs O(log(range / step)) rounds
+    instead of a prediction per grid point. Where the probabilities are not monotone, narrowing on the highest selling
+    probe still converges, to a boundary at or above the highest selling price seen.
+
+    Args:
+        nrOfLots (int): Number of lots.
+        saleProbability (callable): saleProbability(lots, prices) returning the sale probability per (lot index, price) pair.
+        low (float, optional): Lowest allowed starting bid. Defaults to LOW.
+        high (float, optional): Highest allowed starting bid. Defaults to HIGH.
+        step (float, optional): Precision of the starting bid. Defaults to STEP.
+        threshold (float, optional): Minimal sale probability. Defaults to THRESHOLD.
+        probes (int, optional): Prices evaluated per lot per round. Defaults to PROBES.
+
+    Returns:
+        tuple: Starting bid per lot (low where no price reaches the threshold) and the number of batched calls made.
+    """
+    if high < low or step <= 0 or probes < 1:
+        raise ValueError("Invalid search range, step or number of probes")
+    nrOfSteps = int(np.floor((high - low) / step))
+    lots = np.arange(nrOfLots)
+
+    # First round: evenly spread probes over the whole range, including both bounds (as grid step indices).
+    grid = np.unique(np.round(np.linspace(0, nrOfSteps, probes + 2)).astype(np.int64))
+    sells = saleProbability(np.repeat(lots, len(grid)), low + np.tile(grid, nrOfLots) * step).reshape(nrOfLots, len(grid)) >= threshold
+    calls = 1
+
+    anySale = sells.any(axis=1)
+    lastSale = len(grid) - 1 - np.argmax(sells[:, ::-1], axis=1)
+    # Invariant: lo sells (or nothing sold) and hi does not sell; the answer lies in [lo, hi).
+    lo = np.where(anySale, grid[lastSale], 0)
+    hi = np.where(anySale & (lastSale < len(grid) - 1), grid[np.minimum(lastSale + 1, len(grid) - 1)], lo)
+
+    active = np.flatnonzero(hi - lo > 1)
+    while len(active):
+        width = hi[active] - lo[active]
+        fractions = np.arange(1, probes + 1) / (probes + 1)
+        candidates = lo[active, None] + np.round(width[:, None] * fractions[None, :]).astype(np.int64)
+        candidates = np.clip(candidates, lo[active, None] + 1, hi[active, None] - 1)
+
+        sells = saleProbability(
+            np.repeat(active, probes), low + candidates.ravel() * step
+            ).reshape(len(active), probes) >= threshold
+        calls += 1
+
+        anySale = sells.any(axis=1)
+        lastSale = probes - 1 - np.argmax(sells[:, ::-1], axis=1)
+        rows = np.arange(len(active))
+        newLo = np.where(anySale, candidates[rows, lastSale], lo[active])
+        above = np.where(anySale, lastSale + 1, 0)
+        newHi = np.where(above < probes, candidates[rows, np.minimum(above, probes - 1)], hi[active])
+        lo[active], hi[active] = newLo, newHi
+        active = active[hi[active] - lo[active] > 1]
+
+    return low + lo * step, calls
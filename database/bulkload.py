@@ -0,0 +1,203 @@
+import sqlite3
+import time
+import os
+
+from tqdm import tqdm
+import pandas as pd
+
+import database.lotstats as _lotstats
+
+
+TABLES = ['auctions', 'lots', 'bids']
+CSV_FILES = {
+    'auctions': 'auctions.csv',
+    'lots': 'lots.csv',
+    'bids': 'bids.csv'
+    }
+COLUMNS = {
+    'auctions': ['id', 'relatedCompany', 'auctionStart', 'auctionEnd', 'branchCategory'],
+    'lots': ['countryCode', 'saleDate', 'auctionID', 'lotNr', 'suffix', 'numberOfItems', 'buyerAccountID', 'estimatedValue',
+             'startingBid', 'reserveBid', 'currentBid', 'VAT', 'mainCategory', 'sold'],
+    'bids': ['auctionID', 'lotNr', 'bidNr', 'lotID', 'isCombination', 'accountID', 'isCompany', 'bidPrice', 'biddingDateTime',
+             'closingDateTime']
+    }
+# Explicit CSV dtypes, so every chunk is parsed the same way instead of being inferred per chunk.
+# Boolean columns are left to inference, because the exports are not consistent in how they spell them.
+DTYPES = {
+    'auctions': {'id': 'Int64', 'relatedCompany': str, 'auctionStart': str, 'auctionEnd': str, 'branchCategory': str},
+    'lots': {'countryCode': str, 'saleDate': str, 'auctionID': 'Int64', 'lotNr': 'Int64', 'suffix': str, 'numberOfItems': 'Int64',
+             'buyerAccountID': 'Int64', 'estimatedValue': 'float64', 'startingBid': 'float64', 'reserveBid': 'float64',
+             'currentBid': 'float64', 'VAT': 'Int64', 'mainCategory': str},
+    'bids': {'auctionID': 'Int64', 'lotNr': 'Int64', 'bidNr': 'Int64', 'lotID': 'Int64', 'accountID': 'Int64', 'bidPrice': 'float64',
+             'biddingDateTime': str, 'closingDateTime': str}
+    }
+# Settings only used while importing: durability is traded for speed, the data can always be reloaded from the CSV files.
+IMPORT_PRAGMAS = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'cache_size': -262144,  # 256 MiB
+    'temp_store': 'MEMORY'
+    }
+CHUNKSIZE = 100000
+
+
+def read_chunks(csv_path:str, table:str, chunksize:int=CHUNKSIZE):
+    """
+    Stream a CSV export in typed chunks.
+
+    Args:
+        csv_path (str): Location of the CSV file.
+        table (str): Table the CSV file belongs to, determines columns and dtypes.
+        chunksize (int, optional): Number of rows per chunk. Defaults to CHUNKSIZE.
+
+    Yields:
+        pd.DataFrame: Chunk with the columns of the table, in table order.
+    """
+    for chunk in pd.read_csv(csv_path, usecols=COLUMNS[table], dtype=DTYPES[table], chunksize=chunksize):
+        yield chunk[COLUMNS[table]]
+
+def to_records(chunk:pd.DataFrame) -> list:
+    """
+    Convert a chunk into a list of tuples of plain Python values, with missing values as None, as accepted by sqlite3.
+    """
+    chunk = chunk.astype(object)
+    return list(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+def set_pragmas(conn:sqlite3.Connection, pragmas:dict) -> dict:
+    """
+    Apply the given PRAGMAs and return their previous values, so they can be restored afterwards.
+    """
+    previous = {}
+    for pragma, value in pragmas.items():
+        previous[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+        conn.execute(f"PRAGMA {pragma}={value}")
+    return previous
+
+def drop_secondary_indexes(conn:sqlite3.Connection, table:str) -> list:
+    """
+    Drop all explicitly created indexes of the table. Primary key indexes are kept to detect duplicates.
+
+    Returns:
+        list: CREATE INDEX statements of the dropped indexes.
+    """
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)
+        ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    conn.commit()
+    return [sql for _, sql in indexes]
+
+def create_indexes(conn:sqlite3.Connection, statements:list) -> None:
+    """
+    (Re)create indexes from their CREATE INDEX statements.
+    """
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+
+def drop_triggers(conn:sqlite3.Connection, table:str) -> list:
+    """
+    Drop all triggers on the table, so rows are not maintained one by one while loading.
+
+    Returns:
+        list: CREATE TRIGGER statements of the dropped triggers.
+    """
+    triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table,)
+        ).fetchall()
+    for name, _ in triggers:
+        conn.execute(f'DROP TRIGGER "{name}"')
+    conn.commit()
+    return [sql for _, sql in triggers]
+
+def create_triggers(conn:sqlite3.Connection, statements:list) -> None:
+    """
+    (Re)create triggers from their CREATE TRIGGER statements.
+    """
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+
+def load_csv(conn:sqlite3.Connection, table:str, csv_path:str, chunksize:int=CHUNKSIZE) -> tuple:
+    """
+    Insert a CSV export into a table through a staging table.
+
+    Every chunk is inserted into an unconstrained temporary staging table with executemany and moved into the
+    target table with a single INSERT OR IGNORE ... SELECT, so rows violating a constraint are counted instead of
+    aborting the chunk.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        table (str): Name of the target table.
+        csv_path (str): Location of the CSV file.
+        chunksize (int, optional): Number of rows per chunk. Defaults to CHUNKSIZE.
+
+    Returns:
+        tuple: Number of inserted and number of failed rows.
+    """
+    columns = ', '.join(COLUMNS[table])
+    placeholders = ', '.join(['?'] * len(COLUMNS[table]))
+    staging = f"staging_{table}"
+
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.execute(f"CREATE TEMP TABLE {staging} AS SELECT {columns} FROM {table} WHERE 0")
+
+    success, failed = 0, 0
+    with tqdm(desc=table, unit='rows') as progress:
+        for chunk in read_chunks(csv_path=csv_path, table=table, chunksize=chunksize):
+            conn.executemany(f"INSERT INTO temp.{staging} ({columns}) VALUES ({placeholders})", to_records(chunk))
+            inserted = conn.execute(f"INSERT OR IGNORE INTO {table} ({columns}) SELECT {columns} FROM temp.{staging}").rowcount
+            conn.execute(f"DELETE FROM temp.{staging}")
+            conn.commit()
+
+            success += inserted
+            failed += len(chunk) - inserted
+            progress.update(len(chunk))
+
+    conn.execute(f"DROP TABLE temp.{staging}")
+    conn.commit()
+    return success, failed
+
+def bulk_load(conn:sqlite3.Connection, data_dir:str, tables:list=TABLES, files:dict=CSV_FILES, chunksize:int=CHUNKSIZE) -> dict:
+    """
+    Load the CSV exports into the database, building secondary indexes only after the rows are in.
+    Triggers are dropped during the load as well; the lot statistics they maintain are rebuilt in one pass afterwards.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        data_dir (str): Directory containing the CSV files.
+        tables (list, optional): Tables to load, in load order. Defaults to TABLES.
+        files (dict, optional): CSV file name per table. Defaults to CSV_FILES.
+        chunksize (int, optional): Number of rows per chunk. Defaults to CHUNKSIZE.
+
+    Returns:
+        dict: (Success, Failed) counts per table.
+    """
+    previous = set_pragmas(conn, IMPORT_PRAGMAS)
+    results = {}
+    start = time.perf_counter()
+    try:
+        for table in tables:
+            table_start = time.perf_counter()
+            indexes = drop_secondary_indexes(conn, table)
+            triggers = drop_triggers(conn, table)
+            try:
+                success, failed = load_csv(conn=conn, table=table, csv_path=os.path.join(data_dir, files[table]), chunksize=chunksize)
+            finally:
+                create_indexes(conn, indexes)
+                create_triggers(conn, triggers)
+                if table == 'bids' and triggers:
+                    _lotstats.backfill(conn)
+            results[table] = (success, failed)
+
+            seconds = time.perf_counter() - table_start
+            print(f'--- Finished upload {table} data. ---')
+            print(f'\t ({success}/{failed}) (Success/Failed) in {seconds:.1f}s ({(success + failed) / seconds:,.0f} rows/s) \n')
+    finally:
+        set_pragmas(conn, previous)
+
+    total = sum(success + failed for success, failed in results.values())
+    seconds = time.perf_counter() - start
+    print(f'--- Loaded {total:,} rows in {seconds:.1f}s ({total / seconds:,.0f} rows/s) ---')
+    return results
@@ -0,0 +1,77 @@
+import collections
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Thread-safe bounded least-recently-used cache with an optional time to live and hit/miss counters.
+    """
+    _MISSING = object()
+
+    def __init__(self, maxsize:int=1024, ttl:float=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default when it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value) -> None:
+        """
+        Store value under key, evicting the least recently used entry when the cache is full.
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Remove key from the cache and return its value, or default when it was not cached.
+        """
+        with self._lock:
+            entry = self._data.pop(key, self._MISSING)
+            return default if entry is self._MISSING else entry[0]
+
+    def clear(self) -> None:
+        """
+        Remove all entries. The hit and miss counters are kept.
+        """
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """
+        Return the size and hit/miss counters of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': self.hits / lookups if lookups else 0.0
+                }
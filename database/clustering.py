@@ -0,0 +1,124 @@
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+
+CACHE_DIR = "./src/SavedModels/elbow/"
+MODES = ['full', 'minibatch', 'subsample']
+
+
+def cache_key(X:np.ndarray, params:dict) -> str:
+    """
+    Hash of the input matrix and the fit parameters, identifying cached fits.
+    """
+    return joblib.hash((np.ascontiguousarray(X), sorted(params.items())))
+
+def fit_kmeans(X:np.ndarray, k:int, mode:str='full', n_init:int=10, batch_size:int=4096, sample_size:int=100000,
+               random_state:int=0) -> dict:
+    """
+    Fit a single KMeans candidate and report its inertia on the full matrix.
+
+    Args:
+        X (np.ndarray): Scaled data to cluster.
+        k (int): Number of clusters.
+        mode (str, optional): 'full' (KMeans on all rows), 'minibatch' (MiniBatchKMeans on all rows) or 'subsample'
+            (KMeans on sample_size random rows). Defaults to 'full'.
+        n_init (int, optional): Number of initialisations. Defaults to 10.
+        batch_size (int, optional): Batch size in minibatch mode. Defaults to 4096.
+        sample_size (int, optional): Number of rows fitted in subsample mode. Defaults to 100000.
+        random_state (int, optional): Seed of the initialisation and the subsample. Defaults to 0.
+
+    Returns:
+        dict: Number of clusters, inertia, centroids and fit time in seconds.
+    """
+    start = time.perf_counter()
+    if mode == 'minibatch':
+        model = MiniBatchKMeans(n_clusters=k, n_init=n_init, batch_size=batch_size, random_state=random_state).fit(X)
+    elif mode == 'subsample' and len(X) > sample_size:
+        sample = np.random.default_rng(random_state).choice(len(X), size=sample_size, replace=False)
+        model = KMeans(n_clusters=k, n_init=n_init, random_state=random_state).fit(X[sample])
+    else:
+        model = KMeans(n_clusters=k, n_init=n_init, random_state=random_state).fit(X)
+
+    # Inertia over all rows, so the curves of the different modes are comparable
+    inertia = model.inertia_ if mode == 'full' else -model.score(X)
+    return {'k': k, 'inertia': float(inertia), 'centroids': model.cluster_centers_, 'seconds': time.perf_counter() - start}
+
+def find_elbow(ks:list, inertias:list) -> int:
+    """
+    Return the k at the elbow: the point of the normalised curve furthest below the line between its first and last point.
+    """
+    if len(ks) < 3:
+        return ks[0]
+    x = np.asarray(ks, dtype=float)
+    y = np.asarray(inertias, dtype=float)
+    x = (x - x[0]) / (x[-1] - x[0])
+    y = (y - y[-1]) / (y[0] - y[-1]) if y[0] != y[-1] else np.zeros_like(y)
+    # Distance to the line from (0, 1) to (1, 0) of the decreasing, normalised curve
+    return ks[int(np.argmax(1 - x - y))]
+
+def _cache_path(cache_dir:str, key:str, k:int) -> str:
+    return os.path.join(cache_dir, f"{key}-k{k}.joblib")
+
+def _store(path:str, fit:dict) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(fit, tmp)
+    os.replace(tmp, path)
+
+def elbow_method(X:np.ndarray, ks=range(1, 11), mode:str='full', n_jobs:int=-1, cache_dir:str=CACHE_DIR, **params) -> dict:
+    """
+    Fit KMeans for every candidate number of clusters in parallel processes and pick the elbow of the inertia curve.
+
+    Fits are cached on disk per k, keyed by a hash of the matrix and the parameters, so re-running (or extending the
+    range of k) only fits the missing candidates.
+
+    Args:
+        X (np.ndarray): Scaled data to cluster.
+        ks (iterable, optional): Candidate numbers of clusters. Defaults to 1 up to 10.
+        mode (str, optional): Fit mode, see fit_kmeans; use 'minibatch' or 'subsample' for millions of rows. Defaults to 'full'.
+        n_jobs (int, optional): Number of processes, -1 for all cores. Defaults to -1.
+        cache_dir (str, optional): Directory of the cached fits, None disables caching. Defaults to CACHE_DIR.
+        **params: Further arguments of fit_kmeans (n_init, batch_size, sample_size, random_state).
+
+    Raises:
+        ValueError: Unknown mode.
+
+    Returns:
+        dict: Chosen k, and per candidate k the inertia, fit time in seconds, whether it came from the cache and the centroids.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode}, choose from {', '.join(MODES)}")
+    ks = sorted(ks)
+    X = np.asarray(X, dtype=np.float64)
+
+    fits = {}
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        key = cache_key(X, {'mode': mode, **params})
+        for k in ks:
+            try:
+                fits[k] = dict(joblib.load(_cache_path(cache_dir, key, k)), cached=True)
+            except (OSError, EOFError):
+                pass
+
+    # The loky backend memory maps large matrices into the workers instead of pickling a copy per fit
+    missing = [k for k in ks if k not in fits]
+    for fit in joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(fit_kmeans)(X, k, mode=mode, **params) for k in missing
+    ):
+        if cache_dir is not None:
+            _store(_cache_path(cache_dir, key, fit['k']), fit)
+        fits[fit['k']] = dict(fit, cached=False)
+
+    inertias = [fits[k]['inertia'] for k in ks]
+    return {
+        'k': find_elbow(ks, inertias),
+        'ks': ks,
+        'inertias': inertias,
+        'seconds': [fits[k]['seconds'] for k in ks],
+        'cached': [fits[k]['cached'] for k in ks],
+        'centroids': {k: fits[k]['centroids'] for k in ks}
+        }
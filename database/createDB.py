@@ -2,12 +2,22 @@ import sqlalchemy as _sql
 import sqlalchemy.ext.declarative as _declarative
 import sqlite3
 
-from tqdm import tqdm
 import pandas as pd
+from pandas.api.types import union_categoricals
 import os
 
+import database.bulkload as _bulkload
+import database.database as _database
+import database.lotstats as _lotstats
+import database.snapshot as _snapshot
+import database.sync as _sync
+
+# Low-cardinality string columns, stored as categoricals instead of Python strings.
+CATEGORICAL_COLUMNS = ('branchCategory', 'mainCategory', 'countryCode')
+CHUNKSIZE = 100000
+
 class Database:
-    def __init__(self, db_name="AuctionData.db", overwrite_db=False):
+    def __init__(self, db_name="AuctionData.db", overwrite_db=False, sync_data=False):
         # Initialize all database variables and directory references
         self.directory = 'DatacationDay22'
         self.db_name = db_name
@@ -15,6 +25,7 @@ class Database:
         self.data_dir = os.path.join(os.getcwd().split(self.directory)[0], self.directory, "data")
         self.database_location = os.path.join(self.working_dir, self.db_name)
         self.SQLALCHEMY_DATABASE_URL = f"sqlite:///{self.database_location}"
+        self.snapshot_dir = os.path.join(self.working_dir, f"{os.path.splitext(self.db_name)[0]}.snapshot")
 
         # Only create new database if it either not exists or it is explicitly said to be overwritten.
         if not os.path.exists(self.database_location) or overwrite_db:
@@ -22,20 +33,12 @@ class Database:
             # Create database object with Auction, Lots en Bids tables
             self.create_database()
 
-            # Define tables, datasets and insertion queries and push data into sql database
-            self.tables = ['auctions', 'lots', 'bids']
-            self.dfs = {
-                'auctions': 'auctions.csv',
-                'lots': 'lots.csv',
-                'bids': 'bids.csv'
-                }
-            self.queries = {
-                'auctions': '''INSERT INTO auctions(id, relatedCompany, auctionStart, auctionEnd, branchCategory) VALUES(?,?,?,?,?) ''',
-                'lots': '''INSERT INTO lots(countryCode, saleDate, auctionID, lotNr, suffix, numberOfItems, buyerAccountID, estimatedValue, startingBid, reserveBid, currentBid, VAT, mainCategory, sold) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-                'bids': '''INSERT INTO bids(auctionID, lotNr, bidNr, lotID, isCombination, accountID, isCompany, bidPrice, biddingDateTime, closingDateTime) VALUES (?,?,?,?,?,?,?,?,?,?)'''
-            }
             self.push_data()
 
+        # Otherwise, incrementally apply the (delta) exports in the data directory when requested.
+        elif sync_data:
+            self.sync_data()
+
     def setup_environment(self) -> None:
         """
         Create the database engine and the declarative base.
@@ -54,43 +57,47 @@ class Database:
         """
         Initiate tables that comprise the database.
         """
+        # Same index layout as database/models.py, designed around the queries in services.py.
         class Auction(self.Base):
             __tablename__ = "auctions"
-            id = _sql.Column(_sql.Integer, primary_key=True, index=True)
-            relatedCompany = _sql.Column(_sql.String, index=True)
-            auctionStart = _sql.Column(_sql.DateTime, index=True)
-            auctionEnd = _sql.Column(_sql.DateTime, index=True)
-            branchCategory = _sql.Column(_sql.String, index=True)
+            id = _sql.Column(_sql.Integer, primary_key=True)
+            relatedCompany = _sql.Column(_sql.String)
+            auctionStart = _sql.Column(_sql.DateTime)
+            auctionEnd = _sql.Column(_sql.DateTime)
+            branchCategory = _sql.Column(_sql.String)
 
         class Lots(self.Base):
             __tablename__ = "lots"
-            countryCode = _sql.Column(_sql.String, index=True)
-            saleDate = _sql.Column(_sql.DateTime, index=True)
+            countryCode = _sql.Column(_sql.String)
+            saleDate = _sql.Column(_sql.DateTime)
             auctionID = _sql.Column(_sql.Integer, _sql.ForeignKey("auctions.id"), primary_key=True)
-            lotNr = _sql.Column(_sql.Integer, primary_key=True, index=True)
-            suffix = _sql.Column(_sql.String, index=True)
-            numberOfItems = _sql.Column(_sql.Integer, index=True)
-            buyerAccountID = _sql.Column(_sql.Integer, index=True)
-            estimatedValue = _sql.Column(_sql.Float, index=True)
-            startingBid = _sql.Column(_sql.Float, index=True)
-            reserveBid = _sql.Column(_sql.Float, index=True)
-            currentBid = _sql.Column(_sql.Float, index=True)
-            VAT = _sql.Column(_sql.Integer, index=True)
-            mainCategory = _sql.Column(_sql.String, index=True)
-            sold = _sql.Column(_sql.Boolean, index=True)
+            lotNr = _sql.Column(_sql.Integer, primary_key=True)
+            suffix = _sql.Column(_sql.String)
+            numberOfItems = _sql.Column(_sql.Integer)
+            buyerAccountID = _sql.Column(_sql.Integer)
+            estimatedValue = _sql.Column(_sql.Float)
+            startingBid = _sql.Column(_sql.Float)
+            reserveBid = _sql.Column(_sql.Float)
+            currentBid = _sql.Column(_sql.Float)
+            VAT = _sql.Column(_sql.Integer)
+            mainCategory = _sql.Column(_sql.String)
+            sold = _sql.Column(_sql.Boolean)
 
         class Bids(self.Base):
             __tablename__ = "bids"
+            __table_args__ = (
+                _sql.Index("ix_bids_biddingDateTime", "biddingDateTime"),
+            )
             auctionID = _sql.Column(_sql.Integer, _sql.ForeignKey("lots.auctionID"), primary_key=True)
             lotNr = _sql.Column(_sql.Integer, _sql.ForeignKey("lots.lotNr"), primary_key=True)
-            bidNr = _sql.Column(_sql.Integer, primary_key=True, index=True)
-            lotID = _sql.Column(_sql.Integer, index=True)
-            isCombination = _sql.Column(_sql.Boolean, index=True)
-            accountID = _sql.Column(_sql.Integer, index=True)
-            isCompany = _sql.Column(_sql.Boolean, index=True)
-            bidPrice = _sql.Column(_sql.Float, index=True)
-            biddingDateTime = _sql.Column(_sql.DateTime, index=True)
-            closingDateTime = _sql.Column(_sql.DateTime, index=True)
+            bidNr = _sql.Column(_sql.Integer, primary_key=True)
+            lotID = _sql.Column(_sql.Integer)
+            isCombination = _sql.Column(_sql.Boolean)
+            accountID = _sql.Column(_sql.Integer)
+            isCompany = _sql.Column(_sql.Boolean)
+            bidPrice = _sql.Column(_sql.Float)
+            biddingDateTime = _sql.Column(_sql.DateTime)
+            closingDateTime = _sql.Column(_sql.DateTime)
 
     def create_database(self) -> None:
         """ 
@@ -100,58 +107,227 @@ class Database:
         self.initiate_tables()
         self.Base.metadata.create_all(bind=self.engine)
 
-    def push_data(self) -> None:
+        # Lot statistics are maintained by triggers on the bids table
+        conn = sqlite3.connect(self.database_location)
+        _lotstats.create_triggers(conn)
+        conn.commit()
+        conn.close()
+
+    def push_data(self, chunksize:int=_bulkload.CHUNKSIZE) -> None:
         """
-        Create connection to SQLite database, insert data and close database connection.
+        Create connection to SQLite database, bulk insert the csv data and close database connection.
+
+        Args:
+            chunksize (int, optional): Number of csv rows inserted per chunk. Defaults to _bulkload.CHUNKSIZE.
         """
         # Create database connection
         conn = sqlite3.connect(self.database_location)
-        cur = conn.cursor()
 
-        # Loop over csv files containing the data and insert them into the database
-        for table in self.tables:
-            df = pd.read_csv(os.path.join(self.data_dir, self.dfs[table]))
-            err_cntr = 0
-            for idx, data in tqdm(df.iterrows(), total=df.shape[0]):
-                try:
-                    cur.execute(self.queries[table], data)
-
-                    # Only commit every 100.000 records to lower computation time.
-                    if idx%100000 == 0:
-                        conn.commit()
-
-                # If not possible to insert data, integrity error is found.
-                except sqlite3.IntegrityError:
-                    err_cntr += 1
-
-            # Execute final commit to ensure all data is pushed to the database
-            conn.commit()
-            
-            print(f'--- Finished upload {table} data. ---')
-            print(f'\t ({len(df)-err_cntr}/{err_cntr}) (Success/Failed) \n')
-        
+        # Stream the csv files into the database, secondary indexes are rebuilt after each table is loaded.
+        _bulkload.bulk_load(conn=conn, data_dir=self.data_dir, chunksize=chunksize)
+
         # Close database connection
         conn.close()
 
-    def execute_query(self, query:str) -> pd.DataFrame:
+    @property
+    def read_engine(self):
+        """
+        Engine with the pool of tuned read-only connections used by execute_query, created on first use.
+        """
+        if getattr(self, '_read_engine', None) is None:
+            self._read_engine = _database.create_engine_profile(self.database_location, readonly=True)
+        return self._read_engine
+
+    def sync_data(self, data_dir:str=None, force:bool=False) -> dict:
         """
-        Establish database connection, execute the query and close database connection.
+        Incrementally synchronise the existing database with the (delta) csv exports, keeping it readable meanwhile.
 
         Args:
-            query (str): String representation of the query to be executed.
+            data_dir (str, optional): Directory containing the csv exports. Defaults to the data directory.
+            force (bool, optional): Synchronise files even if their content did not change since the last sync. Defaults to False.
 
         Returns:
-            pd.DataFrame: Output of the executed query formatted in a DataFrame.
+            dict: Number of new, changed and skipped rows per table.
         """
-        # Execute query and retrieve results
         conn = sqlite3.connect(self.database_location)
-        cursor = conn.execute(query)
-        data = cursor.fetchall()
+        try:
+            return _sync.sync(conn=conn, data_dir=data_dir or self.data_dir, force=force)
+        finally:
+            conn.close()
 
-        # Transform results into DataFrame
-        cols = list(map(lambda x: x[0], cursor.description))
-        data = pd.DataFrame(data, columns=cols)
+    def iter_query(self, query:str, params=None, chunksize:int=CHUNKSIZE, dtypes:dict=None, parse_dates=None,
+                   categories=CATEGORICAL_COLUMNS, readonly:bool=True):
+        """
+        Execute the query on a pooled read-only connection and yield the results as typed DataFrames of chunksize rows.
 
-        # Close database connection an return query results
-        conn.close()
-        return data
\ No newline at end of file
+        Only one chunk of raw rows is held at a time, each chunk is converted to its final dtypes before the next is fetched.
+        With readonly disabled the query runs on a writable connection and is committed, for DDL and DML statements.
+
+        Args:
+            query (str): String representation of the query to be executed, with ? placeholders for bound parameters.
+            params (tuple | dict, optional): Parameters bound to the query. Defaults to None.
+            chunksize (int, optional): Number of rows per DataFrame. Defaults to CHUNKSIZE.
+            dtypes (dict, optional): Dtype per column, e.g. {'bidPrice': 'float32'}. Defaults to None.
+            parse_dates (list | dict, optional): Columns parsed to datetimes, or a dict mapping columns to their format. Defaults to None.
+            categories (tuple, optional): Columns stored as categoricals. Defaults to CATEGORICAL_COLUMNS.
+            readonly (bool, optional): Run on the read-only pool, which rejects statements that write. Defaults to True.
+
+        Yields:
+            pd.DataFrame: Next chunk of the query results, a single empty frame if there are none.
+        """
+        conn = self.read_engine.raw_connection() if readonly else sqlite3.connect(self.database_location)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params or ())
+            if cursor.description is None:
+                # A statement without result rows (e.g. CREATE, INSERT or UPDATE)
+                if not readonly:
+                    conn.commit()
+                yield pd.DataFrame()
+                return
+            cols = list(map(lambda x: x[0], cursor.description))
+            empty = True
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                empty = False
+                yield self._typed_frame(rows, cols, dtypes, parse_dates, categories)
+            if empty:
+                # An empty result still yields one (empty) frame carrying the columns
+                yield pd.DataFrame(columns=cols)
+            cursor.close()
+            if not readonly:
+                conn.commit()
+        finally:
+            # Return database connection to the pool, also when the caller stops iterating early
+            conn.close()
+
+    @staticmethod
+    def _typed_frame(rows:list, cols:list, dtypes:dict=None, parse_dates=None, categories=None) -> pd.DataFrame:
+        data = pd.DataFrame.from_records(rows, columns=cols)
+        if isinstance(parse_dates, dict):
+            formats = parse_dates
+        else:
+            formats = dict.fromkeys(parse_dates or [])
+        for col, fmt in formats.items():
+            if col in data:
+                # Dates outside the nanosecond range, e.g. the year 1000 saleDate of unsold lots, become NaT
+                data[col] = pd.to_datetime(data[col], format=fmt, errors='coerce')
+        for col in categories or []:
+            if col in data:
+                data[col] = data[col].astype('category')
+        if dtypes:
+            data = data.astype({col: dtype for col, dtype in dtypes.items() if col in data})
+        return data
+
+    def execute_query(self, query:str, params=None, chunksize:int=None, dtypes:dict=None, parse_dates=None, categories=None,
+                      readonly:bool=True):
+        """
+        Borrow a read-only database connection, execute the query and return the connection to the pool. Statements
+        that write (CREATE, INSERT, UPDATE, ...) are rejected by the read-only connections; run those with readonly=False.
+
+        Without the optional arguments this returns the plain DataFrame it always did. Large results are read chunk by
+        chunk and typed as they are read, see iter_query.
+
+        Args:
+            query (str): String representation of the query to be executed, with ? placeholders for bound parameters.
+            params (tuple | dict, optional): Parameters bound to the query. Defaults to None.
+            chunksize (int, optional): Return an iterator of DataFrames of this many rows instead of one DataFrame. Defaults to None.
+            dtypes (dict, optional): Dtype per column. Defaults to None.
+            parse_dates (list | dict, optional): Columns parsed to datetimes, or a dict mapping columns to their format. Defaults to None.
+            categories (tuple, optional): Columns stored as categoricals, e.g. CATEGORICAL_COLUMNS. Defaults to None.
+            readonly (bool, optional): Run on the read-only pool; disable to write on a committed connection. Defaults to True.
+
+        Returns:
+            pd.DataFrame: Output of the executed query formatted in a DataFrame, or an iterator of DataFrames if chunksize is given.
+        """
+        if chunksize is not None:
+            return self.iter_query(query, params=params, chunksize=chunksize, dtypes=dtypes, parse_dates=parse_dates,
+                                   categories=categories, readonly=readonly)
+
+        chunks = list(self.iter_query(query, params=params, dtypes=dtypes, parse_dates=parse_dates, categories=categories,
+                                      readonly=readonly))
+        if len(chunks) == 1:
+            return chunks[0]
+
+        # Chunks carry their own categories, align them so the concatenated columns stay categorical
+        for col in chunks[0].columns:
+            if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+                union = union_categoricals([chunk[col] for chunk in chunks]).categories
+                for chunk in chunks:
+                    chunk[col] = chunk[col].cat.set_categories(union)
+        return pd.concat(chunks, ignore_index=True)
+
+    def _data_version(self) -> int:
+        # PRAGMA data_version changes when another connection commits, as long as the same connection is asked.
+        if getattr(self, '_version_conn', None) is None:
+            self._version_conn = sqlite3.connect(f"file:{self.database_location}?mode=ro", uri=True, check_same_thread=False)
+        return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_tables(self, tables:list=_snapshot.TABLES, refresh:bool=False) -> dict:
+        """
+        Load the tables from the columnar snapshot next to the database, (re)building it from the database when it is
+        missing or the database changed since it was taken.
+
+        Snapshot columns are memory mapped, so loading is near instant and the tables share the page cache across
+        processes. Frames loaded from the snapshot are read-only, take a copy before modifying them in place.
+
+        Args:
+            tables (list, optional): Tables to load. Defaults to auctions, lots and bids.
+            refresh (bool, optional): Rebuild the snapshot even if it is up to date. Defaults to False.
+
+        Returns:
+            dict: DataFrame per table, with parsed datetimes and categorical string columns.
+        """
+        key = _snapshot.database_key(self.database_location)
+        version = self._data_version()
+        if refresh or (key, version) != getattr(self, '_snapshot_state', None):
+            self._snapshot_state = (key, version)
+            self._snapshot_frames = {}
+
+        manifest = _snapshot.read_manifest(self.snapshot_dir)
+        if refresh or manifest is None or manifest['key'] != key:
+            manifest = {'key': key, 'tables': {}}
+        changed = False
+
+        for table in tables:
+            if table in self._snapshot_frames:
+                continue
+            entry = manifest['tables'].get(table)
+            if entry is not None:
+                try:
+                    self._snapshot_frames[table] = _snapshot.read_table(self.snapshot_dir, entry)
+                    continue
+                except (OSError, ValueError):
+                    # Folder removed by a concurrent rebuild or an unloadable column file, take the snapshot again
+                    pass
+
+            conn = self.read_engine.raw_connection()
+            try:
+                kinds = _snapshot.column_kinds(conn, table)
+            finally:
+                conn.close()
+            frame = self.execute_query(
+                f"SELECT * FROM {table}",
+                parse_dates=[column for column, kind in kinds.items() if kind == 'datetime'],
+                categories=[column for column, kind in kinds.items() if kind == 'category']
+                )
+            self._snapshot_frames[table] = frame
+
+            # Only store the snapshot if the database did not change while it was read
+            if _snapshot.database_key(self.database_location) == key:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                manifest['tables'][table] = _snapshot.write_table(frame, self.snapshot_dir, table, key)
+                changed = True
+
+        if changed:
+            _snapshot.write_manifest(self.snapshot_dir, manifest)
+            _snapshot.remove_stale(self.snapshot_dir, manifest)
+        return {table: self._snapshot_frames[table] for table in tables}
+
+    def load_table(self, table:str, refresh:bool=False) -> pd.DataFrame:
+        """
+        Load a single table from the columnar snapshot, see load_tables.
+        """
+        return self.load_tables([table], refresh=refresh)[table]
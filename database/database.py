@@ -1,22 +1,85 @@
 import sqlalchemy as _sql
 import sqlalchemy.ext.declarative as _declarative
 import sqlalchemy.orm as _orm
+import sqlalchemy.pool as _pool
+import sqlite3
 import os
 
 working_dir = os.path.join(os.getcwd().split('DatacationDay2022')[0], "DatacationDay2022", "src")
 db_name = "AuctionData.db"
-DB_LOC = os.path.join(working_dir, db_name) 
+DB_LOC = os.path.join(working_dir, db_name)
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_LOC}"
 
-engine = _sql.create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# Connection settings applied to every new connection of an engine, per profile.
+ENGINE_PROFILES = {
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',  # readers and the writer no longer block each other
+        'synchronous': 'NORMAL',  # durable in WAL mode, without an fsync per commit
+        'mmap_size': 268435456,  # 256 MiB of the database file memory mapped
+        'cache_size': -65536,  # 64 MiB page cache per connection
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+        }
+    }
+# Settings that are persistent or change the file cannot be applied on read-only connections.
+_WRITE_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+ENGINE_PROFILE = os.environ.get("AUCTION_DB_PROFILE", "tuned")
+# Connections of the read-only pool, also the default number of read workers of the async request path (database/aio.py).
+READ_POOL_SIZE = int(os.environ.get("AUCTION_READ_POOL_SIZE", 8))
+
+def create_engine_profile(location:str, profile:str=ENGINE_PROFILE, readonly:bool=False, pool_size:int=None, max_overflow:int=None):
+    """
+    Create an engine for the SQLite database at the given location, with the PRAGMAs of the profile applied on connect.
+
+    Args:
+        location (str): Location of the database file.
+        profile (str, optional): Name of the profile in ENGINE_PROFILES. Defaults to ENGINE_PROFILE.
+        readonly (bool, optional): Open the database read-only with a separate pool of reader connections. Defaults to False.
+        pool_size (int, optional): Number of pooled connections. Defaults to 8 for readers and 1 for the writer.
+        max_overflow (int, optional): Connections allowed on top of the pool size. Defaults to 8 for readers and 2 for the writer.
+
+    Returns:
+        Engine: The configured engine.
+    """
+    pragmas = dict(ENGINE_PROFILES[profile])
+    if readonly:
+        pragmas = {pragma: value for pragma, value in pragmas.items() if pragma not in _WRITE_ONLY_PRAGMAS}
+        pragmas['query_only'] = 'ON'
+
+    def connect():
+        if readonly:
+            return sqlite3.connect(f"file:{location}?mode=ro", uri=True, check_same_thread=False)
+        return sqlite3.connect(location, check_same_thread=False)
+
+    engine = _sql.create_engine(
+        "sqlite://",
+        creator=connect,
+        poolclass=_pool.QueuePool,
+        pool_size=pool_size if pool_size is not None else (8 if readonly else 1),
+        max_overflow=max_overflow if max_overflow is not None else (8 if readonly else 2)
+    )
+
+    @_sql.event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        for pragma, value in pragmas.items():
+            dbapi_connection.execute(f"PRAGMA {pragma}={value}")
+
+    return engine
+
+engine = create_engine_profile(DB_LOC)
+read_engine = create_engine_profile(DB_LOC, readonly=True, pool_size=READ_POOL_SIZE)
 
 SessionLocal = _orm.sessionmaker(
-    autocommit=False, 
-    autoflush=False, 
+    autocommit=False,
+    autoflush=False,
     bind=engine
 )
 
-Base = _declarative.declarative_base()
\ No newline at end of file
+ReadSessionLocal = _orm.sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
+Base = _declarative.declarative_base()
@@ -0,0 +1,202 @@
+import csv
+import datetime as _dt
+import io
+import json
+
+import sqlalchemy as _sql
+
+import database.database as _database
+import database.models as _models
+
+try:
+    import pyarrow as _pa
+except ImportError:  # Arrow export is optional
+    _pa = None
+
+
+MODELS = {
+    'auctions': _models.Auction,
+    'lots': _models.Lots,
+    'bids': _models.Bids
+    }
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream'
+    }
+BATCHSIZE = 10000
+
+
+def table_columns(table:str) -> list:
+    """
+    Return the exportable columns of the given table, in table order.
+    """
+    return [column.name for column in MODELS[table].__table__.columns]
+
+def _column_types(table:str, columns:list) -> list:
+    types = MODELS[table].__table__.columns
+    return [types[column].type for column in columns]
+
+def build_query(table:str, columns:list=None, auctionID:int=None, lotNr:int=None,
+                start:_dt.datetime=None, end:_dt.datetime=None) -> tuple:
+    """
+    Build the export query for the given table, projection and filters.
+
+    Args:
+        table (str): Table to export.
+        columns (list, optional): Columns to export. Defaults to all columns.
+        auctionID (int, optional): Only export records of this auction. Defaults to None.
+        lotNr (int, optional): Only export records of this lot. Defaults to None.
+        start (_dt.datetime, optional): Only export bids placed at or after this time. Defaults to None.
+        end (_dt.datetime, optional): Only export bids placed before this time. Defaults to None.
+
+    Raises:
+        ValueError: Unknown table or column, or a filter that does not apply to the table.
+
+    Returns:
+        tuple: SQL statement, its parameters and the exported columns.
+    """
+    if table not in MODELS:
+        raise ValueError(f"Unknown table {table}")
+    available = table_columns(table)
+    columns = columns or available
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {', '.join(unknown)}")
+
+    conditions, params = [], []
+    if auctionID is not None:
+        conditions.append(f"{'id' if table == 'auctions' else 'auctionID'} = ?")
+        params.append(auctionID)
+    if lotNr is not None:
+        if table == 'auctions':
+            raise ValueError("lotNr filter does not apply to auctions")
+        conditions.append("lotNr = ?")
+        params.append(lotNr)
+    if start is not None or end is not None:
+        if table != 'bids':
+            raise ValueError("Time range filter only applies to bids")
+        if start is not None:
+            conditions.append("biddingDateTime >= ?")
+            params.append(str(start))
+        if end is not None:
+            conditions.append("biddingDateTime < ?")
+            params.append(str(end))
+
+    statement = f"SELECT {', '.join(columns)} FROM {table}"
+    if conditions:
+        statement += f" WHERE {' AND '.join(conditions)}"
+    return statement, params, columns
+
+def iter_batches(statement:str, params:list, batchsize:int=BATCHSIZE):
+    """
+    Execute the statement on a raw pooled connection and yield the result in batches of tuples, without ORM hydration.
+
+    The sqlite3 cursor steps through the result lazily, so only one batch is held in memory at a time.
+    """
+    conn = _database.read_engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(statement, params)
+        while True:
+            batch = cursor.fetchmany(batchsize)
+            if not batch:
+                break
+            yield batch
+        cursor.close()
+    finally:
+        conn.close()
+
+def _converters(types:list) -> list:
+    # SQLite stores booleans as 0/1; everything else is exported as stored.
+    return [bool if isinstance(kind, _sql.Boolean) else None for kind in types]
+
+def _convert(row:tuple, converters:list) -> list:
+    return [value if convert is None or value is None else convert(value) for value, convert in zip(row, converters)]
+
+def stream_ndjson(batches, columns:list, types:list):
+    """
+    Yield the batches as newline delimited JSON, one object per record.
+    """
+    converters = _converters(types)
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, _convert(row, converters))), separators=(',', ':')) + '\n' for row in batch
+            ).encode()
+
+def stream_csv(batches, columns:list, types:list):
+    """
+    Yield the batches as CSV, starting with a header row.
+    """
+    converters = _converters(types)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(_convert(row, converters) for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def arrow_schema(columns:list, types:list):
+    """
+    Map the exported columns onto an Arrow schema. Datetimes are exported as the text SQLite stores them.
+    """
+    mapping = []
+    for column, kind in zip(columns, types):
+        if isinstance(kind, _sql.Boolean):
+            mapping.append((column, _pa.bool_()))
+        elif isinstance(kind, _sql.Integer):
+            mapping.append((column, _pa.int64()))
+        elif isinstance(kind, _sql.Float):
+            mapping.append((column, _pa.float64()))
+        else:
+            mapping.append((column, _pa.string()))
+    return _pa.schema(mapping)
+
+def stream_arrow(batches, columns:list, types:list):
+    """
+    Yield the batches as an Arrow IPC stream, one record batch per database batch.
+    """
+    schema = arrow_schema(columns, types)
+    converters = _converters(types)
+    sink = io.BytesIO()
+    with _pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            values = list(zip(*(_convert(row, converters) for row in batch)))
+            writer.write_batch(_pa.record_batch(
+                [_pa.array(column, type=field.type) for column, field in zip(values, schema)], schema=schema
+                ))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+STREAMS = {
+    'ndjson': stream_ndjson,
+    'csv': stream_csv,
+    'arrow': stream_arrow
+    }
+
+def export(table:str, fmt:str, columns:list=None, auctionID:int=None, lotNr:int=None,
+           start:_dt.datetime=None, end:_dt.datetime=None, batchsize:int=BATCHSIZE):
+    """
+    Return a generator streaming the requested table in the requested format.
+
+    The query is validated before the generator is returned, so errors surface before the response starts.
+
+    Raises:
+        ValueError: Unknown format, table or column, invalid filter, or Arrow requested without pyarrow installed.
+
+    Returns:
+        generator: Encoded chunks of the export.
+    """
+    if fmt not in STREAMS:
+        raise ValueError(f"Unknown format {fmt}, choose from {', '.join(STREAMS)}")
+    if fmt == 'arrow' and _pa is None:
+        raise ValueError("Arrow export requires pyarrow to be installed")
+
+    statement, params, columns = build_query(table=table, columns=columns, auctionID=auctionID, lotNr=lotNr, start=start, end=end)
+    return STREAMS[fmt](iter_batches(statement, params, batchsize), columns, _column_types(table, columns))
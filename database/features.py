@@ -0,0 +1,102 @@
+import datetime as _dt
+import warnings
+
+import numpy as np
+
+
+NUMERIC_COLUMNS = ['numberOfItems', 'estimatedValue', 'startingBid', 'reserveBid', 'auctionDuration']
+
+
+def auction_duration(auctionStart:_dt.datetime, auctionEnd:_dt.datetime) -> int:
+    """
+    Calculate the duration of an auction in whole hours.
+
+    Args:
+        auctionStart (_dt.datetime): The start date and time of the auction.
+        auctionEnd (_dt.datetime): The end date and time of the auction.
+
+    Returns:
+        int: The duration of the auction in hours.
+    """
+    return int((auctionEnd - auctionStart) / _dt.timedelta(hours=1))
+
+def auction_durations(auctionStart, auctionEnd) -> np.ndarray:
+    """
+    Vectorized auction_duration: the duration of every auction in whole hours, truncated the same way.
+
+    Args:
+        auctionStart: Start date and time per auction (datetimes or their ISO text representation).
+        auctionEnd: End date and time per auction.
+
+    Returns:
+        np.ndarray: The durations in hours, as integers.
+    """
+    delta = np.asarray(auctionEnd, dtype='datetime64[us]') - np.asarray(auctionStart, dtype='datetime64[us]')
+    return (delta / np.timedelta64(1, 'h')).astype(np.int64)
+
+def onehotencode(categories:np.ndarray, OHcols:list) -> np.ndarray:
+    """
+    One-hot encode the given categories against the category columns the model was trained with.
+
+    Args:
+        categories (np.ndarray): Category of every row.
+        OHcols (list): Ordered category names the model expects (columns BC_<category>).
+
+    Returns:
+        np.ndarray: Matrix of shape (len(categories), len(OHcols)) holding ones for the matching category.
+    """
+    categories = np.asarray(categories, dtype=object)
+    return (categories[:, None] == np.asarray(OHcols, dtype=object)[None, :]).astype(np.float64)
+
+def build_feature_matrix(numberOfItems, estimatedValue, startingBid, reserveBid, auctionDuration, categories, OHcols:list, scaler) -> np.ndarray:
+    """
+    Build the scaled feature matrix in the column order the starting-bid model was trained on.
+
+    All arguments except OHcols and scaler are array-likes of equal length, one entry per row.
+
+    Args:
+        numberOfItems: The number of items in the concerning lot.
+        estimatedValue: The estimated values of the items comprising the lot.
+        startingBid: The candidate starting bid.
+        reserveBid: The minimal amount accepted as a sale by the seller.
+        auctionDuration: The total duration of the auction in hours.
+        categories: The category used for the one-hot encoding.
+        OHcols (list): Ordered category names the model expects.
+        scaler: Fitted scaler for the numeric columns.
+
+    Returns:
+        np.ndarray: Feature matrix ready for model.predict.
+    """
+    numeric = np.column_stack([
+        np.asarray(numberOfItems, dtype=np.float64),
+        np.asarray(estimatedValue, dtype=np.float64),
+        np.asarray(startingBid, dtype=np.float64),
+        np.asarray(reserveBid, dtype=np.float64),
+        np.asarray(auctionDuration, dtype=np.float64),
+        ])
+    with warnings.catch_warnings():
+        # The scaler was fitted on a DataFrame; positional input in the same column order is equivalent.
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        numeric = scaler.transform(numeric)
+    return np.hstack([numeric, onehotencode(categories, OHcols)])
+
+def predict(model, X:np.ndarray) -> np.ndarray:
+    """
+    Run model.predict on a positional feature matrix.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict(X)
+
+def predict_proba(model, X:np.ndarray, positive:float=1.0) -> np.ndarray:
+    """
+    Return the predicted probability of the positive (sale) class for every row of a positional feature matrix.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        probabilities = model.predict_proba(X)
+    classes = list(model.classes_)
+    if positive not in classes:
+        # The model never saw a sale during training
+        return np.zeros(len(X))
+    return probabilities[:, classes.index(positive)]
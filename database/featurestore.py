@@ -0,0 +1,228 @@
+import threading
+
+import numpy as np
+
+import database.database as _database
+
+
+# Bidder behaviour features of the clustering pipeline in src/Main.ipynb (create_bid_statistic).
+FEATURES = ['NOB', 'ABP', 'HBP', 'TOE', 'TOX']
+KEY = ['auctionID', 'lotNr', 'accountID']
+
+_BIDDER_AGGREGATE = """
+    SELECT auctionID, lotNr, accountID, COUNT(bidPrice), SUM(bidPrice), MAX(bidPrice), MIN(biddingDateTime), MAX(biddingDateTime)
+    FROM bids
+    GROUP BY auctionID, lotNr, accountID
+    ORDER BY auctionID, lotNr, accountID"""
+_LOT_AGGREGATE = """
+    SELECT auctionID, lotNr, MIN(biddingDateTime), MAX(closingDateTime)
+    FROM bids
+    GROUP BY auctionID, lotNr
+    ORDER BY auctionID, lotNr"""
+_NEW_BIDS = """
+    SELECT rowid, auctionID, lotNr, accountID, bidPrice, biddingDateTime, closingDateTime
+    FROM bids
+    WHERE rowid > ?
+    ORDER BY rowid"""
+
+
+def to_seconds(values) -> np.ndarray:
+    """
+    Convert datetimes (or their SQLite text representation) to float seconds since the epoch, NaN for missing values.
+    """
+    stamps = np.asarray(values, dtype='datetime64[us]')
+    return np.where(np.isnat(stamps), np.nan, stamps.astype(np.int64) / 1e6)
+
+
+class BidderFeatureStore:
+    """
+    In-memory store of the running bid aggregates per (auctionID, lotNr, accountID), from which NOB, ABP, HBP, TOE and
+    TOX are derived on read.
+
+    Aggregates (count, sum, max, first and last bidding time per bidder; first bid and lot ending per lot) are kept in
+    NumPy arrays addressed through a key -> row dict, so a new bid and a point lookup are O(1) and the training matrix is
+    a vectorized read. Bids are applied in rowid order up to a watermark; catch_up applies the bids committed since.
+    """
+    def __init__(self, read_engine=None, capacity:int=1024):
+        self.read_engine = read_engine if read_engine is not None else _database.read_engine
+        self._lock = threading.RLock()
+        self._reset(capacity)
+        self.watermark = None
+
+    def _reset(self, capacity:int) -> None:
+        self._index = {}
+        self._size = 0
+        self._keys = np.zeros((capacity, 3), dtype=np.int64)
+        self._lot = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._sum = np.zeros(capacity, dtype=np.float64)
+        self._max = np.full(capacity, np.nan)
+        self._first = np.full(capacity, np.nan)
+        self._last = np.full(capacity, np.nan)
+
+        self._lotIndex = {}
+        self._lotSize = 0
+        self._lotFirst = np.full(capacity, np.nan)
+        self._lotEnd = np.full(capacity, np.nan)
+
+    def _grow(self, names:list, size:int) -> None:
+        # Double the capacity of the given arrays, new slots take the initial value of their array.
+        for name in names:
+            array = getattr(self, name)
+            if len(array) >= size:
+                continue
+            fill = np.nan if array.dtype == np.float64 and name != '_sum' else 0
+            grown = np.full((max(size, 2 * len(array)),) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _lot_row(self, auctionID:int, lotNr:int) -> int:
+        key = (auctionID, lotNr)
+        row = self._lotIndex.get(key)
+        if row is None:
+            row = self._lotSize
+            self._grow(['_lotFirst', '_lotEnd'], row + 1)
+            self._lotIndex[key] = row
+            self._lotSize += 1
+        return row
+
+    def _row(self, auctionID:int, lotNr:int, accountID:int) -> int:
+        key = (auctionID, lotNr, accountID)
+        row = self._index.get(key)
+        if row is None:
+            row = self._size
+            self._grow(['_keys', '_lot', '_count', '_sum', '_max', '_first', '_last'], row + 1)
+            self._keys[row] = key
+            self._lot[row] = self._lot_row(auctionID, lotNr)
+            self._index[key] = row
+            self._size += 1
+        return row
+
+    def add_bid(self, auctionID:int, lotNr:int, accountID:int, bidPrice:float, biddingDateTime, closingDateTime) -> None:
+        """
+        Apply a single bid to the aggregates of its bidder and lot.
+        """
+        bidding, closing = to_seconds([biddingDateTime, closingDateTime])
+        with self._lock:
+            row = self._row(auctionID, lotNr, accountID)
+            # NOB and ABP count the bids with a price only, as pandas count and mean do in create_bid_statistic
+            if bidPrice is not None:
+                self._count[row] += 1
+                self._sum[row] += bidPrice
+                self._max[row] = np.fmax(self._max[row], bidPrice)
+            self._first[row] = np.fmin(self._first[row], bidding)
+            self._last[row] = np.fmax(self._last[row], bidding)
+
+            lot = self._lot[row]
+            self._lotFirst[lot] = np.fmin(self._lotFirst[lot], bidding)
+            self._lotEnd[lot] = np.fmax(self._lotEnd[lot], closing)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild all aggregates from the bids table. The result only depends on the contents of the table.
+
+        Returns:
+            int: Number of (auctionID, lotNr, accountID) combinations in the store.
+        """
+        conn = self.read_engine.raw_connection()
+        try:
+            # One read transaction, so the aggregates and the watermark describe the same state of the table
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            bidders = cursor.execute(_BIDDER_AGGREGATE).fetchall()
+            lots = cursor.execute(_LOT_AGGREGATE).fetchall()
+            watermark = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM bids").fetchone()[0]
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._reset(max(len(bidders), len(lots), 1))
+            if lots:
+                auctionIDs, lotNrs, lotFirst, lotEnd = zip(*lots)
+                self._lotIndex = {key: row for row, key in enumerate(zip(auctionIDs, lotNrs))}
+                self._lotSize = len(lots)
+                self._lotFirst[:len(lots)] = to_seconds(lotFirst)
+                self._lotEnd[:len(lots)] = to_seconds(lotEnd)
+            if bidders:
+                auctionIDs, lotNrs, accountIDs, count, total, highest, first, last = zip(*bidders)
+                n = len(bidders)
+                self._keys[:n] = np.column_stack([auctionIDs, lotNrs, accountIDs])
+                self._index = {key: row for row, key in enumerate(zip(auctionIDs, lotNrs, accountIDs))}
+                self._lot[:n] = [self._lotIndex[key] for key in zip(auctionIDs, lotNrs)]
+                self._count[:n] = count
+                self._sum[:n] = np.nan_to_num(np.array(total, dtype=np.float64))
+                self._max[:n] = np.array(highest, dtype=np.float64)
+                self._first[:n] = to_seconds(first)
+                self._last[:n] = to_seconds(last)
+                self._size = n
+            self.watermark = watermark
+            return self._size
+
+    def catch_up(self) -> int:
+        """
+        Apply the bids committed since the watermark, rebuilding the store first if it was never loaded.
+
+        Only appended bids are picked up; call rebuild after bids were changed or removed.
+
+        Returns:
+            int: Number of bids applied.
+        """
+        with self._lock:
+            if self.watermark is None:
+                self.rebuild()
+                return 0
+            conn = self.read_engine.raw_connection()
+            try:
+                rows = conn.execute(_NEW_BIDS, (self.watermark,)).fetchall()
+            finally:
+                conn.close()
+            for rowid, auctionID, lotNr, accountID, bidPrice, biddingDateTime, closingDateTime in rows:
+                self.add_bid(auctionID, lotNr, accountID, bidPrice, biddingDateTime, closingDateTime)
+                self.watermark = rowid
+            return len(rows)
+
+    def _features(self, rows) -> np.ndarray:
+        # Derive the features of the given rows, following create_bid_statistic: TOE and TOX are the moments of the first
+        # and last bid relative to the lot window (first bid until lot ending), with values above 1 (or undefined) set to 1.
+        lots = self._lot[rows]
+        duration = self._lotEnd[lots] - self._lotFirst[lots]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            toe = (self._first[rows] - self._lotFirst[lots]) / duration
+            tox = (self._last[rows] - self._lotFirst[lots]) / duration
+            abp = self._sum[rows] / self._count[rows]
+        return np.column_stack([
+            self._count[rows],
+            abp,
+            self._max[rows],
+            np.where(toe <= 1, toe, 1.0),
+            np.where(tox <= 1, tox, 1.0)
+            ])
+
+    def get(self, auctionID:int, lotNr:int, accountID:int) -> dict:
+        """
+        Return the features of one bidder in one lot, or None if the bidder did not bid on the lot.
+        """
+        with self._lock:
+            row = self._index.get((auctionID, lotNr, accountID))
+            if row is None:
+                return None
+            return dict(zip(FEATURES, self._features(np.array([row]))[0].tolist()))
+
+    def matrix(self) -> tuple:
+        """
+        Return the features of all bidders as a matrix, ordered by (auctionID, lotNr, accountID).
+
+        Returns:
+            tuple: Keys (n x 3, columns KEY) and features (n x 5, columns FEATURES) as NumPy arrays.
+        """
+        with self._lock:
+            keys = self._keys[:self._size]
+            order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+            return keys[order].copy(), self._features(order)
+
+    def __len__(self) -> int:
+        return self._size
+
+
+store = BidderFeatureStore()
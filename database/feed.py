@@ -0,0 +1,211 @@
+import asyncio
+import json
+import threading
+
+import database.database as _database
+
+
+# Events buffered per subscriber before it is considered too slow and disconnected (it can resume with Last-Event-ID).
+BUFFER = 256
+# Seconds between keep-alive comments on an idle stream.
+KEEPALIVE = 15.0
+
+_COLUMNS = "rowid, auctionID, lotNr, bidNr, isCombination, accountID, isCompany, bidPrice, biddingDateTime, closingDateTime"
+_NEW_BIDS = f"""
+    SELECT {_COLUMNS}
+    FROM bids
+    WHERE rowid > ?
+    ORDER BY rowid"""
+_REPLAY_AFTER_EVENT = f"""
+    SELECT {_COLUMNS}
+    FROM bids
+    WHERE rowid > :after AND auctionID = :auctionID AND (:lotNr IS NULL OR lotNr = :lotNr)
+    ORDER BY rowid"""
+_REPLAY_AFTER_BID = f"""
+    SELECT {_COLUMNS}
+    FROM bids
+    WHERE auctionID = :auctionID AND lotNr = :lotNr AND bidNr > :after
+    ORDER BY bidNr"""
+
+
+def format_event(row) -> tuple:
+    """
+    Serialize a bids row (with its rowid first) to a Server-Sent Event, once for all subscribers.
+
+    Returns:
+        tuple: Event id (rowid), auctionID, lotNr and the encoded event.
+    """
+    rowid, auctionID, lotNr, bidNr, isCombination, accountID, isCompany, bidPrice, biddingDateTime, closingDateTime = row
+    data = json.dumps({
+        'auctionID': auctionID,
+        'lotNr': lotNr,
+        'bidNr': bidNr,
+        'isCombination': bool(isCombination),
+        'accountID': accountID,
+        'isCompany': bool(isCompany),
+        'bidPrice': bidPrice,
+        'biddingDateTime': str(biddingDateTime).replace(' ', 'T') if biddingDateTime is not None else None,
+        'closingDateTime': str(closingDateTime).replace(' ', 'T') if closingDateTime is not None else None
+        })
+    return rowid, auctionID, lotNr, f"id: {rowid}\nevent: bid\ndata: {data}\n\n".encode()
+
+
+class Subscription:
+    """
+    Bounded event buffer of one subscriber, filled from any thread and read on the event loop of the subscriber.
+    """
+    def __init__(self, auctionID:int, lotNr:int=None, buffer:int=BUFFER):
+        self.auctionID = auctionID
+        self.lotNr = lotNr
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=buffer)
+        self.overflowed = False
+        self.position = 0
+
+    def matches(self, lotNr:int) -> bool:
+        return self.lotNr is None or self.lotNr == lotNr
+
+    def put(self, event:tuple) -> None:
+        # Runs on the event loop. A full buffer ends the subscription instead of blocking the publisher or growing unbounded.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def events(self, replay:list=(), keepalive:float=KEEPALIVE):
+        """
+        Yield the replayed events followed by the live ones, each event once in rowid order, and keep-alive comments
+        while idle. Ends after the buffered events when the subscriber overflowed.
+        """
+        for rowid, auctionID, lotNr, event in replay:
+            self.position = max(self.position, rowid)
+            yield event
+        while True:
+            if self.overflowed and self.queue.empty():
+                return
+            try:
+                rowid, auctionID, lotNr, event = await asyncio.wait_for(self.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if rowid > self.position:
+                self.position = rowid
+                yield event
+
+
+class BidFeed:
+    """
+    In-process publish/subscribe fan-out of newly committed bids per auction (optionally per lot).
+
+    New bids are read once per catch_up (rowid watermark, as the feature and lot state stores), serialized once and
+    handed to the bounded buffer of every matching subscriber on its event loop, so publishing never blocks on a slow
+    client. Without subscribers nothing is read; the watermark is taken again on the next subscription.
+    """
+    def __init__(self, read_engine=None, buffer:int=BUFFER):
+        self.read_engine = read_engine if read_engine is not None else _database.read_engine
+        self.buffer = buffer
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self.watermark = None
+        self._metrics = {'published': 0, 'delivered': 0, 'overflowed': 0}
+
+    def _query(self, query:str, params) -> list:
+        conn = self.read_engine.raw_connection()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def head(self) -> int:
+        """
+        Return the position a new subscription starts from: the watermark, or the last committed bid while there are
+        no subscribers. Reads the database in the latter case, so call it off the event loop.
+        """
+        watermark = self.watermark
+        if watermark is not None:
+            return watermark
+        return self._query("SELECT COALESCE(MAX(rowid), 0) FROM bids", ())[0][0]
+
+    def subscribe(self, auctionID:int, position:int, lotNr:int=None) -> Subscription:
+        """
+        Register a subscriber on the running event loop; it receives the bids committed after position (taken with head
+        just before) and never blocks the event loop on the database.
+        """
+        subscription = Subscription(auctionID, lotNr, self.buffer)
+        with self._lock:
+            if self.watermark is None:
+                self.watermark = position
+            subscription.position = self.watermark
+            self._subscribers.setdefault(auctionID, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription:Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.auctionID, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.auctionID, None)
+            if subscription.overflowed:
+                self._metrics['overflowed'] += 1
+
+    def replay(self, auctionID:int, lotNr:int=None, afterEvent:int=None, afterBid:int=None) -> list:
+        """
+        Read the events a resuming subscriber missed: after an event id (rowid), or after a bid number of a lot.
+        """
+        if afterEvent is not None:
+            rows = self._query(_REPLAY_AFTER_EVENT, {'after': afterEvent, 'auctionID': auctionID, 'lotNr': lotNr})
+        elif afterBid is not None and lotNr is not None:
+            rows = self._query(_REPLAY_AFTER_BID, {'after': afterBid, 'auctionID': auctionID, 'lotNr': lotNr})
+        else:
+            rows = []
+        return [format_event(row) for row in rows]
+
+    def catch_up(self) -> int:
+        """
+        Publish the bids committed since the watermark to the matching subscribers.
+
+        Returns:
+            int: Number of bids published.
+        """
+        with self._lock:
+            if not self._subscribers:
+                self.watermark = None
+                return 0
+            watermark = self.watermark
+        rows = self._query(_NEW_BIDS, (watermark,))
+
+        deliveries = []
+        published = 0
+        with self._lock:
+            # All subscribers left meanwhile
+            if self.watermark is None:
+                return 0
+            for row in rows:
+                # A concurrent catch up may have published the bid already
+                if row[0] <= self.watermark:
+                    continue
+                self.watermark = row[0]
+                event = format_event(row)
+                for subscription in self._subscribers.get(event[1], ()):
+                    if subscription.matches(event[2]):
+                        deliveries.append((subscription, event))
+                published += 1
+            self._metrics['published'] += published
+            self._metrics['delivered'] += len(deliveries)
+
+        for subscription, event in deliveries:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The event loop of the subscriber was closed
+                pass
+        return published
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._metrics, subscribers=sum(len(subscribers) for subscribers in self._subscribers.values()))
+
+
+bid_feed = BidFeed()
@@ -0,0 +1,157 @@
+import bisect
+import datetime as _dt
+import sqlite3
+import threading
+
+import database.database as _database
+
+
+NEW_AUCTIONS = """
+    SELECT id, relatedCompany, auctionStart, auctionEnd
+    FROM auctions
+    WHERE id > :after AND relatedCompany IS NOT NULL AND auctionStart IS NOT NULL AND auctionEnd IS NOT NULL
+    ORDER BY id"""
+# Moment of the last delta sync of the auctions (database/sync.py), which may change the period of existing auctions.
+_LAST_SYNC = "SELECT syncedAt FROM sync_state WHERE tableName = 'auctions'"
+
+
+def to_micros(value) -> int:
+    """
+    Convert a datetime (or its SQLite text representation) to integer microseconds, comparable across both.
+    """
+    if isinstance(value, str):
+        value = _dt.datetime.fromisoformat(value)
+    # SQLite stores datetimes without their UTC offset, compare on the same wall clock time.
+    value = value.replace(tzinfo=None)
+    return (value - _dt.datetime(1970, 1, 1)) // _dt.timedelta(microseconds=1)
+
+
+def last_sync(conn):
+    """
+    Return when the auctions were last synchronised from a CSV export, or None if they never were. In-process state
+    derived from the auctions is rebuilt when this changes, as a sync runs in another process.
+    """
+    try:
+        row = conn.execute(_LAST_SYNC).fetchone()
+    except sqlite3.OperationalError:
+        # No sync ran on this database yet
+        return None
+    return row[0] if row else None
+
+
+class IntervalIndex:
+    """
+    Closed intervals sorted by start, with the running maximum of the ends.
+
+    Every interval starting at or before end is a candidate overlap of [start, end]; one of them overlaps exactly when
+    the largest end among them reaches start. That is one bisect and one lookup, O(log n), and it covers all cases:
+    partial overlap on either side, containment in either direction and touching bounds.
+    """
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self._maxEnd = []
+        self._maxId = []
+
+    def add(self, start:int, end:int, id:int) -> None:
+        """
+        Insert an interval. Appending (the usual, chronological case) is O(1); inserting earlier rewrites the running
+        maximum from the insert position onwards.
+        """
+        position = bisect.bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, id)
+        self._maxEnd.insert(position, end)
+        self._maxId.insert(position, id)
+        for i in range(position, len(self.starts)):
+            if i > 0 and self._maxEnd[i - 1] >= self.ends[i]:
+                self._maxEnd[i], self._maxId[i] = self._maxEnd[i - 1], self._maxId[i - 1]
+            else:
+                self._maxEnd[i], self._maxId[i] = self.ends[i], self.ids[i]
+
+    def overlapping(self, start:int, end:int):
+        """
+        Return the id of an interval overlapping [start, end], or None.
+        """
+        candidates = bisect.bisect_right(self.starts, end)
+        if candidates and self._maxEnd[candidates - 1] >= start:
+            return self._maxId[candidates - 1]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+class AuctionIntervals:
+    """
+    Interval index of the auctions per related company, caught up with newly committed auctions through their id.
+
+    Auctions are only ever added through the API, or changed by a delta sync, after which the index is rebuilt on the
+    next catch up. Call rebuild after auction periods were changed or removed otherwise.
+    """
+    def __init__(self, read_engine=None):
+        self.read_engine = read_engine if read_engine is not None else _database.read_engine
+        self._lock = threading.Lock()
+        self._companies = {}
+        self.watermark = None
+        self.syncedAt = None
+
+    def add(self, rows) -> None:
+        """
+        Index (id, relatedCompany, auctionStart, auctionEnd) rows and move the watermark past them.
+        """
+        for id, company, start, end in rows:
+            self._companies.setdefault(company, IntervalIndex()).add(to_micros(start), to_micros(end), id)
+            self.watermark = max(self.watermark or 0, id)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the index from the auctions table.
+
+        Returns:
+            int: Number of indexed auctions.
+        """
+        with self._lock:
+            self._companies = {}
+            self.watermark = 0
+            self._catch_up()
+            return sum(len(index) for index in self._companies.values())
+
+    def _catch_up(self) -> None:
+        conn = self.read_engine.raw_connection()
+        try:
+            syncedAt = last_sync(conn)
+            if syncedAt != self.syncedAt:
+                # The sync may have changed indexed auctions, index all of them again.
+                self._companies = {}
+                self.watermark = 0
+                self.syncedAt = syncedAt
+            rows = conn.execute(NEW_AUCTIONS, {'after': self.watermark}).fetchall()
+        finally:
+            conn.close()
+        self.add(rows)
+
+    def catch_up(self) -> None:
+        """
+        Add the auctions committed since the watermark, building the index first if it was never loaded or the auctions
+        were synchronised since.
+        """
+        with self._lock:
+            if self.watermark is None:
+                self.watermark = 0
+            self._catch_up()
+
+    def overlapping(self, company:str, start, end):
+        """
+        Return the id of an indexed auction of the company overlapping [start, end], or None.
+        """
+        index = self._companies.get(company)
+        if index is None:
+            return None
+        with self._lock:
+            return index.overlapping(to_micros(start), to_micros(end))
+
+
+auction_intervals = AuctionIntervals()
@@ -0,0 +1,118 @@
+import threading
+
+import database.database as _database
+
+
+FIELDS = ['highestBid', 'leadingAccountID', 'leadingBidNr', 'numberOfBids']
+
+# Per lot the number of bids and its highest bid; on equal prices the earliest bid leads.
+_LOT_STATE = """
+    SELECT auctionID, lotNr, bidPrice, accountID, bidNr, numberOfBids
+    FROM (
+        SELECT auctionID, lotNr, bidPrice, accountID, bidNr,
+            COUNT(*) OVER (PARTITION BY auctionID, lotNr) AS numberOfBids,
+            ROW_NUMBER() OVER (PARTITION BY auctionID, lotNr ORDER BY bidPrice DESC, bidNr) AS position
+        FROM bids
+    )
+    WHERE position = 1"""
+_NEW_BIDS = """
+    SELECT rowid, auctionID, lotNr, bidNr, accountID, bidPrice
+    FROM bids
+    WHERE rowid > ?
+    ORDER BY rowid"""
+
+
+class LotStateStore:
+    """
+    In-memory live state per (auctionID, lotNr): highest bid, leading account and bid, and the number of bids.
+
+    The state of a lot is a tuple replaced as a whole under a lock, so readers never see a half applied bid. The store is
+    rebuilt from the bids table and catches up on the bids committed since (rowid watermark), as the bidder feature store.
+    Applying a bid does not depend on the order of the bids, since equal prices are decided on the bid number.
+    """
+    def __init__(self, read_engine=None):
+        self.read_engine = read_engine if read_engine is not None else _database.read_engine
+        self._lock = threading.Lock()
+        self._states = {}
+        self.watermark = None
+
+    def add_bid(self, auctionID:int, lotNr:int, bidNr:int, accountID:int, bidPrice:float) -> None:
+        """
+        Apply a single bid to the state of its lot.
+        """
+        with self._lock:
+            self._add_bid(auctionID, lotNr, bidNr, accountID, bidPrice)
+
+    def _add_bid(self, auctionID, lotNr, bidNr, accountID, bidPrice) -> None:
+        key = (auctionID, lotNr)
+        highestBid, leadingAccountID, leadingBidNr, numberOfBids = self._states.get(key, (None, None, None, 0))
+        if bidPrice is not None and (highestBid is None or bidPrice > highestBid or (bidPrice == highestBid and bidNr < leadingBidNr)):
+            highestBid, leadingAccountID, leadingBidNr = bidPrice, accountID, bidNr
+        self._states[key] = (highestBid, leadingAccountID, leadingBidNr, numberOfBids + 1)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the state of all lots from the bids table.
+
+        Returns:
+            int: Number of lots with bids.
+        """
+        conn = self.read_engine.raw_connection()
+        try:
+            # One read transaction, so the state and the watermark describe the same state of the table
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            rows = cursor.execute(_LOT_STATE).fetchall()
+            watermark = cursor.execute("SELECT COALESCE(MAX(rowid), 0) FROM bids").fetchone()[0]
+            cursor.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._states = {
+                (auctionID, lotNr): (bidPrice, None if bidPrice is None else accountID, None if bidPrice is None else bidNr, numberOfBids)
+                for auctionID, lotNr, bidPrice, accountID, bidNr, numberOfBids in rows
+                }
+            self.watermark = watermark
+            return len(self._states)
+
+    def catch_up(self) -> int:
+        """
+        Apply the bids committed since the watermark, rebuilding the store first if it was never loaded.
+
+        Returns:
+            int: Number of bids applied.
+        """
+        if self.watermark is None:
+            self.rebuild()
+            return 0
+        conn = self.read_engine.raw_connection()
+        try:
+            rows = conn.execute(_NEW_BIDS, (self.watermark,)).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            applied = 0
+            for rowid, auctionID, lotNr, bidNr, accountID, bidPrice in rows:
+                # A concurrent catch up may have applied the bid already
+                if rowid <= self.watermark:
+                    continue
+                self._add_bid(auctionID, lotNr, bidNr, accountID, bidPrice)
+                self.watermark = rowid
+                applied += 1
+            return applied
+
+    def get(self, auctionID:int, lotNr:int) -> dict:
+        """
+        Return the state of one lot, or None if no bid was placed on it.
+        """
+        state = self._states.get((auctionID, lotNr))
+        if state is None:
+            return None
+        return dict(zip(FIELDS, state))
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+store = LotStateStore()
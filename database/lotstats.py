@@ -0,0 +1,179 @@
+"""
+Lot statistics (FirstBid, LotEnding, Duration) maintained by SQLite triggers on the bids table.
+
+Usage (from the repository root):
+    python -m database.lotstats              # install the triggers and backfill the statistics from the bids
+    python -m database.lotstats --check      # fail if the statistics do not match the bids
+"""
+import argparse
+import sqlite3
+import sys
+
+import database.database as _database
+
+
+STATS_TABLE = "lot_statistics"
+TRIGGER_PREFIX = "trg_lot_statistics_"
+
+CREATE_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        auctionID INTEGER NOT NULL,
+        lotNr INTEGER NOT NULL,
+        firstBid DATETIME,
+        lotEnding DATETIME,
+        duration FLOAT,
+        numberOfBids INTEGER NOT NULL,
+        PRIMARY KEY (auctionID, lotNr)
+    )"""
+
+# Duration in minutes between the first bid and the end of the lot, as used for TOE/TOX in the notebook.
+_DURATION = "(julianday(lotEnding) - julianday(firstBid)) * 1440.0"
+
+# Aggregate of the bids of one or all lots, in the column order of the statistics table.
+_AGGREGATE = f"""
+    SELECT auctionID, lotNr, firstBid, lotEnding, {_DURATION} AS duration, numberOfBids
+    FROM (
+        SELECT auctionID, lotNr, MIN(biddingDateTime) AS firstBid, MAX(closingDateTime) AS lotEnding, COUNT(*) AS numberOfBids
+        FROM bids
+        {{where}}
+        GROUP BY auctionID, lotNr
+    )"""
+
+def _refresh_lot(ref:str) -> str:
+    # Recalculate one lot through the bids primary key; used when bids are changed or removed.
+    where = f"WHERE auctionID = {ref}.auctionID AND lotNr = {ref}.lotNr"
+    return f"""
+        DELETE FROM {STATS_TABLE} {where};
+        INSERT INTO {STATS_TABLE} (auctionID, lotNr, firstBid, lotEnding, duration, numberOfBids)
+        {_AGGREGATE.format(where=where)};"""
+
+# A new bid only widens the first bid/lot ending window of its lot, so it is merged without rereading the lot.
+TRIGGERS = {
+    'insert': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}insert AFTER INSERT ON bids
+        BEGIN
+            INSERT INTO {STATS_TABLE} (auctionID, lotNr, firstBid, lotEnding, numberOfBids)
+            VALUES (NEW.auctionID, NEW.lotNr, NEW.biddingDateTime, NEW.closingDateTime, 1)
+            ON CONFLICT (auctionID, lotNr) DO UPDATE SET
+                firstBid = CASE WHEN firstBid IS NULL OR excluded.firstBid < firstBid THEN excluded.firstBid ELSE firstBid END,
+                lotEnding = CASE WHEN lotEnding IS NULL OR excluded.lotEnding > lotEnding THEN excluded.lotEnding ELSE lotEnding END,
+                numberOfBids = numberOfBids + 1;
+            UPDATE {STATS_TABLE} SET duration = {_DURATION}
+            WHERE auctionID = NEW.auctionID AND lotNr = NEW.lotNr;
+        END""",
+    'update': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}update
+        AFTER UPDATE OF auctionID, lotNr, biddingDateTime, closingDateTime ON bids
+        BEGIN
+            {_refresh_lot('OLD')}
+            {_refresh_lot('NEW')}
+        END""",
+    'delete': f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}delete AFTER DELETE ON bids
+        BEGIN
+            {_refresh_lot('OLD')}
+        END"""
+    }
+
+
+def installed_triggers(conn:sqlite3.Connection) -> list:
+    """
+    Return the names of the lot statistics triggers present in the database.
+    """
+    return [
+        name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE ?", (f"{TRIGGER_PREFIX}%",)
+            )
+        ]
+
+def create_triggers(conn:sqlite3.Connection) -> None:
+    """
+    Create the statistics table and the triggers keeping it up to date, if they do not exist yet.
+    """
+    conn.execute(CREATE_TABLE)
+    for statement in TRIGGERS.values():
+        conn.execute(statement)
+
+def drop_triggers(conn:sqlite3.Connection) -> None:
+    """
+    Drop the triggers, e.g. before a bulk load; the statistics are then rebuilt with backfill.
+    """
+    for name in installed_triggers(conn):
+        conn.execute(f'DROP TRIGGER "{name}"')
+
+def backfill(conn:sqlite3.Connection) -> int:
+    """
+    Rebuild the statistics of all lots from the bids table in one aggregation.
+
+    Returns:
+        int: Number of lots with statistics.
+    """
+    conn.execute(CREATE_TABLE)
+    conn.execute(f"DELETE FROM {STATS_TABLE}")
+    conn.execute(f"""
+        INSERT INTO {STATS_TABLE} (auctionID, lotNr, firstBid, lotEnding, duration, numberOfBids)
+        {_AGGREGATE.format(where='')}""")
+    conn.commit()
+    return conn.execute(f"SELECT COUNT(*) FROM {STATS_TABLE}").fetchone()[0]
+
+def install(conn:sqlite3.Connection) -> bool:
+    """
+    Make sure the statistics are maintained. If the triggers were missing, the statistics cannot be trusted and are backfilled.
+
+    Returns:
+        bool: Whether the triggers had to be (re)installed.
+    """
+    if len(installed_triggers(conn)) == len(TRIGGERS):
+        return False
+    create_triggers(conn)
+    backfill(conn)
+    return True
+
+def check_consistency(conn:sqlite3.Connection) -> list:
+    """
+    Compare the maintained statistics with a full aggregation of the bids table.
+
+    Returns:
+        list: (auctionID, lotNr, problem) per lot that is missing, stale or has no bids anymore.
+    """
+    expected = _AGGREGATE.format(where='')
+    return [
+        tuple(row) for row in conn.execute(f"""
+            SELECT e.auctionID, e.lotNr, CASE WHEN s.auctionID IS NULL THEN 'missing' ELSE 'stale' END
+            FROM ({expected}) AS e
+            LEFT JOIN {STATS_TABLE} AS s ON s.auctionID = e.auctionID AND s.lotNr = e.lotNr
+            WHERE s.auctionID IS NULL
+                OR s.numberOfBids != e.numberOfBids
+                OR s.firstBid IS NOT e.firstBid
+                OR s.lotEnding IS NOT e.lotEnding
+                OR ABS(COALESCE(s.duration, 0) - COALESCE(e.duration, 0)) > 1e-6
+            UNION ALL
+            SELECT s.auctionID, s.lotNr, 'orphaned'
+            FROM {STATS_TABLE} AS s
+            WHERE NOT EXISTS (SELECT 1 FROM bids AS b WHERE b.auctionID = s.auctionID AND b.lotNr = s.lotNr)
+            """)
+        ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only check the statistics against the bids.")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(_database.DB_LOC)
+    try:
+        if not args.check:
+            create_triggers(conn)
+            print(f"--- Backfilled statistics of {backfill(conn):,} lots. ---")
+
+        problems = check_consistency(conn)
+    finally:
+        conn.close()
+    for auctionID, lotNr, problem in problems[:20]:
+        print(f"Lot {auctionID}/{lotNr}: statistics {problem}")
+    if problems:
+        print(f"--- {len(problems):,} lots with inconsistent statistics. ---")
+        sys.exit(1)
+    print("--- Lot statistics are consistent with the bids. ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Index migration and query plan check for the auction database.
+
+Usage (from the repository root):
+    python -m database.migrations            # drop redundant indexes and create the index profile
+    python -m database.migrations --check    # fail if a service query falls back to a full table scan
+"""
+import argparse
+import datetime as _dt
+import sys
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.models as _models
+import database.services as _services
+
+
+TABLES = ['auctions', 'lots', 'bids']
+
+
+def index_profile() -> dict:
+    """
+    Return the indexes defined on the models (the index profile), by name.
+    """
+    return {
+        index.name: index
+        for table in TABLES
+        for index in _database.Base.metadata.tables[table].indexes
+        }
+
+def existing_indexes(conn) -> list:
+    """
+    Return the names of the explicitly created indexes of the auction tables. Primary key indexes are not included.
+    """
+    return [
+        name for (name,) in conn.exec_driver_sql(
+            f"SELECT name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL AND tbl_name IN ({', '.join('?' * len(TABLES))})",
+            tuple(TABLES)
+            )
+        ]
+
+def migrate_indexes(engine) -> dict:
+    """
+    Bring the indexes of an existing database in line with the index profile of the models.
+
+    Args:
+        engine: Engine of the database to migrate.
+
+    Returns:
+        dict: Names of the dropped and created indexes.
+    """
+    profile = index_profile()
+    with engine.begin() as conn:
+        existing = existing_indexes(conn)
+        dropped = [name for name in existing if name not in profile]
+        for name in dropped:
+            conn.exec_driver_sql(f'DROP INDEX "{name}"')
+
+        created = [name for name in profile if name not in existing]
+        for name in created:
+            profile[name].create(bind=conn)
+    return {'dropped': dropped, 'created': created}
+
+def capture_service_queries(engine) -> list:
+    """
+    Run the read queries of services.py against the database and capture the SQL they emit.
+
+    The legacy offset variants are not included: skipping records scans by definition, cursors are the indexed path.
+
+    Returns:
+        list: (name, statement, parameters) per captured query.
+    """
+    captured = []
+    current = {'name': None}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((current['name'], statement, parameters))
+
+    moment = _dt.datetime(2022, 1, 1)
+    calls = {
+        'check_auction_presence': lambda db: _services.check_auction_presence(db=db, companyName='', auctionStart=moment, auctionEnd=moment),
+        'get_auctions': lambda db: _services.get_auctions(db=db, skip=0, limit=10, after=(0,)),
+        'get_auction_by_ID': lambda db: _services.get_auction_by_ID(db=db, auctionID=0),
+        'get_lots_by_auctionID': lambda db: _services.get_lots_by_auctionID(db=db, auctionID=0, skip=0, limit=10, after=(0, 0)),
+        'get_auction_lot_combination': lambda db: _services.get_auction_lot_combination(db=db, auctionID=0, lotNr=0),
+        'get_lot_statistics': lambda db: _services.get_lot_statistics(db=db, auctionID=0, lotNr=0),
+        'get_bids_by_IDs': lambda db: _services.get_bids_by_IDs(db=db, auctionID=0, lotNr=0, skip=0, limit=10, after=(0, 0, 0)),
+        }
+
+    _sql.event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with _orm.Session(bind=engine) as db:
+            for name, call in calls.items():
+                current['name'] = name
+                call(db)
+    finally:
+        _sql.event.remove(engine, "before_cursor_execute", capture)
+
+    # The bid insert allocates its bidNr with a subquery, its plan is checked without executing it.
+    compiled = _services._INSERT_BID.compile(dialect=engine.dialect)
+    parameters = dict.fromkeys(compiled.positiontup, 0)
+    captured.append(('create_bid', str(compiled), tuple(parameters[name] for name in compiled.positiontup)))
+    return captured
+
+def full_table_scans(engine) -> list:
+    """
+    Run EXPLAIN QUERY PLAN on every captured service query and return the steps that scan a whole table.
+
+    Returns:
+        list: (name, plan detail) per full table scan.
+    """
+    scans = []
+    with engine.connect() as conn:
+        for name, statement, parameters in capture_service_queries(engine):
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                detail = row[-1]
+                # SQLite reports "SCAN <table>" (or "SCAN TABLE <table>") without "USING" for a full table scan.
+                if detail.startswith("SCAN") and " USING " not in detail:
+                    scans.append((name, detail))
+    return scans
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="Only check the query plans of the service queries.")
+    args = parser.parse_args()
+
+    engine = _database.engine
+    if not args.check:
+        _database.Base.metadata.create_all(bind=engine)
+        result = migrate_indexes(engine)
+        print(f"--- Dropped {len(result['dropped'])} redundant indexes: {', '.join(result['dropped']) or '-'} ---")
+        print(f"--- Created {len(result['created'])} indexes: {', '.join(result['created']) or '-'} ---")
+
+    scans = full_table_scans(engine)
+    for name, detail in scans:
+        print(f"FULL TABLE SCAN in {name}: {detail}")
+    if scans:
+        sys.exit(1)
+    print("--- All service queries use an index. ---")
+
+if __name__ == "__main__":
+    main()
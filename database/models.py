@@ -4,41 +4,64 @@ import sqlalchemy.orm as _orm
 import database.database as _database
 
 
+# Indexes follow the queries in services.py; every other lookup is served by a primary key.
 class Auction(_database.Base):
     __tablename__ = "auctions"
-    id = _sql.Column(_sql.Integer, primary_key=True, index=True)
-    relatedCompany = _sql.Column(_sql.String, index=True)
-    auctionStart = _sql.Column(_sql.DateTime, index=True)
-    auctionEnd = _sql.Column(_sql.DateTime, index=True)
-    branchCategory = _sql.Column(_sql.String, index=True)
+    id = _sql.Column(_sql.Integer, primary_key=True)
+    relatedCompany = _sql.Column(_sql.String)
+    auctionStart = _sql.Column(_sql.DateTime)
+    auctionEnd = _sql.Column(_sql.DateTime)
+    branchCategory = _sql.Column(_sql.String)
 
 
 class Lots(_database.Base):
     __tablename__ = "lots"
-    countryCode = _sql.Column(_sql.String, index=True)
-    saleDate = _sql.Column(_sql.DateTime, index=True)
+    countryCode = _sql.Column(_sql.String)
+    saleDate = _sql.Column(_sql.DateTime)
     auctionID = _sql.Column(_sql.Integer, _sql.ForeignKey("auctions.id"), primary_key=True)
-    lotNr = _sql.Column(_sql.Integer, primary_key=True, index=True)
-    suffix = _sql.Column(_sql.String, index=True)
-    numberOfItems = _sql.Column(_sql.Integer, index=True)
-    buyerAccountID = _sql.Column(_sql.Integer, index=True)
-    estimatedValue = _sql.Column(_sql.Float, index=True)
-    startingBid = _sql.Column(_sql.Float, index=True)
-    reserveBid = _sql.Column(_sql.Float, index=True)
-    currentBid = _sql.Column(_sql.Float, index=True)
-    VAT = _sql.Column(_sql.Integer, index=True)
-    mainCategory = _sql.Column(_sql.String, index=True)
-    sold = _sql.Column(_sql.Boolean, index=True)
+    lotNr = _sql.Column(_sql.Integer, primary_key=True)
+    suffix = _sql.Column(_sql.String)
+    numberOfItems = _sql.Column(_sql.Integer)
+    buyerAccountID = _sql.Column(_sql.Integer)
+    estimatedValue = _sql.Column(_sql.Float)
+    startingBid = _sql.Column(_sql.Float)
+    reserveBid = _sql.Column(_sql.Float)
+    currentBid = _sql.Column(_sql.Float)
+    VAT = _sql.Column(_sql.Integer)
+    mainCategory = _sql.Column(_sql.String)
+    sold = _sql.Column(_sql.Boolean)
 
 class Bids(_database.Base):
     __tablename__ = "bids"
+    __table_args__ = (
+        # Time range filter of the bids export
+        _sql.Index("ix_bids_biddingDateTime", "biddingDateTime"),
+    )
     auctionID = _sql.Column(_sql.Integer, _sql.ForeignKey("lots.auctionID"), primary_key=True)
     lotNr = _sql.Column(_sql.Integer, _sql.ForeignKey("lots.lotNr"), primary_key=True)
-    bidNr = _sql.Column(_sql.Integer, primary_key=True, index=True)
-    lotID = _sql.Column(_sql.Integer, index=True)
-    isCombination = _sql.Column(_sql.Boolean, index=True)
-    accountID = _sql.Column(_sql.Integer, index=True)
-    isCompany = _sql.Column(_sql.Boolean, index=True)
-    bidPrice = _sql.Column(_sql.Float, index=True)
-    biddingDateTime = _sql.Column(_sql.DateTime, index=True)
-    closingDateTime = _sql.Column(_sql.DateTime, index=True)
\ No newline at end of file
+    bidNr = _sql.Column(_sql.Integer, primary_key=True)
+    lotID = _sql.Column(_sql.Integer)
+    isCombination = _sql.Column(_sql.Boolean)
+    accountID = _sql.Column(_sql.Integer)
+    isCompany = _sql.Column(_sql.Boolean)
+    bidPrice = _sql.Column(_sql.Float)
+    biddingDateTime = _sql.Column(_sql.DateTime)
+    closingDateTime = _sql.Column(_sql.DateTime)
+
+class LotStatistics(_database.Base):
+    # Maintained by the triggers in database/lotstats.py, never written through the ORM.
+    __tablename__ = "lot_statistics"
+    auctionID = _sql.Column(_sql.Integer, primary_key=True)
+    lotNr = _sql.Column(_sql.Integer, primary_key=True)
+    firstBid = _sql.Column(_sql.DateTime)
+    lotEnding = _sql.Column(_sql.DateTime)
+    duration = _sql.Column(_sql.Float)
+    numberOfBids = _sql.Column(_sql.Integer, nullable=False)
+
+class AuctionSettlement(_database.Base):
+    # Written by database/settlement.py in the transaction settling the lots; its presence makes settling idempotent.
+    __tablename__ = "auction_settlements"
+    auctionID = _sql.Column(_sql.Integer, _sql.ForeignKey("auctions.id"), primary_key=True)
+    settledAt = _sql.Column(_sql.DateTime)
+    soldLots = _sql.Column(_sql.Integer)
+    unsoldLots = _sql.Column(_sql.Integer)
@@ -0,0 +1,53 @@
+import base64
+import json
+
+
+def encode_cursor(key:tuple) -> str:
+    """
+    Encode the primary key of the last returned record into an opaque cursor token.
+
+    Args:
+        key (tuple): Primary key values of the last record of a page.
+
+    Returns:
+        str: URL safe cursor token.
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(token:str, length:int) -> tuple:
+    """
+    Decode a cursor token back into the primary key it was created from.
+
+    Args:
+        token (str): Cursor token as returned by encode_cursor.
+        length (int): Expected number of key values.
+
+    Raises:
+        ValueError: The token is malformed or does not hold the expected number of integer key values.
+
+    Returns:
+        tuple: Primary key values.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != length or not all(isinstance(value, int) for value in key):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+def next_cursor(records:list, limit:int, key) -> str:
+    """
+    Return the cursor of the page following the given records, or None when this was the last page.
+
+    Args:
+        records (list): Records of the current page, ordered by primary key.
+        limit (int): Maximal number of records that was requested.
+        key: Function returning the primary key tuple of a record.
+
+    Returns:
+        str: Cursor token for the next page, None if there are no more records.
+    """
+    if not records or len(records) < limit:
+        return None
+    return encode_cursor(key(records[-1]))
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import pickle as pkl
+import threading
+import time
+
+
+MODEL_DIR = "./src/SavedModels/"
+ARTIFACTS = {
+    'model': 'model.pkl',
+    'scaler': 'scaler.pkl',
+    'OHcols': 'OHcols.pkl'
+    }
+# File in MODEL_DIR naming the published version folder (relative to MODEL_DIR); without it the artifacts are read
+# from MODEL_DIR itself.
+POINTER = "current"
+MANIFEST = "manifest.json"
+
+
+class ModelArtifacts:
+    """
+    Immutable snapshot of the three starting-bid artifacts that were loaded together.
+    """
+    __slots__ = ('model', 'scaler', 'OHcols', 'version', 'loadedAt')
+
+    def __init__(self, model, scaler, OHcols, version:str):
+        self.model = model
+        self.scaler = scaler
+        self.OHcols = list(OHcols)
+        self.version = version
+        self.loadedAt = time.time()
+
+
+class ModelRegistry:
+    """
+    In-process registry that loads the starting-bid artifacts once and hot reloads them when they change on disk.
+
+    A loaded snapshot is never mutated. Reloads build a complete new snapshot first and only then swap the reference,
+    so a request that already holds a snapshot keeps using a consistent model, scaler and OHcols set. Published versions
+    are read through the POINTER file, which the training pipeline replaces in one rename, and must match the checksum
+    in their manifest.
+    """
+    def __init__(self, model_dir:str=MODEL_DIR, check_interval:float=5.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._listeners = []
+
+    def _version_dir(self) -> str:
+        """
+        Folder of the published version the pointer names, or the model folder itself when nothing was published.
+        """
+        try:
+            with open(os.path.join(self.model_dir, POINTER)) as f:
+                target = f.read().strip()
+        except FileNotFoundError:
+            return self.model_dir
+        return os.path.join(self.model_dir, target)
+
+    def _paths(self, folder:str=None) -> dict:
+        folder = folder if folder is not None else self._version_dir()
+        return {name: os.path.join(folder, file) for name, file in ARTIFACTS.items()}
+
+    def _stat_fingerprint(self) -> tuple:
+        """
+        Cheap change indicator based on the published version folder and the modification time and size of every artifact.
+        """
+        folder = self._version_dir()
+        fingerprint = [folder]
+        for path in self._paths(folder).values():
+            stat = os.stat(path)
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(fingerprint)
+
+    def _load(self) -> ModelArtifacts:
+        """
+        Read, checksum and validate the artifacts from disk.
+
+        Raises:
+            ValueError: The artifacts do not match the checksum of their manifest, or one of them does not have the
+                expected interface.
+        """
+        folder = self._version_dir()
+        raw = {}
+        checksum = hashlib.sha256()
+        for name, path in self._paths(folder).items():
+            with open(path, "rb") as f:
+                raw[name] = f.read()
+            checksum.update(raw[name])
+        version = checksum.hexdigest()[:12]
+
+        manifest = os.path.join(folder, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                expectedVersion = json.load(f).get('version')
+            if expectedVersion is not None and expectedVersion != version:
+                raise ValueError(f"Artifacts in {folder} have version {version}, the manifest names {expectedVersion}")
+        loaded = {name: pkl.loads(data) for name, data in raw.items()}
+
+        if not hasattr(loaded['model'], 'predict'):
+            raise ValueError(f"{ARTIFACTS['model']} does not contain a fitted model with a predict method")
+        if not hasattr(loaded['scaler'], 'transform'):
+            raise ValueError(f"{ARTIFACTS['scaler']} does not contain a fitted scaler with a transform method")
+        if isinstance(loaded['OHcols'], str) or not all(isinstance(col, str) for col in loaded['OHcols']):
+            raise ValueError(f"{ARTIFACTS['OHcols']} does not contain a list of category names")
+
+        expected = getattr(loaded['model'], 'n_features_in_', None)
+        nrOfFeatures = len(loaded['scaler'].scale_) + len(loaded['OHcols']) if hasattr(loaded['scaler'], 'scale_') else None
+        if expected is not None and nrOfFeatures is not None and expected != nrOfFeatures:
+            raise ValueError(f"Model expects {expected} features, scaler and OHcols provide {nrOfFeatures}")
+
+        return ModelArtifacts(
+            model=loaded['model'],
+            scaler=loaded['scaler'],
+            OHcols=loaded['OHcols'],
+            version=version
+            )
+
+    def add_reload_listener(self, listener) -> None:
+        """
+        Register a callable that is invoked with the new snapshot every time the artifacts are swapped.
+        """
+        self._listeners.append(listener)
+
+    def reload(self, force:bool=False) -> ModelArtifacts:
+        """
+        Reload the artifacts if their files changed (or when forced) and atomically swap the active snapshot.
+
+        Args:
+            force (bool, optional): Reload even if the files did not change. Defaults to False.
+
+        Returns:
+            ModelArtifacts: The active snapshot after the (possible) reload.
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                fingerprint = self._stat_fingerprint()
+                if not force and self._artifacts is not None and fingerprint == self._fingerprint:
+                    return self._artifacts
+                artifacts = self._load()
+            except Exception:
+                # Keep serving the previous model if the files on disk are (temporarily) unusable.
+                if self._artifacts is None:
+                    raise
+                print(f'--- Failed to reload model artifacts, keeping version {self._artifacts.version}. ---')
+                return self._artifacts
+
+            self._fingerprint = fingerprint
+            if self._artifacts is not None and artifacts.version == self._artifacts.version:
+                return self._artifacts
+
+            self._artifacts = artifacts
+            for listener in self._listeners:
+                listener(artifacts)
+            return artifacts
+
+    def get(self) -> ModelArtifacts:
+        """
+        Return the active snapshot, loading it on first use and checking the files for changes at most every check_interval seconds.
+
+        Returns:
+            ModelArtifacts: Consistent set of model, scaler and OHcols together with their version.
+        """
+        artifacts = self._artifacts
+        if artifacts is None or time.monotonic() - self._last_check >= self.check_interval:
+            return self.reload()
+        return artifacts
+
+
+registry = ModelRegistry()
+
+def get_model() -> ModelArtifacts:
+    """
+    Return the active starting-bid model snapshot of the process wide registry.
+    """
+    return registry.get()
@@ -0,0 +1,130 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+
+import database.cache as _cache
+
+
+# Cached responses and how long they may be served without any write invalidating them (writes outside the API).
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 60))
+
+
+class CachedResponse:
+    """
+    Serialized JSON body of a response with its ETag and extra headers (e.g. X-Next-Cursor).
+    """
+    __slots__ = ('body', 'etag', 'headers')
+
+    def __init__(self, body:bytes, headers:dict=None):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.headers = dict(headers or {})
+
+    def matches(self, ifNoneMatch:str) -> bool:
+        """
+        Whether an If-None-Match header value covers this response (weak comparison, as for GET requests).
+        """
+        if not ifNoneMatch:
+            return False
+        tags = [tag.strip() for tag in ifNoneMatch.split(',')]
+        return '*' in tags or self.etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache (with time to live) of serialized responses, keyed by endpoint and query parameters.
+
+    Every response is tagged with the data it was read from, e.g. ('lots', auctionID). Invalidating a tag moves it to
+    a new generation; entries of an older generation are never served again. A response only gets stored when the
+    generation of its tag did not change while it was read, so a read that raced a committed write cannot store data
+    from before that write.
+
+    Generations come from one increasing counter. Only the maxsize most recently invalidated tags keep their own
+    generation; every other tag is at the floor, the newest generation forgotten so far. Forgetting a tag raises the
+    floor past every entry it invalidated, so they stay invalid (at worst a few entries of other tags are dropped early).
+    """
+    def __init__(self, maxsize:int=RESPONSE_CACHE_SIZE, ttl:float=RESPONSE_CACHE_TTL):
+        self._entries = _cache.LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._maxtags = maxsize
+        self._generations = collections.OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._metrics = {'invalidations': 0, 'discarded': 0, 'notModified': 0}
+
+    def generation(self, tag:tuple) -> int:
+        """
+        Return the current generation of a tag; take it before reading the data of a response.
+        """
+        with self._lock:
+            return self._generations.get(tag, self._floor)
+
+    def get(self, key:tuple):
+        """
+        Return the cached response for key, or None when it is missing, expired or invalidated.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        tag, generation, response = entry
+        if generation != self.generation(tag):
+            self._entries.pop(key)
+            return None
+        return response
+
+    def put(self, key:tuple, tag:tuple, generation:int, content, headers:dict=None) -> CachedResponse:
+        """
+        Serialize JSON compatible content once and cache it, unless the tag was invalidated since the given generation.
+
+        Returns:
+            CachedResponse: The serialized response, also when it was not stored.
+        """
+        response = CachedResponse(
+            json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8'), headers
+            )
+        with self._lock:
+            stored = self._generations.get(tag, self._floor) == generation
+            if not stored:
+                self._metrics['discarded'] += 1
+        if stored:
+            self._entries.set(key, (tag, generation, response))
+        return response
+
+    def invalidate(self, *tags:tuple) -> None:
+        """
+        Invalidate all cached responses read from the given tags. Call after the write is committed.
+        """
+        with self._lock:
+            for tag in tags:
+                self._counter += 1
+                self._generations[tag] = self._counter
+                self._generations.move_to_end(tag)
+            while len(self._generations) > self._maxtags:
+                _, generation = self._generations.popitem(last=False)
+                self._floor = generation
+            self._metrics['invalidations'] += len(tags)
+
+    def not_modified(self) -> None:
+        # Count a conditional request answered with 304 Not Modified.
+        with self._lock:
+            self._metrics['notModified'] += 1
+
+    def clear(self) -> None:
+        """
+        Remove all entries, e.g. after a bulk load outside the API.
+        """
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the size and hit/miss counters of the cache, its invalidation and 304 counters and the number of tags
+        with a generation of their own.
+        """
+        with self._lock:
+            return dict(self._entries.stats(), **self._metrics, tags=len(self._generations))
+
+
+cache = ResponseCache()
@@ -1,4 +1,5 @@
 import datetime as _dt
+from typing import List, Optional
 import pydantic as _pydantic
 
 class _AuctionBase(_pydantic.BaseModel):
@@ -41,6 +42,23 @@ class Lot(_LotBase):
     class Config:
         orm_mode = True
 
+class LotBatchError(_pydantic.BaseModel):
+    index: int
+    detail: str
+
+class LotBatchResult(_pydantic.BaseModel):
+    created: List[Lot]
+    errors: List[LotBatchError]
+    modelVersion: str
+
+class AuctionBatchError(_pydantic.BaseModel):
+    index: int
+    detail: str
+
+class AuctionBatchResult(_pydantic.BaseModel):
+    created: List[Auction]
+    errors: List[AuctionBatchError]
+
 
 class _BidBase(_pydantic.BaseModel):
     auctionID: int
@@ -61,3 +79,31 @@ class Bid(_BidBase):
     class Config:
         orm_mode = True
 
+class LotStatistic(_pydantic.BaseModel):
+    auctionID: int
+    lotNr: int
+    firstBid: Optional[_dt.datetime]
+    lotEnding: Optional[_dt.datetime]
+    duration: Optional[float]
+    numberOfBids: int
+
+    class Config:
+        orm_mode = True
+
+class LotState(_pydantic.BaseModel):
+    auctionID: int
+    lotNr: int
+    highestBid: Optional[float]
+    leadingAccountID: Optional[int]
+    leadingBidNr: Optional[int]
+    numberOfBids: int
+
+class BidderFeatures(_pydantic.BaseModel):
+    auctionID: int
+    lotNr: int
+    accountID: int
+    NOB: int
+    ABP: float
+    HBP: Optional[float]
+    TOE: Optional[float]
+    TOX: Optional[float]
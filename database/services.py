@@ -1,16 +1,33 @@
 import datetime as _dt
+import os
+from typing import List
+import numpy as np
 import sqlalchemy as _sql
 import sqlalchemy.orm as _orm
-import pandas as pd
-
-import pickle as pkl
 
+import database.bidsearch as _bidsearch
+import database.cache as _cache
 import database.database as _database
+import database.features as _features
+import database.intervals as _intervals
+import database.lotstats as _lotstats
 import database.models as _models
+import database.registry as _registry
 import database.schemas as _schemas
 
+# 'search' finds the starting bid over the whole price range, 'grid' tests the original candidates 100 up to 190.
+STARTING_BID_MODE = os.environ.get("STARTING_BID_MODE", "search")
+
 def create_database():
-    return _database.Base.metadata.create_all(bind=_database.engine)
+    _database.Base.metadata.create_all(bind=_database.engine)
+
+    # Install the triggers maintaining the lot statistics, backfilling them if they were missing
+    conn = _database.engine.raw_connection()
+    try:
+        _lotstats.install(conn)
+        conn.commit()
+    finally:
+        conn.close()
 
 def get_db():
     """
@@ -25,50 +42,64 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """
+    Setup read-only database session on the reader connection pool, which is always closed after use.
+
+    Yields:
+        db: read-only database session
+    """
+    db = _database.ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
 def check_auction_presence(db:_orm.Session, companyName, auctionStart, auctionEnd):
     """
     Check if the requested auction company already has an auction overlapping the start and end date.
 
+    Uses the interval index of the auctions per company, caught up with the committed auctions first, so every kind of
+    overlap (including an existing auction within or around the requested period) is found in O(log n).
+
     Args:
         db (_orm.Session): Database session.
         companyName: The name of the related company.
         auctionStart: The start date and time of the auction.
         auctionEnd: The end date and time of the auction.
+
+    Returns:
+        An overlapping auction, or None.
     """
-    return db.query(_models.Auction).filter(
-        _sql.and_(
-            _models.Auction.relatedCompany == companyName,
-            _sql.or_(  # Test whether start or end falls within other auction of same company
-                _sql.and_(
-                    _models.Auction.auctionStart <= auctionStart,
-                    _models.Auction.auctionEnd >= auctionStart
-                    ),
-                _sql.and_(
-                    _models.Auction.auctionStart <= auctionEnd,
-                    _models.Auction.auctionEnd >= auctionEnd
-                    )
-                )
-            )
-        ).first()
-    
-def get_auctions(db:_orm.Session, skip:int, limit:int):
+    _intervals.auction_intervals.catch_up()
+    auctionID = _intervals.auction_intervals.overlapping(companyName, auctionStart, auctionEnd)
+    if auctionID is None:
+        return None
+    return get_auction_by_ID(db=db, auctionID=auctionID)
+
+def get_auctions(db:_orm.Session, skip:int, limit:int, after:tuple=None):
     """
-    Retrieve the given number of auctions from the database
+    Retrieve the given number of auctions from the database, ordered by id
 
     Args:
         db (_orm.Session): Database session.
-        skip (int): The amount of records skipped before start of retrieval
+        skip (int): The amount of records skipped before start of retrieval, ignored when after is given
         limit (int): The maximum amount of records returned
+        after (tuple, optional): Key (id,) of the last auction of the previous page; seeks through the primary key instead of skipping records
     """
-    return db.query(_models.Auction).offset(skip).limit(limit).all()
+    query = db.query(_models.Auction).order_by(_models.Auction.id)
+    if after is not None:
+        return query.filter(_models.Auction.id > after[0]).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
-def create_auction(db:_orm.Session, auction:_schemas.AuctionCreate):
+def create_auction(db:_orm.Session, auction:_schemas.AuctionCreate, commit:bool=True):
     """
     Create an auction, automatically generating the id
 
     Args:
         db (_orm.Session): Database session.
         auction (_schemas.AuctionCreate): Schema for auction creation.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
     """
     db_auction = _models.Auction(
         relatedCompany=auction.relatedCompany,
@@ -77,6 +108,9 @@ def create_auction(db:_orm.Session, auction:_schemas.AuctionCreate):
         branchCategory=auction.branchCategory
         )
     db.add(db_auction)
+    if not commit:
+        db.flush()
+        return db_auction
     db.commit()
     db.refresh(db_auction)
     return db_auction
@@ -94,13 +128,16 @@ def get_auction_by_ID(db:_orm.Session, auctionID:int):
     """
     return db.query(_models.Auction).filter(_models.Auction.id == auctionID).first()
 
-def create_lot(db:_orm.Session, lot:_schemas.LotCreate):
+def create_lot(db:_orm.Session, lot:_schemas.LotCreate, model:_registry.ModelArtifacts=None, commit:bool=True, startingBid:int=None):
     """
     Create a lot, automatically generating a lot number by incrementing the number of the last created lot
 
     Args:
         db (_orm.Session): Database session.
         lot (_schemas.LotCreate): Schema for lot creation.
+        model (_registry.ModelArtifacts, optional): Model snapshot used for the starting bid. Defaults to the active registry model.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
+        startingBid (int, optional): Starting bid predicted beforehand, so no inference runs in the write transaction. Defaults to None, predicting it here.
     """
     queryRes = db.query(_models.Lots).filter(_models.Lots.auctionID == lot.auctionID).order_by(_models.Lots.lotNr.desc()).first()
     if queryRes:
@@ -108,15 +145,17 @@ def create_lot(db:_orm.Session, lot:_schemas.LotCreate):
     else:
         lotnumber=1
 
-    auctionDuration = get_auction_duration(db=db, auctionID=lot.auctionID)
-    print(auctionDuration)
-    startingBid = get_starting_bid(
-        numberOfItems=lot.numberOfItems,
-        estimatedValue=lot.estimatedValue,
-        reserveBid=lot.reserveBid,
-        auctionDuration=auctionDuration,
-        category=lot.mainCategory
-        )
+    if startingBid is None:
+        auctionDuration = get_auction_duration(db=db, auctionID=lot.auctionID)
+        print(auctionDuration)
+        startingBid = get_starting_bid(
+            numberOfItems=lot.numberOfItems,
+            estimatedValue=lot.estimatedValue,
+            reserveBid=lot.reserveBid,
+            auctionDuration=auctionDuration,
+            category=lot.mainCategory,
+            model=model
+            )
 
     db_lot = _models.Lots(
         auctionID=lot.auctionID,
@@ -136,22 +175,32 @@ def create_lot(db:_orm.Session, lot:_schemas.LotCreate):
         )
 
     db.add(db_lot)
+    if not commit:
+        # Flush, so a following lot of the same auction in this transaction sees this lot number.
+        db.flush()
+        return db_lot
     db.commit()
     db.refresh(db_lot)
     return db_lot
 
-def get_lots_by_auctionID(db:_orm.Session, auctionID:int, skip:int, limit:int):
+def get_lots_by_auctionID(db:_orm.Session, auctionID:int, skip:int, limit:int, after:tuple=None):
     """
-    Retrieve all lots belonging to the given auction id
+    Retrieve all lots belonging to the given auction id, ordered by lot number
 
     Args:
         db (_orm.Session): Database session.
         auctionID (int): ID of the auction to be searched.
+        skip (int): The amount of records skipped before start of retrieval, ignored when after is given
+        limit (int): The maximum amount of records returned
+        after (tuple, optional): Key (auctionID, lotNr) of the last lot of the previous page; seeks through the primary key instead of skipping records
 
     Returns:
         A list of all lots belonging to the given auction
     """
-    return db.query(_models.Lots).filter(_models.Lots.auctionID == auctionID).offset(skip).limit(limit).all()
+    query = db.query(_models.Lots).filter(_models.Lots.auctionID == auctionID).order_by(_models.Lots.lotNr)
+    if after is not None:
+        return query.filter(_models.Lots.lotNr > after[1]).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def get_auction_lot_combination(db:_orm.Session, auctionID:int, lotNr:int):
     """
@@ -169,64 +218,156 @@ def get_auction_lot_combination(db:_orm.Session, auctionID:int, lotNr:int):
                     )
                 ).first()
 
-def get_bids_by_IDs(db:_orm.Session, auctionID:int, lotNr:int, skip:int, limit:int):
+def get_lot_statistics(db:_orm.Session, auctionID:int, lotNr:int):
+    """
+    Retrieve the maintained statistics (first bid, lot ending and duration) of the given auction and lot.
+
+    Args:
+        db (_orm.Session): Database session.
+        auctionID (int): ID reference of the auction.
+        lotNr (int): Lot number refering to the product to be sold in the given auction.
+    """
+    return db.query(_models.LotStatistics).filter(
+                _sql.and_(
+                    _models.LotStatistics.auctionID==auctionID,
+                    _models.LotStatistics.lotNr==lotNr
+                    )
+                ).first()
+
+def get_bids_by_IDs(db:_orm.Session, auctionID:int, lotNr:int, skip:int, limit:int, after:tuple=None):
     """
-    Retrieve all lots belonging to the given auction id
+    Retrieve all bids belonging to the given auction id and lot number, ordered by bid number
 
     Args:
         db (_orm.Session): Database session.
         auctionID (int): ID of the auction to be searched.
+        lotNr (int): Number of the lot to be searched.
+        skip (int): The amount of records skipped before start of retrieval, ignored when after is given
+        limit (int): The maximum amount of records returned
+        after (tuple, optional): Key (auctionID, lotNr, bidNr) of the last bid of the previous page; seeks through the primary key instead of skipping records
 
     Returns:
-        A list of all lots belonging to the given auction
+        A list of all bids belonging to the given auction lot
     """
-    return db.query(_models.Bids).filter(
+    query = db.query(_models.Bids).filter(
                     _sql.and_(
                         _models.Bids.auctionID == auctionID,
                         _models.Bids.lotNr == lotNr
                         )        
-                    ).offset(skip).limit(limit).all()
+                    ).order_by(_models.Bids.bidNr)
+    if after is not None:
+        return query.filter(_models.Bids.bidNr > after[2]).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+# Closing times of the bid path. Auctions cannot be changed through the API, but a delta sync (database/sync.py, run
+# from another process) may move their end, so a cached closing time expires after AUCTION_END_CACHE_TTL seconds.
+AUCTION_END_CACHE_TTL = float(os.environ.get("AUCTION_END_CACHE_TTL", 60))
+_auction_end_cache = _cache.LRUCache(maxsize=10000, ttl=AUCTION_END_CACHE_TTL)
+
+# Starting bids per (model version, search settings, normalized lot features); emptied whenever the model is reloaded.
+_starting_bid_cache = _cache.LRUCache(maxsize=int(os.environ.get("STARTING_BID_CACHE_SIZE", 100000)))
+_registry.registry.add_reload_listener(lambda artifacts: _starting_bid_cache.clear())
+
+# Allocates the next bidNr of the lot and inserts the bid in one statement. SQLite takes the write lock before the
+# statement reads MAX(bidNr), so concurrent writers (also in other processes) cannot allocate the same number.
+_INSERT_BID = _sql.text("""
+    INSERT INTO bids (auctionID, lotNr, bidNr, isCombination, accountID, isCompany, bidPrice, biddingDateTime, closingDateTime)
+    SELECT :auctionID, :lotNr, COALESCE(MAX(bidNr), 0) + 1, :isCombination, :accountID, :isCompany, :bidPrice, :biddingDateTime, :closingDateTime
+    FROM bids
+    WHERE auctionID = :auctionID AND lotNr = :lotNr
+    RETURNING bidNr
+    """).bindparams(
+        _sql.bindparam("isCombination", type_=_sql.Boolean),
+        _sql.bindparam("isCompany", type_=_sql.Boolean),
+        _sql.bindparam("biddingDateTime", type_=_sql.DateTime),
+        _sql.bindparam("closingDateTime", type_=_sql.DateTime)
+        )
+_BID_RETRIES = 5
+
+# Persists the leading bid on the lot when the new bid is the first one (replacing the placeholder of create_lot) or
+# outbids the current bid. The bid is the first one when the lot has no bid with a lower number (a primary key seek).
+# The winner and price of a settled auction (database/settlement.py) are final and never overwritten.
+_UPDATE_LEADER = _sql.text("""
+    UPDATE lots
+    SET currentBid = :bidPrice, buyerAccountID = :accountID
+    WHERE auctionID = :auctionID AND lotNr = :lotNr
+        AND (currentBid IS NULL OR currentBid < :bidPrice
+            OR NOT EXISTS (SELECT 1 FROM bids WHERE auctionID = :auctionID AND lotNr = :lotNr AND bidNr < :bidNr))
+        AND :auctionID NOT IN (SELECT auctionID FROM auction_settlements)
+    """)
+
+def get_cache_stats() -> dict:
+    """
+    Return the size and hit/miss counters of the in-process caches of the services.
+    """
+    return {
+        'startingBids': _starting_bid_cache.stats(),
+        'auctionEnds': _auction_end_cache.stats()
+        }
 
-def create_bid(db:_orm.Session, bid:_schemas.BidCreate):
+def get_auction_end(db:_orm.Session, auctionID:int) -> _dt.datetime:
     """
-    Create a bid, automatically generating a lot number by incrementing the number of the last created bid
+    Retrieve the closing date and time of an auction, cached for AUCTION_END_CACHE_TTL seconds after a lookup.
+
+    Args:
+        db (_orm.Session): Database session.
+        auctionID (int): ID reference of the auction.
+
+    Returns:
+        _dt.datetime: The end date and time of the auction.
+    """
+    auctionEnd = _auction_end_cache.get(auctionID)
+    if auctionEnd is None:
+        auctionEnd = db.query(_models.Auction.auctionEnd).filter(_models.Auction.id == auctionID).scalar()
+        _auction_end_cache.set(auctionID, auctionEnd)
+    return auctionEnd
+
+def create_bid(db:_orm.Session, bid:_schemas.BidCreate, commit:bool=True):
+    """
+    Create a bid, atomically allocating the next bid number of the concerning auction lot and updating the current bid
+    and buyer of the lot in the same transaction
 
     Args:
         db (_orm.Session): Database Session.
         bid (_schemas.BidCreate): Schema for bid creation.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
+
+    Returns:
+        The created bid, or None when the auction has ended. A late bid is rejected without raising, so it does not
+        roll back the group commit of the write queue it is part of.
     """
-    # Retrieve bid number for reference incrementation
-    queryRes = db.query(_models.Bids).filter(
-        _sql.and_(
-            _models.Bids.auctionID == bid.auctionID,
-            _models.Bids.lotNr == bid.lotNr
-            )
-        ).order_by(_models.Bids.bidNr.desc()).first()
-    
-    if queryRes:
-        bidnumber=queryRes.bidNr + 1
-    else:
-        bidnumber=1
-
-    # Retrieve auction for closingDateTime
-    relatedAuction = db.query(_models.Auction).filter(_models.Auction.id==bid.auctionID).first()
-
-    db_bid = _models.Bids(
-        auctionID=bid.auctionID,
-        lotNr=bid.lotNr,
-        bidNr=bidnumber,
-        isCombination=bid.isCombination,
-        accountID=bid.accountID,
-        isCompany=bid.isCompany,
-        bidPrice=bid.bidPrice,
-        biddingDateTime=_dt.datetime.now(),
-        closingDateTime=relatedAuction.auctionEnd
-        )
-    
-    db.add(db_bid)
-    db.commit()
-    db.refresh(db_bid)
-    return db_bid
+    params = {
+        'auctionID': bid.auctionID,
+        'lotNr': bid.lotNr,
+        'isCombination': bid.isCombination,
+        'accountID': bid.accountID,
+        'isCompany': bid.isCompany,
+        'bidPrice': bid.bidPrice,
+        'biddingDateTime': _dt.datetime.now(),
+        'closingDateTime': get_auction_end(db=db, auctionID=bid.auctionID)
+        }
+    if params['closingDateTime'] is not None and params['biddingDateTime'] > params['closingDateTime']:
+        return None
+
+    if not commit:
+        bidnumber = db.execute(_INSERT_BID, params).scalar()
+        db.execute(_UPDATE_LEADER, dict(params, bidNr=bidnumber))
+        return _models.Bids(bidNr=bidnumber, **params)
+
+    # Retry when another writer holds the lock for too long or (defensively) claimed the same bid number.
+    for attempt in range(_BID_RETRIES):
+        try:
+            bidnumber = db.execute(_INSERT_BID, params).scalar()
+            db.execute(_UPDATE_LEADER, dict(params, bidNr=bidnumber))
+            db.commit()
+            break
+        except (_sql.exc.IntegrityError, _sql.exc.OperationalError):
+            db.rollback()
+            if attempt == _BID_RETRIES - 1:
+                raise
+
+    # All values are known, so the bid is returned without reading it back from the database.
+    return _models.Bids(bidNr=bidnumber, **params)
 
 def get_auction_duration(db:_orm.session, auctionID:int) -> int:
     """
@@ -240,9 +381,123 @@ def get_auction_duration(db:_orm.session, auctionID:int) -> int:
         int: The duration of the auction in hours.
     """
     auction = get_auction_by_ID(db=db, auctionID=auctionID)
-    return int((auction.auctionEnd - auction.auctionStart) / _dt.timedelta(hours=1))
+    return _features.auction_duration(auctionStart=auction.auctionStart, auctionEnd=auction.auctionEnd)
 
-def get_starting_bid(numberOfItems:int, estimatedValue:int, reserveBid:int, auctionDuration:int, category:str) -> int:
+def _predict_starting_bids(numberOfItems, estimatedValue, reserveBid, auctionDuration, category, model:_registry.ModelArtifacts,
+                            mode:str=STARTING_BID_MODE, low:float=_bidsearch.LOW, high:float=_bidsearch.HIGH, step:float=_bidsearch.STEP,
+                            threshold:float=_bidsearch.THRESHOLD) -> np.ndarray:
+    """
+    Predict the starting bids of the given lots without consulting the prediction cache, see get_starting_bids.
+    """
+    numberOfItems, estimatedValue, reserveBid, auctionDuration = (
+        np.asarray(values, dtype=np.float64) for values in (numberOfItems, estimatedValue, reserveBid, auctionDuration)
+        )
+    category = np.asarray(category, dtype=object)
+
+    if mode == 'search':
+        def saleProbability(lots:np.ndarray, startingBids:np.ndarray) -> np.ndarray:
+            X = _features.build_feature_matrix(
+                numberOfItems=numberOfItems[lots],
+                estimatedValue=estimatedValue[lots],
+                startingBid=startingBids,
+                reserveBid=reserveBid[lots],
+                auctionDuration=auctionDuration[lots],
+                categories=category[lots],
+                OHcols=model.OHcols,
+                scaler=model.scaler
+                )
+            return _features.predict_proba(model.model, X)
+
+        startingBids, _ = _bidsearch.search(
+            len(numberOfItems), saleProbability, low=low, high=high, step=step, threshold=threshold
+            )
+        return startingBids
+
+    startingBids = np.arange(100, 200, 10)
+    nrOfLots = len(numberOfItems)
+    nrOfCandidates = len(startingBids)
+
+    # One row per (lot, candidate starting bid), lot-major.
+    X = _features.build_feature_matrix(
+        numberOfItems=np.repeat(numberOfItems, nrOfCandidates),
+        estimatedValue=np.repeat(estimatedValue, nrOfCandidates),
+        startingBid=np.tile(startingBids, nrOfLots),
+        reserveBid=np.repeat(reserveBid, nrOfCandidates),
+        auctionDuration=np.repeat(auctionDuration, nrOfCandidates),
+        categories=np.repeat(category, nrOfCandidates),
+        OHcols=model.OHcols,
+        scaler=model.scaler
+        )
+    saleNoSale = _features.predict(model.model, X).reshape(nrOfLots, nrOfCandidates) == 1.0
+
+    # Highest candidate predicted to sell: the last True per row.
+    anySale = saleNoSale.any(axis=1)
+    lastSale = nrOfCandidates - 1 - np.argmax(saleNoSale[:, ::-1], axis=1)
+    return np.where(anySale, startingBids[lastSale], np.nan)
+
+def get_starting_bids(numberOfItems, estimatedValue, reserveBid, auctionDuration, category, model:_registry.ModelArtifacts=None,
+                      mode:str=STARTING_BID_MODE, low:float=_bidsearch.LOW, high:float=_bidsearch.HIGH, step:float=_bidsearch.STEP,
+                      threshold:float=_bidsearch.THRESHOLD) -> np.ndarray:
+    """
+    Return the optimal starting bid (highest with prediction sale) for every given lot, predicting all lots together.
+
+    Results are memoized per normalized feature tuple, model version and search settings; only lots not seen before
+    (and each distinct one once) go through scaling and inference.
+
+    All arguments up to model are array-likes with one entry per lot.
+
+    Args:
+        numberOfItems: The number of items in the concerning lot.
+        estimatedValue: The estimated values of the items comprising the lot.
+        reserveBid: The minimal amount accepted as a sale by the seller.
+        auctionDuration: The total duration of the auction.
+        category: The branch category in which the auction will take place.
+        model (_registry.ModelArtifacts, optional): Model snapshot to predict with. Defaults to the active registry model.
+        mode (str, optional): 'search' for a batched k-ary search over [low, high] on predict_proba, or 'grid' for the
+            original candidates 100 up to 190 on a single model.predict call. Defaults to STARTING_BID_MODE.
+        low (float, optional): Lowest starting bid searched. Defaults to _bidsearch.LOW.
+        high (float, optional): Highest starting bid searched. Defaults to _bidsearch.HIGH.
+        step (float, optional): Precision of the searched starting bid. Defaults to _bidsearch.STEP.
+        threshold (float, optional): Minimal sale probability in search mode. Defaults to _bidsearch.THRESHOLD.
+
+    Returns:
+        np.ndarray: Proposed starting bid per lot. In grid mode NaN for lots without any candidate predicted to sell,
+            in search mode the lower bound.
+    """
+    # Use a single snapshot for the whole prediction, so a concurrent reload cannot mix artifacts.
+    if model is None:
+        model = _registry.get_model()
+    settings = (model.version, mode, float(low), float(high), float(step), float(threshold))
+    keys = [
+        settings + (int(items), float(value), float(reserve), int(duration), str(cat))
+        for items, value, reserve, duration, cat in zip(numberOfItems, estimatedValue, reserveBid, auctionDuration, category)
+        ]
+
+    startingBids = np.empty(len(keys))
+    missing = {}
+    for idx, key in enumerate(keys):
+        cached = _starting_bid_cache.get(key)
+        if cached is None:
+            missing.setdefault(key, []).append(idx)
+        else:
+            startingBids[idx] = cached
+
+    if missing:
+        first = [indices[0] for indices in missing.values()]
+        predicted = _predict_starting_bids(
+            numberOfItems=[numberOfItems[idx] for idx in first],
+            estimatedValue=[estimatedValue[idx] for idx in first],
+            reserveBid=[reserveBid[idx] for idx in first],
+            auctionDuration=[auctionDuration[idx] for idx in first],
+            category=[category[idx] for idx in first],
+            model=model, mode=mode, low=low, high=high, step=step, threshold=threshold
+            )
+        for (key, indices), startingBid in zip(missing.items(), predicted):
+            _starting_bid_cache.set(key, float(startingBid))
+            startingBids[indices] = startingBid
+    return startingBids
+
+def get_starting_bid(numberOfItems:int, estimatedValue:int, reserveBid:int, auctionDuration:int, category:str, model:_registry.ModelArtifacts=None) -> int:
     """
     Return the optimal starting bid (highest with prediction sale) for the given auction lot.
 
@@ -252,42 +507,192 @@ def get_starting_bid(numberOfItems:int, estimatedValue:int, reserveBid:int, auct
         reserveBid (int): The minimal amount accepted as a sale by the seller.
         auctionDuration (int): The total duration of the auction.
         category (str): The branch category in which the auction will take place.
+        model (_registry.ModelArtifacts, optional): Model snapshot to predict with. Defaults to the active registry model.
+
+    Raises:
+        ValueError: None of the candidate starting bids is predicted to sell (grid mode).
 
     Returns:
         int: Proposed starting bid value.
     """
+    startingBid = get_starting_bids(
+        numberOfItems=[numberOfItems],
+        estimatedValue=[estimatedValue],
+        reserveBid=[reserveBid],
+        auctionDuration=[auctionDuration],
+        category=[category],
+        model=model
+        )[0]
+    if np.isnan(startingBid):
+        raise ValueError("None of the candidate starting bids is predicted to sell")
+    return int(startingBid)
+
+def get_auctions_by_IDs(db:_orm.Session, auctionIDs) -> dict:
+    """
+    Retrieve the given auctions in one query.
 
-    model = pkl.load(open("./src/SavedModels/model.pkl", "rb"))
-    scl = pkl.load(open("./src/SavedModels/scaler.pkl", "rb"))
-    OHcols = pkl.load(open("./src/SavedModels/OHcols.pkl", "rb"))
+    Args:
+        db (_orm.Session): Database session.
+        auctionIDs: IDs of the auctions to be retrieved.
+
+    Returns:
+        dict: The auctions found, by id.
+    """
+    return {
+        auction.id: auction for auction in
+        db.query(_models.Auction).filter(_models.Auction.id.in_(set(auctionIDs))).all()
+        }
+
+def predict_lots_starting_bids(lots:List[_schemas.LotCreate], auctions:dict, model:_registry.ModelArtifacts=None) -> np.ndarray:
+    """
+    Predict the starting bids of the given lots in one inference pass, without touching the database.
+
+    Args:
+        lots (List[_schemas.LotCreate]): Schemas for lot creation.
+        auctions (dict): The auctions of the lots by id, see get_auctions_by_IDs.
+        model (_registry.ModelArtifacts, optional): Model snapshot to predict with. Defaults to the active registry model.
+
+    Returns:
+        np.ndarray: Proposed starting bid per lot, NaN for lots of an unknown auction and (grid mode) lots without any
+            candidate predicted to sell.
+    """
+    startingBids = np.full(len(lots), np.nan)
+    candidates = [idx for idx, lot in enumerate(lots) if lot.auctionID in auctions]
+    if candidates:
+        startingBids[candidates] = get_starting_bids(
+            numberOfItems=[lots[idx].numberOfItems for idx in candidates],
+            estimatedValue=[lots[idx].estimatedValue for idx in candidates],
+            reserveBid=[lots[idx].reserveBid for idx in candidates],
+            auctionDuration=[
+                _features.auction_duration(
+                    auctionStart=auctions[lots[idx].auctionID].auctionStart,
+                    auctionEnd=auctions[lots[idx].auctionID].auctionEnd
+                    )
+                for idx in candidates
+                ],
+            category=[lots[idx].mainCategory for idx in candidates],
+            model=model
+            )
+    return startingBids
 
-    startingBids = list(range(100, 200, 10))
+def create_lots_batch(db:_orm.Session, lots:List[_schemas.LotCreate], model:_registry.ModelArtifacts=None, commit:bool=True,
+                      startingBids:list=None) -> _schemas.LotBatchResult:
+    """
+    Create many lots in a single transaction, predicting all starting bids in one inference pass.
 
-    def onehotencode(df, category):
-        dfc = df.copy(deep=True)
-        NrOfRows = len(dfc)
-        for cat in OHcols:
-            if category == cat:
-                dfc[f'BC_{cat}'] = [1] * NrOfRows
-            else:
-                dfc[f'BC_{cat}'] = [0] * NrOfRows
-        return dfc
+    Lots referring to a non-existing auction or without a starting bid predicted to sell are reported as errors,
+    the remaining lots are still created. Lot numbers are assigned contiguously per auction in payload order.
 
-    trialdf = pd.DataFrame(data={
-        'numberOfItems': [numberOfItems] * len(startingBids),
-        'estimatedValue': [estimatedValue] * len(startingBids),
-        'startingBid': startingBids,
-        'reserveBid': [reserveBid] * len(startingBids),
-        'auctionDuration': [auctionDuration] * len(startingBids),
-    })
+    Args:
+        db (_orm.Session): Database session.
+        lots (List[_schemas.LotCreate]): Schemas for lot creation.
+        model (_registry.ModelArtifacts, optional): Model snapshot used for the starting bids. Defaults to the active registry model.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
+        startingBids (list, optional): Starting bid per lot predicted beforehand with the same model (see
+            predict_lots_starting_bids), so no inference runs in the write transaction. Defaults to None, predicting them here.
 
-    trialdf = onehotencode(df=trialdf, category=category)
+    Returns:
+        _schemas.LotBatchResult: Created lots and per-item errors.
+    """
+    if model is None:
+        model = _registry.get_model()
+    errors = []
+
+    # Validate every referenced auction and fetch the last lot number per auction in two queries.
+    auctions = get_auctions_by_IDs(db=db, auctionIDs=[lot.auctionID for lot in lots])
+    lastLotNrs = dict(
+        db.query(_models.Lots.auctionID, _sql.func.max(_models.Lots.lotNr))
+        .filter(_models.Lots.auctionID.in_(auctions.keys()))
+        .group_by(_models.Lots.auctionID)
+        .all()
+        )
 
-    trialdf[['numberOfItems', 'estimatedValue', 'startingBid', 'reserveBid', 'auctionDuration']] = scl.transform(
-        trialdf[['numberOfItems', 'estimatedValue', 'startingBid', 'reserveBid', 'auctionDuration']]) 
+    candidates = []
+    for idx, lot in enumerate(lots):
+        if lot.auctionID not in auctions:
+            errors.append(_schemas.LotBatchError(index=idx, detail="Requested auction does not exist"))
+        else:
+            candidates.append(idx)
+
+    if startingBids is None:
+        startingBids = predict_lots_starting_bids(lots=lots, auctions=auctions, model=model)
+
+    db_lots = []
+    for idx in candidates:
+        startingBid = startingBids[idx]
+        if np.isnan(startingBid):
+            errors.append(_schemas.LotBatchError(index=idx, detail="None of the candidate starting bids is predicted to sell"))
+            continue
+
+        lot = lots[idx]
+        lotnumber = lastLotNrs.get(lot.auctionID, 0) + 1
+        lastLotNrs[lot.auctionID] = lotnumber
+        db_lots.append(_models.Lots(
+            auctionID=lot.auctionID,
+            lotNr=lotnumber,
+            numberOfItems=lot.numberOfItems,
+            estimatedValue=lot.estimatedValue,
+            startingBid=int(startingBid),
+            reserveBid=lot.reserveBid,
+            mainCategory=lot.mainCategory,
+            countryCode='NL',
+            VAT=21,
+            suffix='N/A',
+            saleDate=_dt.datetime(year=1000, month=1, day=1, hour=0, minute=0, second=0),
+            buyerAccountID=99999,
+            currentBid=99999,
+            sold=False
+            ))
+
+    db.add_all(db_lots)
+    db.flush()
+    # Serialize before committing, so the expired instances are not reloaded one by one.
+    created = [_schemas.Lot.from_orm(db_lot) for db_lot in db_lots]
+    if commit:
+        db.commit()
+
+    errors.sort(key=lambda error: error.index)
+    return _schemas.LotBatchResult(created=created, errors=errors, modelVersion=model.version)
+
+def create_auctions_batch(db:_orm.Session, auctions:List[_schemas.AuctionCreate], commit:bool=True) -> _schemas.AuctionBatchResult:
+    """
+    Create a whole schedule of auctions in a single transaction, checking every auction for overlaps in one pass.
+
+    Auctions overlapping an existing auction of their company, or an earlier auction of the same company in the
+    payload, are reported as errors; the remaining auctions are still created.
 
-    trialdf['saleNoSale'] = model.predict(trialdf)
-    idx = trialdf[trialdf['saleNoSale'] == 1.0].index.tolist()
-    startingBid = startingBids[max(idx)]
+    Args:
+        db (_orm.Session): Database session.
+        auctions (List[_schemas.AuctionCreate]): Schemas for auction creation.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
 
-    return startingBid
\ No newline at end of file
+    Returns:
+        _schemas.AuctionBatchResult: Created auctions and per-item errors.
+    """
+    _intervals.auction_intervals.catch_up()
+    # Auctions this session wrote but the index has not seen yet (e.g. earlier in the same group commit), plus the payload.
+    pending = _intervals.AuctionIntervals()
+    pending.add(db.execute(_sql.text(_intervals.NEW_AUCTIONS), {'after': _intervals.auction_intervals.watermark}).fetchall())
+
+    errors = []
+    db_auctions = []
+    for idx, auction in enumerate(auctions):
+        if (_intervals.auction_intervals.overlapping(auction.relatedCompany, auction.auctionStart, auction.auctionEnd) is not None
+                or pending.overlapping(auction.relatedCompany, auction.auctionStart, auction.auctionEnd) is not None):
+            errors.append(_schemas.AuctionBatchError(index=idx, detail="Auction already exists"))
+            continue
+        pending.add([(-1 - idx, auction.relatedCompany, auction.auctionStart, auction.auctionEnd)])
+        db_auctions.append(_models.Auction(
+            relatedCompany=auction.relatedCompany,
+            auctionStart=auction.auctionStart,
+            auctionEnd=auction.auctionEnd,
+            branchCategory=auction.branchCategory
+            ))
+
+    db.add_all(db_auctions)
+    db.flush()
+    # Serialize before committing, so the expired instances are not reloaded one by one.
+    created = [_schemas.Auction.from_orm(db_auction) for db_auction in db_auctions]
+    if commit:
+        db.commit()
+    return _schemas.AuctionBatchResult(created=created, errors=errors)
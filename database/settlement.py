@@ -0,0 +1,281 @@
+"""
+Settlement of closed auctions: sold, winning bidder, final price and sale date of every lot, set at auctionEnd.
+
+Usage (from the repository root):
+    python -m database.settlement            # settle every auction that closed and was not settled yet
+"""
+import argparse
+import datetime as _dt
+import heapq
+import threading
+import time
+
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.intervals as _intervals
+import database.models as _models
+import database.responsecache as _responsecache
+import database.writer as _writer
+
+
+# Auctions settled per transaction when catching up on many closings at once.
+BATCH = 500
+# Seconds before a failed settlement is tried again.
+RETRY = 5.0
+# Longest sleep of the scheduler, so a changed system clock and auctions added or changed by a delta sync are noticed.
+MAX_SLEEP = 60.0
+# Sale date create_lot gives a lot until it is settled.
+UNSETTLED_SALE_DATE = _dt.datetime(year=1000, month=1, day=1)
+
+_UNSETTLED_AUCTIONS = """
+    SELECT auctions.id, auctions.auctionEnd
+    FROM auctions
+    LEFT JOIN auction_settlements ON auction_settlements.auctionID = auctions.id
+    WHERE auctions.id > :after AND auctions.auctionEnd IS NOT NULL AND auction_settlements.auctionID IS NULL
+    ORDER BY auctions.id"""
+
+# Per lot of the given auctions the highest bid placed before the auction closed, on equal prices the earliest bid.
+# Lots already sold (e.g. imported history) or settled are left alone, so running the update again changes nothing.
+_SETTLE_LOTS = _sql.text("""
+    UPDATE lots
+    SET sold = winners.bidPrice >= COALESCE(lots.reserveBid, 0),
+        saleDate = CASE WHEN winners.bidPrice >= COALESCE(lots.reserveBid, 0) THEN winners.auctionEnd ELSE lots.saleDate END,
+        currentBid = winners.bidPrice,
+        buyerAccountID = winners.accountID
+    FROM (
+        SELECT auctionID, lotNr, bidPrice, accountID, auctionEnd
+        FROM (
+            SELECT bids.auctionID, bids.lotNr, bids.bidPrice, bids.accountID, auctions.auctionEnd,
+                ROW_NUMBER() OVER (PARTITION BY bids.auctionID, bids.lotNr ORDER BY bids.bidPrice DESC, bids.bidNr) AS position
+            FROM bids
+            JOIN auctions ON auctions.id = bids.auctionID
+            WHERE bids.auctionID IN :auctionIDs AND bids.bidPrice IS NOT NULL
+                AND (bids.biddingDateTime IS NULL OR bids.biddingDateTime <= auctions.auctionEnd)
+        )
+        WHERE position = 1
+    ) AS winners
+    WHERE lots.auctionID = winners.auctionID AND lots.lotNr = winners.lotNr
+        AND COALESCE(lots.sold, 0) = 0 AND (lots.saleDate IS NULL OR lots.saleDate <= :unsettled)
+        AND lots.auctionID NOT IN (SELECT auctionID FROM auction_settlements)
+    """).bindparams(
+        _sql.bindparam("auctionIDs", expanding=True),
+        _sql.bindparam("unsettled", type_=_sql.DateTime)
+        )
+
+_RECORD_SETTLEMENTS = _sql.text("""
+    INSERT OR IGNORE INTO auction_settlements (auctionID, settledAt, soldLots, unsoldLots)
+    SELECT auctions.id, :settledAt,
+        COALESCE(SUM(CASE WHEN lots.sold THEN 1 ELSE 0 END), 0),
+        COUNT(lots.lotNr) - COALESCE(SUM(CASE WHEN lots.sold THEN 1 ELSE 0 END), 0)
+    FROM auctions
+    LEFT JOIN lots ON lots.auctionID = auctions.id
+    WHERE auctions.id IN :auctionIDs AND auctions.id NOT IN (SELECT auctionID FROM auction_settlements)
+    GROUP BY auctions.id
+    RETURNING soldLots, unsoldLots
+    """).bindparams(
+        _sql.bindparam("auctionIDs", expanding=True),
+        _sql.bindparam("settledAt", type_=_sql.DateTime)
+        )
+
+
+def settle_auctions(db:_orm.Session, auctionIDs:list, settledAt:_dt.datetime=None, commit:bool=True) -> dict:
+    """
+    Settle all lots of the given auctions in one set-based pass and record the auctions as settled.
+
+    A lot is sold when its highest bid meets the reserve bid; the winning bid and bidder are stored on the lot and the
+    end of the auction becomes its sale date. Auctions that were settled before are skipped.
+
+    Args:
+        db (_orm.Session): Database session.
+        auctionIDs (list): IDs of the closed auctions.
+        settledAt (_dt.datetime, optional): Moment of settlement. Defaults to now.
+        commit (bool, optional): Commit the transaction; disable when the caller commits (e.g. the write queue). Defaults to True.
+
+    Returns:
+        dict: Number of newly settled auctions and their sold and unsold lots.
+    """
+    if not auctionIDs:
+        return {'auctions': 0, 'soldLots': 0, 'unsoldLots': 0}
+    db.execute(_SETTLE_LOTS, {'auctionIDs': list(auctionIDs), 'unsettled': UNSETTLED_SALE_DATE})
+    settled = db.execute(_RECORD_SETTLEMENTS, {
+        'auctionIDs': list(auctionIDs), 'settledAt': settledAt if settledAt is not None else _dt.datetime.now()
+        }).fetchall()
+    if commit:
+        db.commit()
+    return {
+        'auctions': len(settled),
+        'soldLots': sum(soldLots for soldLots, _ in settled),
+        'unsoldLots': sum(unsoldLots for _, unsoldLots in settled)
+        }
+
+def _submit(operation, **kwargs):
+    # Settle on the writer thread of the API, in its own transaction next to the other writes.
+    return _writer.write_queue.submit(operation, commit=False, **kwargs).result()
+
+
+class SettlementScheduler:
+    """
+    Priority queue of the auctionEnd of every unsettled auction, with a thread settling auctions as they close.
+
+    Auctions are added through their id (watermark), as the auction interval index, and the queue is loaded again after
+    a delta sync changed the auctions. At start the queue is loaded with all unsettled auctions, so closings missed
+    while the process was down are settled right away, in batches.
+    """
+    def __init__(self, read_engine=None, submit=None, batch:int=BATCH):
+        self.read_engine = read_engine if read_engine is not None else _database.read_engine
+        self.submit = submit if submit is not None else _submit
+        self.batch = batch
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._heap = []
+        self._thread = None
+        self._stopping = False
+        self.watermark = None
+        self.syncedAt = None
+        self._metrics = {'settledAuctions': 0, 'soldLots': 0, 'unsoldLots': 0, 'runs': 0, 'failures': 0}
+
+    def catch_up(self) -> int:
+        """
+        Queue the unsettled auctions created since the watermark, loading all of them if the queue was never loaded or the
+        auctions were synchronised since.
+
+        Returns:
+            int: Number of queued auctions.
+        """
+        with self._lock:
+            conn = self.read_engine.raw_connection()
+            try:
+                syncedAt = _intervals.last_sync(conn)
+                if syncedAt != self.syncedAt:
+                    # The sync may have moved the end of queued auctions.
+                    self._heap = []
+                    self.watermark = None
+                    self.syncedAt = syncedAt
+                rows = conn.execute(_UNSETTLED_AUCTIONS, {'after': self.watermark or 0}).fetchall()
+            finally:
+                conn.close()
+            earliest = self._heap[0][0] if self._heap else None
+            for auctionID, auctionEnd in rows:
+                heapq.heappush(self._heap, (_intervals.to_micros(auctionEnd), auctionID))
+                self.watermark = max(self.watermark or 0, auctionID)
+            if self._heap and (earliest is None or self._heap[0][0] < earliest):
+                self._wakeup.notify()
+            return len(rows)
+
+    def due(self, now:_dt.datetime=None) -> list:
+        """
+        Take the IDs of the queued auctions that closed at or before now from the queue.
+        """
+        now = _intervals.to_micros(now if now is not None else _dt.datetime.now())
+        with self._lock:
+            auctionIDs = []
+            while self._heap and self._heap[0][0] <= now:
+                auctionIDs.append(heapq.heappop(self._heap)[1])
+            return auctionIDs
+
+    def settle_due(self, now:_dt.datetime=None) -> dict:
+        """
+        Settle the auctions that closed at or before now, BATCH auctions per transaction. Auctions of a failed batch are
+        queued again.
+
+        Returns:
+            dict: Number of settled auctions and their sold and unsold lots.
+        """
+        now = now if now is not None else _dt.datetime.now()
+        auctionIDs = self.due(now)
+        total = {'auctions': 0, 'soldLots': 0, 'unsoldLots': 0}
+        for start in range(0, len(auctionIDs), self.batch):
+            try:
+                result = self.submit(settle_auctions, auctionIDs=auctionIDs[start:start + self.batch], settledAt=now)
+            except Exception:
+                # Due again on the next run
+                with self._lock:
+                    self._metrics['failures'] += 1
+                    for auctionID in auctionIDs[start:]:
+                        heapq.heappush(self._heap, (_intervals.to_micros(now), auctionID))
+                raise
+            # Settling changes the sold, buyer and current bid of the lots listed per auction
+            _responsecache.cache.invalidate(*[('lots', auctionID) for auctionID in auctionIDs[start:start + self.batch]])
+            for key in total:
+                total[key] += result[key]
+        with self._lock:
+            self._metrics['runs'] += 1
+            self._metrics['settledAuctions'] += total['auctions']
+            self._metrics['soldLots'] += total['soldLots']
+            self._metrics['unsoldLots'] += total['unsoldLots']
+        return total
+
+    def _seconds_until_due(self) -> float:
+        if not self._heap:
+            return MAX_SLEEP
+        wait = (self._heap[0][0] - _intervals.to_micros(_dt.datetime.now())) / 1e6
+        return min(max(wait, 0.0), MAX_SLEEP)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._stopping and self._seconds_until_due() > 0:
+                    self._wakeup.wait(self._seconds_until_due())
+                if self._stopping:
+                    return
+            try:
+                self.catch_up()
+                self.settle_due()
+            except Exception:
+                with self._lock:
+                    self._wakeup.wait_for(lambda: self._stopping, RETRY)
+
+    def start(self) -> None:
+        """
+        Load the unsettled auctions and start the scheduler thread if it is not running yet.
+        """
+        self.catch_up()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="settlement", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout:float=None) -> None:
+        """
+        Stop the scheduler thread; unsettled auctions are picked up again on the next start.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._wakeup.notify()
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        """
+        Return the settlement counters, the number of queued auctions and the next closing.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queued'] = len(self._heap)
+            metrics['nextClosing'] = (
+                (_dt.datetime(1970, 1, 1) + _dt.timedelta(microseconds=self._heap[0][0])).isoformat() if self._heap else None
+                )
+            return metrics
+
+
+scheduler = SettlementScheduler()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    _database.Base.metadata.create_all(bind=_database.engine, tables=[_models.AuctionSettlement.__table__])
+    start = time.perf_counter()
+    with _orm.Session(_database.engine) as db:
+        offline = SettlementScheduler(submit=lambda operation, **kwargs: operation(db, **kwargs))
+        offline.catch_up()
+        result = offline.settle_due()
+    print(f"--- Settled {result['auctions']:,} auctions ({result['soldLots']:,} lots sold, {result['unsoldLots']:,} unsold) "
+          f"in {time.perf_counter() - start:.1f}s ---")
+
+if __name__ == "__main__":
+    main()
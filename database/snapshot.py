@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST = "manifest.json"
+TABLES = ['auctions', 'lots', 'bids']
+# Seconds an unreferenced column folder is kept, so a snapshot another process is still writing is not removed.
+STALE_GRACE = 3600
+
+
+def database_key(location:str) -> dict:
+    """
+    Change indicator of the database: modification time and size of the database file and its write-ahead log.
+
+    Commits in WAL mode only touch the -wal file until a checkpoint copies them into the database file,
+    so both are part of the key.
+    """
+    key = {}
+    for suffix in ('', '-wal'):
+        try:
+            stat = os.stat(location + suffix)
+        except FileNotFoundError:
+            continue
+        key[f"db{suffix}"] = [stat.st_mtime_ns, stat.st_size]
+    return key
+
+def column_kinds(conn, table:str) -> dict:
+    """
+    Map the columns of a table onto the way they are stored in the snapshot, based on their declared SQLite type.
+    """
+    kinds = {}
+    for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        declared = (declared or '').upper()
+        if 'DATE' in declared or 'TIME' in declared:
+            kinds[name] = 'datetime'
+        elif 'CHAR' in declared or 'TEXT' in declared or 'CLOB' in declared:
+            kinds[name] = 'category'
+        else:
+            kinds[name] = 'numeric'
+    return kinds
+
+def read_manifest(directory:str) -> dict:
+    """
+    Return the manifest of the snapshot directory, or None if there is no (readable) snapshot.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(directory:str, manifest:dict) -> None:
+    """
+    Atomically replace the manifest, readers either see the previous or the new snapshot.
+    """
+    tmp = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+def _mappable(values:pd.Series) -> pd.Series:
+    # Convert an object column to a dtype np.load can memory map.
+    try:
+        return pd.to_numeric(values.map(lambda value: float(value) if isinstance(value, bool) else value))
+    except (ValueError, TypeError):
+        return values.map(lambda value: None if pd.isna(value) else str(value)).astype('category')
+
+def write_table(frame:pd.DataFrame, directory:str, table:str, key:dict) -> dict:
+    """
+    Write a typed table as one .npy file per column. String columns are stored as categorical codes, their
+    categories are kept in the returned manifest entry. Object columns cannot be memory mapped: they are stored as
+    numbers when all values are numeric (e.g. booleans with NULLs), as categorical codes otherwise.
+
+    Args:
+        frame (pd.DataFrame): Table with datetime and categorical columns already converted.
+        directory (str): Snapshot directory.
+        table (str): Name of the table.
+        key (dict): Database key the frame was read at, part of the folder name so snapshots never overwrite each other.
+
+    Returns:
+        dict: Manifest entry of the table.
+    """
+    folder = f"{table}-{hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]}-{os.getpid()}"
+    path = os.path.join(directory, folder)
+    os.makedirs(path, exist_ok=True)
+
+    columns = {}
+    for i, column in enumerate(frame.columns):
+        values = frame[column]
+        if values.dtype == object:
+            values = _mappable(values)
+        file = f"{i}.npy"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(path, file), values.cat.codes.to_numpy())
+            columns[column] = {'file': file, 'categories': values.cat.categories.tolist()}
+        else:
+            np.save(os.path.join(path, file), values.to_numpy())
+            columns[column] = {'file': file}
+    return {'folder': folder, 'rows': len(frame), 'columns': columns}
+
+def read_table(directory:str, entry:dict) -> pd.DataFrame:
+    """
+    Load a table from the snapshot, memory mapping its column files instead of reading them.
+
+    The returned frame is backed by read-only maps; take a copy before modifying it in place.
+    """
+    path = os.path.join(directory, entry['folder'])
+    data = {}
+    for column, meta in entry['columns'].items():
+        values = np.load(os.path.join(path, meta['file']), mmap_mode='r')
+        if 'categories' in meta:
+            values = pd.Categorical.from_codes(values, categories=meta['categories'])
+        data[column] = values
+    return pd.DataFrame(data, copy=False)
+
+def remove_stale(directory:str, manifest:dict, grace:float=STALE_GRACE) -> None:
+    """
+    Remove the column folders that are no longer referenced by the manifest (nor by the manifest on disk, which another
+    process may have written meanwhile). Folders changed within the last grace seconds are kept, they may belong to a
+    snapshot another process is still writing.
+    """
+    current = {entry['folder'] for entry in manifest['tables'].values()}
+    stored = read_manifest(directory)
+    if stored is not None:
+        current.update(entry['folder'] for entry in stored.get('tables', {}).values())
+    cutoff = time.time() - grace
+    for folder in os.listdir(directory):
+        path = os.path.join(directory, folder)
+        if not os.path.isdir(path) or folder in current:
+            continue
+        try:
+            if os.path.getmtime(path) > cutoff:
+                continue
+        except OSError:
+            # Removed by another process meanwhile
+            continue
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,183 @@
+import datetime as _dt
+import hashlib
+import sqlite3
+import time
+import os
+
+import database.bulkload as _bulkload
+
+
+# Primary key per table. The watermark is the highest key present in the table when a sync starts; rows above it are new.
+KEYS = {
+    'auctions': ['id'],
+    'lots': ['auctionID', 'lotNr'],
+    'bids': ['auctionID', 'lotNr', 'bidNr']
+    }
+STATE_TABLE = "sync_state"
+
+
+def file_hash(path:str, blocksize:int=1 << 20) -> str:
+    """
+    Calculate the sha256 content hash of a file without reading it into memory at once.
+    """
+    checksum = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+def create_state_table(conn:sqlite3.Connection) -> None:
+    """
+    Create the table holding the content hash and time of the last synchronised file per table.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            tableName TEXT PRIMARY KEY,
+            fileHash TEXT,
+            syncedAt TEXT
+        )""")
+    conn.commit()
+
+def get_file_hash(conn:sqlite3.Connection, table:str) -> str:
+    """
+    Return the content hash of the file the given table was last synchronised with, or None.
+    """
+    row = conn.execute(f"SELECT fileHash FROM {STATE_TABLE} WHERE tableName = ?", (table,)).fetchone()
+    return row[0] if row else None
+
+def current_watermark(conn:sqlite3.Connection, table:str) -> tuple:
+    """
+    Return the highest key currently present in the table, found through the primary key index. It is not stored
+    between syncs: rows added through the API since the last sync move it as well.
+    """
+    keys = KEYS[table]
+    row = conn.execute(
+        f"SELECT {', '.join(keys)} FROM {table} ORDER BY {', '.join(f'{key} DESC' for key in keys)} LIMIT 1"
+        ).fetchone()
+    return tuple(row) if row else None
+
+def upsert_statements(table:str, staging:str, watermark:tuple) -> tuple:
+    """
+    Build the statements moving rows from the staging table into the target table.
+
+    Rows above the watermark are new and inserted directly. Rows at or below it are upserted, but only written when
+    at least one column differs from the stored row, so unchanged rows do not touch the table.
+
+    Returns:
+        tuple: Insert statement for new rows, count of new rows at or below the watermark, upsert statement for
+            existing rows and the parameters of all three.
+    """
+    columns = _bulkload.COLUMNS[table]
+    keys = KEYS[table]
+    values = [column for column in columns if column not in keys]
+    keyTuple = f"({', '.join(keys)})"
+    params = watermark if watermark is not None else ()
+    aboveWatermark = f"{keyTuple} > ({', '.join(['?'] * len(keys))})" if watermark is not None else "1"
+    belowWatermark = f"NOT {aboveWatermark}" if watermark is not None else "0"
+
+    insertNew = f"""
+        INSERT OR IGNORE INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(columns)} FROM temp.{staging} WHERE {aboveWatermark}"""
+    countMissing = f"""
+        SELECT COUNT(*) FROM temp.{staging} AS s WHERE {belowWatermark} AND NOT EXISTS (
+            SELECT 1 FROM {table} AS t WHERE {' AND '.join(f't.{key} = s.{key}' for key in keys)})"""
+    upsertExisting = f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(columns)} FROM temp.{staging} WHERE {belowWatermark}
+        ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+            {', '.join(f'{column} = excluded.{column}' for column in values)}
+        WHERE {' OR '.join(f'{table}.{column} IS NOT excluded.{column}' for column in values)}"""
+    return insertNew, countMissing, upsertExisting, params
+
+def sync_table(conn:sqlite3.Connection, table:str, csv_path:str, chunksize:int=_bulkload.CHUNKSIZE, force:bool=False) -> dict:
+    """
+    Synchronise a table with a (delta) CSV export.
+
+    Every chunk is committed in its own short transaction, so readers only ever wait for a single chunk.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        table (str): Name of the target table.
+        csv_path (str): Location of the CSV file.
+        chunksize (int, optional): Number of rows per chunk. Defaults to _bulkload.CHUNKSIZE.
+        force (bool, optional): Synchronise even if the file content did not change. Defaults to False.
+
+    Returns:
+        dict: Number of read, new, changed and skipped (unchanged or invalid) rows.
+    """
+    contentHash = file_hash(csv_path)
+    storedHash = get_file_hash(conn, table)
+    if storedHash == contentHash and not force:
+        return {'read': 0, 'new': 0, 'changed': 0, 'skipped': 0, 'unchangedFile': True}
+
+    # Rows may also have been added through the API since the last sync, so the watermark is taken from the table itself.
+    watermark = current_watermark(conn, table)
+
+    columns = ', '.join(_bulkload.COLUMNS[table])
+    placeholders = ', '.join(['?'] * len(_bulkload.COLUMNS[table]))
+    staging = f"sync_{table}"
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staging}")
+    conn.execute(f"CREATE TEMP TABLE {staging} AS SELECT {columns} FROM {table} WHERE 0")
+    insertNew, countMissing, upsertExisting, params = upsert_statements(table=table, staging=staging, watermark=watermark)
+
+    counts = {'read': 0, 'new': 0, 'changed': 0, 'skipped': 0, 'unchangedFile': False}
+    for chunk in _bulkload.read_chunks(csv_path=csv_path, table=table, chunksize=chunksize):
+        conn.executemany(f"INSERT INTO temp.{staging} ({columns}) VALUES ({placeholders})", _bulkload.to_records(chunk))
+        new = conn.execute(insertNew, params).rowcount
+        # Keys below the watermark can still be new (e.g. a late bid on an older lot), the upsert inserts those as well.
+        missing = conn.execute(countMissing, params).fetchone()[0]
+        changed = conn.execute(upsertExisting, params).rowcount - missing
+        new += missing
+        conn.execute(f"DELETE FROM temp.{staging}")
+        conn.commit()
+
+        counts['read'] += len(chunk)
+        counts['new'] += new
+        counts['changed'] += changed
+        counts['skipped'] += len(chunk) - new - changed
+
+    conn.execute(f"DROP TABLE temp.{staging}")
+    conn.execute(
+        f"INSERT OR REPLACE INTO {STATE_TABLE} (tableName, fileHash, syncedAt) VALUES (?, ?, ?)",
+        (table, contentHash, _dt.datetime.now().isoformat())
+        )
+    conn.commit()
+    return counts
+
+def sync(conn:sqlite3.Connection, data_dir:str, tables:list=_bulkload.TABLES, files:dict=_bulkload.CSV_FILES,
+         chunksize:int=_bulkload.CHUNKSIZE, force:bool=False) -> dict:
+    """
+    Incrementally synchronise the database with the (delta) CSV exports in the given directory.
+
+    The database is switched to WAL journal mode, so it stays readable while the synchronisation runs.
+
+    Args:
+        conn (sqlite3.Connection): Database connection.
+        data_dir (str): Directory containing the CSV files.
+        tables (list, optional): Tables to synchronise, in order. Defaults to _bulkload.TABLES.
+        files (dict, optional): CSV file name per table. Defaults to _bulkload.CSV_FILES.
+        chunksize (int, optional): Number of rows per chunk. Defaults to _bulkload.CHUNKSIZE.
+        force (bool, optional): Synchronise files even if their content did not change. Defaults to False.
+
+    Returns:
+        dict: Row counts per table.
+    """
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_state_table(conn)
+
+    results = {}
+    for table in tables:
+        csv_path = os.path.join(data_dir, files[table])
+        if not os.path.exists(csv_path):
+            continue
+
+        start = time.perf_counter()
+        counts = sync_table(conn=conn, table=table, csv_path=csv_path, chunksize=chunksize, force=force)
+        results[table] = counts
+
+        print(f'--- Finished sync {table} data. ---')
+        if counts['unchangedFile']:
+            print('\t File unchanged since last sync, skipped. \n')
+        else:
+            print(f"\t ({counts['new']}/{counts['changed']}/{counts['skipped']}) (New/Changed/Skipped) in {time.perf_counter() - start:.1f}s \n")
+    return results
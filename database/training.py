@@ -0,0 +1,221 @@
+"""
+Offline training pipeline of the starting-bid (sale/no-sale) model served by the API.
+
+Builds the feature matrix straight from SQLite with the feature code of the service, runs a parallel grid search,
+writes the artifacts to a versioned folder with a manifest and publishes them by pointing src/SavedModels/current at
+that folder, where the model registry of the API picks them up.
+
+Usage (from the repository root):
+    python -m database.training                  # train, evaluate and publish
+    python -m database.training --no-publish     # only write the versioned artifacts
+"""
+import argparse
+import datetime as _dt
+import hashlib
+import json
+import os
+import pickle as pkl
+import sqlite3
+import time
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import MinMaxScaler
+
+import database.database as _database
+import database.features as _features
+import database.registry as _registry
+import database.snapshot as _snapshot
+
+
+VERSIONS_DIR = os.path.join(_registry.MODEL_DIR, "versions")
+CACHE_DIR = os.path.join(_registry.MODEL_DIR, "cache")
+PARAM_GRID = {
+    'n_estimators': [100, 300],
+    'max_depth': [None, 10, 20],
+    'min_samples_leaf': [1, 5]
+    }
+
+# Lots merged with their auction, as in the notebook (C2.1); lots without a complete auction are left out.
+TRAINING_QUERY = """
+    SELECT l.numberOfItems, l.estimatedValue, l.startingBid, l.reserveBid, a.auctionStart, a.auctionEnd, a.branchCategory, l.sold
+    FROM lots AS l
+    JOIN auctions AS a ON a.id = l.auctionID
+    WHERE l.numberOfItems IS NOT NULL AND l.estimatedValue IS NOT NULL AND l.startingBid IS NOT NULL
+        AND l.reserveBid IS NOT NULL AND l.sold IS NOT NULL AND a.auctionStart IS NOT NULL AND a.auctionEnd IS NOT NULL
+        AND a.branchCategory IS NOT NULL"""
+
+
+def load_training_data(location:str=_database.DB_LOC, cache_dir:str=CACHE_DIR) -> dict:
+    """
+    Read the unscaled training data from the database, cached on disk until the database changes.
+
+    Returns:
+        dict: Numeric columns (in features.NUMERIC_COLUMNS order), categories and sale labels as NumPy arrays.
+    """
+    key = hashlib.sha256(json.dumps([_snapshot.database_key(location), TRAINING_QUERY], sort_keys=True).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"training-{key}.joblib") if cache_dir is not None else None
+    if path is not None and os.path.exists(path):
+        cached = joblib.load(path)
+        # Re-create the arrays with the canonical dtypes, so the pickled artifacts are byte-identical to an uncached run
+        return {
+            'numeric': cached['numeric'].astype(np.float64),
+            'categories': cached['categories'].astype(object),
+            'sold': cached['sold'].astype(np.float64)
+            }
+
+    conn = sqlite3.connect(f"file:{location}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(TRAINING_QUERY).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        raise ValueError("No lots with a complete auction to train on")
+    numberOfItems, estimatedValue, startingBid, reserveBid, auctionStart, auctionEnd, categories, sold = zip(*rows)
+
+    data = {
+        'numeric': np.column_stack([
+            np.asarray(numberOfItems, dtype=np.float64),
+            np.asarray(estimatedValue, dtype=np.float64),
+            np.asarray(startingBid, dtype=np.float64),
+            np.asarray(reserveBid, dtype=np.float64),
+            _features.auction_durations(auctionStart, auctionEnd).astype(np.float64)
+            ]),
+        'categories': np.asarray(categories, dtype=object),
+        'sold': np.asarray(sold, dtype=np.float64)
+        }
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(data, tmp)
+        os.replace(tmp, path)
+    return data
+
+def build_features(data:dict, scaler, OHcols:list) -> np.ndarray:
+    """
+    Build the model input exactly as the service does at prediction time.
+    """
+    numeric = data['numeric']
+    return _features.build_feature_matrix(
+        numberOfItems=numeric[:, 0],
+        estimatedValue=numeric[:, 1],
+        startingBid=numeric[:, 2],
+        reserveBid=numeric[:, 3],
+        auctionDuration=numeric[:, 4],
+        categories=data['categories'],
+        OHcols=OHcols,
+        scaler=scaler
+        )
+
+def inference_latency(model, X:np.ndarray, repeats:int=50) -> dict:
+    """
+    Measure the median latency of a single-row prediction and the per-row latency of a batched prediction, in milliseconds.
+    """
+    single = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        _features.predict_proba(model, X[i % len(X)][None, :])
+        single.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    _features.predict_proba(model, X)
+    batch = time.perf_counter() - start
+    return {'singleRowMs': float(np.median(single) * 1000), 'batchPerRowMs': batch / len(X) * 1000}
+
+def train(location:str=_database.DB_LOC, param_grid:dict=PARAM_GRID, n_jobs:int=-1, cv:int=3, test_size:float=0.3,
+          random_state:int=0, cache_dir:str=CACHE_DIR) -> tuple:
+    """
+    Train the starting-bid model: MinMax scaling, one-hot encoded branch category and a grid searched random forest
+    on a stratified train/test split.
+
+    Returns:
+        tuple: Artifacts (model, scaler, OHcols) and the metrics for the manifest.
+    """
+    start = time.perf_counter()
+    data = load_training_data(location, cache_dir)
+    OHcols = sorted(set(data['categories']))
+    scaler = MinMaxScaler().fit(data['numeric'])
+    X = build_features(data, scaler, OHcols)
+    y = data['sold']
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, stratify=y, random_state=random_state)
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=random_state),
+        param_grid=param_grid,
+        cv=cv,
+        scoring='accuracy',
+        n_jobs=n_jobs
+        )
+    search.fit(X_train, y_train)
+    model = search.best_estimator_
+    predictions = _features.predict(model, X_test)
+
+    metrics = {
+        'trainedAt': _dt.datetime.now().isoformat(timespec='seconds'),
+        'trainingSeconds': time.perf_counter() - start,
+        'rows': {'train': len(y_train), 'test': len(y_test)},
+        'bestParams': search.best_params_,
+        'cvAccuracy': float(search.best_score_),
+        'testAccuracy': float(accuracy_score(y_test, predictions)),
+        'confusionMatrix': confusion_matrix(y_test, predictions).tolist(),
+        'inferenceLatency': inference_latency(model, X_test),
+        'features': _features.NUMERIC_COLUMNS + [f'BC_{category}' for category in OHcols],
+        'sklearnVersion': sklearn.__version__
+        }
+    return (model, scaler, OHcols), metrics
+
+def write_artifacts(artifacts:tuple, metrics:dict, versions_dir:str=VERSIONS_DIR) -> str:
+    """
+    Write the artifacts and their manifest to a folder named after the version the registry will report for them.
+
+    Returns:
+        str: Folder of the written version.
+    """
+    raw = {name: pkl.dumps(artifact) for name, artifact in zip(_registry.ARTIFACTS, artifacts)}
+    checksum = hashlib.sha256()
+    for name in _registry.ARTIFACTS:
+        checksum.update(raw[name])
+    version = checksum.hexdigest()[:12]
+
+    folder = os.path.join(versions_dir, version)
+    os.makedirs(folder, exist_ok=True)
+    for name, file in _registry.ARTIFACTS.items():
+        with open(os.path.join(folder, file), "wb") as f:
+            f.write(raw[name])
+    with open(os.path.join(folder, _registry.MANIFEST), "w") as f:
+        json.dump({'version': version, **metrics}, f, indent=2, default=str)
+    return folder
+
+def publish(folder:str, model_dir:str=_registry.MODEL_DIR) -> None:
+    """
+    Serve the artifacts of the given version folder: the pointer file of the registry is replaced by one naming the
+    folder in a single rename, so the registry loads either the previous or the new version, never a mix of both.
+    """
+    tmp = os.path.join(model_dir, f"{_registry.POINTER}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(os.path.relpath(folder, model_dir))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(model_dir, _registry.POINTER))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Number of parallel grid search jobs, -1 for all cores.")
+    parser.add_argument("--random-state", type=int, default=0, help="Seed of the split and the random forest.")
+    parser.add_argument("--no-cache", action="store_true", help="Read the training data from the database even if it is cached.")
+    parser.add_argument("--no-publish", action="store_true", help="Do not replace the artifacts served by the API.")
+    args = parser.parse_args()
+
+    artifacts, metrics = train(n_jobs=args.n_jobs, random_state=args.random_state, cache_dir=None if args.no_cache else CACHE_DIR)
+    folder = write_artifacts(artifacts, metrics)
+    print(f"--- Trained {os.path.basename(folder)} in {metrics['trainingSeconds']:.1f}s: "
+          f"test accuracy {metrics['testAccuracy']:.3f}, {metrics['inferenceLatency']['singleRowMs']:.2f} ms per prediction ---")
+    if not args.no_publish:
+        publish(folder)
+        print(f"--- Published {os.path.basename(folder)} to {_registry.MODEL_DIR} ---")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import concurrent.futures
+import queue
+import threading
+import time
+
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+
+
+class WriteQueueFull(Exception):
+    """
+    Raised when a write cannot be queued because the writer is saturated (backpressure).
+    """
+
+
+class WriteQueue:
+    """
+    Single writer thread that executes queued write operations with group commit.
+
+    Operations are callables taking a database session as first argument. They must not commit themselves.
+    The writer drains up to max_batch operations, or whatever arrived within max_delay seconds after the first one,
+    and commits them in one transaction. If that transaction fails, the batch is rolled back and replayed one
+    operation per transaction, so a single failing write only fails its own future.
+    """
+    def __init__(self, session_factory, maxsize:int=1000, max_batch:int=100, max_delay:float=0.005, submit_timeout:float=1.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'submitted': 0,
+            'rejected': 0,
+            'committed': 0,
+            'failed': 0,
+            'commits': 0,
+            'replays': 0,
+            'lastBatchSize': 0,
+            'maxBatchSize': 0,
+            'commitSeconds': 0.0
+            }
+
+    def start(self) -> None:
+        """
+        Start the writer thread if it is not running yet.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout:float=None) -> None:
+        """
+        Let the writer finish all queued operations and stop the thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, operation, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Queue a write operation, called as operation(db, *args, **kwargs) on the writer session.
+
+        Raises:
+            WriteQueueFull: The queue stayed full for submit_timeout seconds.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the return value of the operation once it is committed.
+        """
+        self.start()
+        future = concurrent.futures.Future()
+        try:
+            self._queue.put((future, operation, args, kwargs), timeout=self.submit_timeout)
+        except queue.Full:
+            with self._lock:
+                self._metrics['rejected'] += 1
+            raise WriteQueueFull("Write queue is full, retry later")
+        with self._lock:
+            self._metrics['submitted'] += 1
+        return future
+
+    def submit_nowait(self, operation, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Queue a write operation like submit, without waiting for room in the queue (e.g. on an event loop).
+
+        Raises:
+            WriteQueueFull: The queue is full. Not counted as rejected, the caller may still wait with submit.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the return value of the operation once it is committed.
+        """
+        self.start()
+        future = concurrent.futures.Future()
+        try:
+            self._queue.put_nowait((future, operation, args, kwargs))
+        except queue.Full:
+            raise WriteQueueFull("Write queue is full, retry later")
+        with self._lock:
+            self._metrics['submitted'] += 1
+        return future
+
+    def record_rejected(self) -> None:
+        """
+        Count a write rejected by a caller that retried submit_nowait until it gave up, as submit counts its own.
+        """
+        with self._lock:
+            self._metrics['rejected'] += 1
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop after this batch; put the sentinel back for the run loop.
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [item for item in self._collect(first) if item[0].set_running_or_notify_cancel()]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch:list) -> None:
+        start = time.perf_counter()
+        replayed = False
+        with self.session_factory() as db:
+            try:
+                results = [operation(db, *args, **kwargs) for _, operation, args, kwargs in batch]
+                db.commit()
+            except Exception:
+                db.rollback()
+                outcomes = self._replay(db, batch)
+                replayed = True
+            else:
+                outcomes = [(future, result, None) for (future, _, _, _), result in zip(batch, results)]
+
+        failed = sum(error is not None for _, _, error in outcomes)
+        # Counted under the lock before resolving the futures, so stats never shows half of a batch.
+        with self._lock:
+            self._metrics['committed'] += len(outcomes) - failed
+            self._metrics['failed'] += failed
+            self._metrics['replays'] += replayed
+            self._metrics['commits'] += 1
+            self._metrics['lastBatchSize'] = len(batch)
+            self._metrics['maxBatchSize'] = max(self._metrics['maxBatchSize'], len(batch))
+            self._metrics['commitSeconds'] += time.perf_counter() - start
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _replay(self, db:_orm.Session, batch:list) -> list:
+        # One transaction per operation; returns (future, result, exception) per operation.
+        outcomes = []
+        for future, operation, args, kwargs in batch:
+            try:
+                result = operation(db, *args, **kwargs)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                outcomes.append((future, None, e))
+            else:
+                outcomes.append((future, result, None))
+        return outcomes
+
+    def stats(self) -> dict:
+        """
+        Return queue depth, commit batch sizes and operation counters of the writer.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics['queueDepth'] = self._queue.qsize()
+        metrics['queueMaxsize'] = self._queue.maxsize
+        metrics['avgBatchSize'] = (metrics['committed'] + metrics['failed']) / metrics['commits'] if metrics['commits'] else 0.0
+        metrics['avgCommitSeconds'] = metrics.pop('commitSeconds') / metrics['commits'] if metrics['commits'] else 0.0
+        return metrics
+
+
+# Results are handed to other threads after the commit, so their loaded attributes must not expire.
+WriterSessionLocal = _orm.sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=_database.engine
+)
+
+write_queue = WriteQueue(session_factory=WriterSessionLocal)
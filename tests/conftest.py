@@ -0,0 +1,33 @@
+import pytest
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.models as _models
+
+
+@pytest.fixture
+def location(tmp_path) -> str:
+    """
+    Location of a temporary database with all tables of the models.
+    """
+    location = str(tmp_path / "auctions.db")
+    engine = _database.create_engine_profile(location, profile='tuned')
+    _database.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return location
+
+@pytest.fixture
+def engine(location):
+    engine = _database.create_engine_profile(location, profile='tuned')
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def read_engine(location):
+    read_engine = _database.create_engine_profile(location, profile='tuned', readonly=True)
+    yield read_engine
+    read_engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    return _orm.sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
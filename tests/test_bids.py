@@ -0,0 +1,77 @@
+import concurrent.futures
+import datetime as _dt
+
+import pytest
+import sqlalchemy as _sql
+import sqlalchemy.orm as _orm
+
+import database.database as _database
+import database.models as _models
+import database.schemas as _schemas
+import database.services as _services
+
+
+THREADS = 8
+BIDS_PER_THREAD = 25
+
+
+@pytest.fixture
+def auction(engine):
+    _services._auction_end_cache.clear()
+    with _orm.Session(engine) as db:
+        db.add(_models.Auction(id=1, relatedCompany='test', auctionStart=_dt.datetime(2020, 1, 1),
+                               auctionEnd=_dt.datetime(2100, 1, 1), branchCategory='test'))
+        for lotNr in (1, 2):
+            db.add(_models.Lots(auctionID=1, lotNr=lotNr, numberOfItems=1, estimatedValue=100, startingBid=10, reserveBid=10,
+                                mainCategory='test', countryCode='NL', VAT=21, suffix='N/A', saleDate=_dt.datetime(1000, 1, 1),
+                                buyerAccountID=99999, currentBid=99999, sold=False))
+        db.commit()
+    yield 1
+    _services._auction_end_cache.clear()
+
+def bid(lotNr:int, accountID:int, bidPrice:float) -> _schemas.BidCreate:
+    return _schemas.BidCreate(auctionID=1, lotNr=lotNr, isCombination=False, accountID=accountID, isCompany=False,
+                              bidPrice=bidPrice, biddingDateTime=_dt.datetime.now())
+
+def test_concurrent_bids_get_unique_consecutive_numbers(location, auction):
+    # Every thread bids through its own connection, as separate writers (or processes) would.
+    engine = _database.create_engine_profile(location, profile='tuned', pool_size=THREADS, max_overflow=0)
+
+    def place(thread:int) -> list:
+        with _orm.Session(engine) as db:
+            return [
+                _services.create_bid(db=db, bid=bid(lotNr=1, accountID=thread, bidPrice=thread * BIDS_PER_THREAD + idx)).bidNr
+                for idx in range(BIDS_PER_THREAD)
+                ]
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=THREADS) as pool:
+            bidNrs = [bidNr for result in pool.map(place, range(THREADS)) for bidNr in result]
+        with engine.connect() as conn:
+            stored = [bidNr for (bidNr,) in conn.execute(_sql.text("SELECT bidNr FROM bids WHERE lotNr = 1 ORDER BY bidNr"))]
+            currentBid, buyerAccountID = conn.execute(_sql.text("SELECT currentBid, buyerAccountID FROM lots WHERE lotNr = 1")).one()
+    finally:
+        engine.dispose()
+
+    assert sorted(bidNrs) == stored == list(range(1, THREADS * BIDS_PER_THREAD + 1))
+    assert (currentBid, buyerAccountID) == (THREADS * BIDS_PER_THREAD - 1, THREADS - 1)
+
+def test_bid_numbers_and_leader_per_lot(engine, auction):
+    with _orm.Session(engine) as db:
+        placed = [
+            _services.create_bid(db=db, bid=bid(lotNr=lotNr, accountID=accountID, bidPrice=bidPrice))
+            for lotNr, accountID, bidPrice in [(1, 1, 20), (2, 2, 5), (1, 3, 10), (1, 4, 30)]
+            ]
+        lots = {lot.lotNr: (lot.currentBid, lot.buyerAccountID) for lot in db.query(_models.Lots)}
+
+    assert [(placed_bid.lotNr, placed_bid.bidNr) for placed_bid in placed] == [(1, 1), (2, 1), (1, 2), (1, 3)]
+    # The first bid replaces the placeholder of create_lot, lower bids do not take the lead
+    assert lots == {1: (30, 4), 2: (5, 2)}
+
+def test_bid_after_auction_end_is_rejected(engine, auction):
+    with _orm.Session(engine) as db:
+        db.query(_models.Auction).update({'auctionEnd': _dt.datetime(2020, 1, 2)})
+        db.commit()
+
+        assert _services.create_bid(db=db, bid=bid(lotNr=1, accountID=1, bidPrice=20)) is None
+        assert db.query(_models.Bids).count() == 0
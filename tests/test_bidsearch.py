@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import database.bidsearch as _bidsearch
+
+
+LOW = 10
+HIGH = 1000
+STEP = 1
+GRID = np.arange(LOW, HIGH + STEP, STEP)
+
+
+def table_probability(table:np.ndarray):
+    """
+    Sale probability looked up per (lot, grid price) in a table of shape (lots, len(GRID)).
+    """
+    def saleProbability(lots, prices):
+        return table[lots, np.round((prices - LOW) / STEP).astype(np.int64)]
+    return saleProbability
+
+def brute_force_boundaries(table:np.ndarray, threshold:float=_bidsearch.THRESHOLD) -> list:
+    """
+    Per lot, the grid prices that sell while the next grid price does not (or that are the highest grid price).
+    """
+    sells = table >= threshold
+    boundaries = sells & np.concatenate([~sells[:, 1:], np.ones((len(table), 1), dtype=bool)], axis=1)
+    return [set(GRID[row]) for row in boundaries]
+
+def monotone_table(rng:np.random.Generator, nrOfLots:int) -> np.ndarray:
+    # Cut-offs below, inside and above the range: nothing sells, a boundary and everything sells.
+    cutoffs = np.concatenate([[LOW - 5, LOW, HIGH, HIGH + 5], rng.integers(LOW, HIGH + 1, nrOfLots - 4)])
+    return np.where(GRID[None, :] <= cutoffs[:, None], 0.9, 0.1)
+
+@pytest.mark.parametrize("probes", [1, 3, 15])
+@pytest.mark.parametrize("seed", range(5))
+def test_monotone_matches_brute_force(seed, probes):
+    rng = np.random.default_rng(seed)
+    table = monotone_table(rng, nrOfLots=50)
+
+    bids, calls = _bidsearch.search(len(table), table_probability(table), low=LOW, high=HIGH, step=STEP, probes=probes)
+
+    sells = table >= _bidsearch.THRESHOLD
+    expected = np.array([GRID[row].max() if row.any() else LOW for row in sells])
+    np.testing.assert_array_equal(bids, expected)
+    assert calls < len(GRID)
+
+@pytest.mark.parametrize("probes", [1, 3, 15])
+@pytest.mark.parametrize("seed", range(5))
+def test_non_monotone_ends_on_a_boundary(seed, probes):
+    rng = np.random.default_rng(seed)
+    noise = rng.random((40, len(GRID)))
+    # Decreasing on average with local bumps, and pure noise.
+    trend = 1 - (GRID[None, :] - LOW) / (HIGH - LOW) + 0.3 * np.sin(GRID[None, :] / rng.integers(5, 50, (20, 1)))
+    table = np.concatenate([trend, noise[:20]])
+
+    bids, _ = _bidsearch.search(len(table), table_probability(table), low=LOW, high=HIGH, step=STEP, probes=probes)
+
+    for bid, boundaries in zip(bids, brute_force_boundaries(table)):
+        assert bid == LOW or bid in boundaries
+
+def test_nothing_sells():
+    table = np.zeros((3, len(GRID)))
+
+    bids, calls = _bidsearch.search(len(table), table_probability(table), low=LOW, high=HIGH, step=STEP)
+
+    np.testing.assert_array_equal(bids, [LOW] * 3)
+    assert calls == 1
+
+def test_invalid_range():
+    with pytest.raises(ValueError):
+        _bidsearch.search(1, lambda lots, prices: prices, low=HIGH, high=LOW)
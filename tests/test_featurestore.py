@@ -0,0 +1,70 @@
+import datetime as _dt
+import random
+
+import numpy as np
+import sqlalchemy.orm as _orm
+
+import database.aggregates as _aggregates
+import database.featurestore as _featurestore
+import database.models as _models
+
+
+def random_bids(rng:random.Random, n:int) -> list:
+    bids = []
+    bidNrs = {}
+    for _ in range(n):
+        auctionID, lotNr = rng.randint(1, 3), rng.randint(1, 4)
+        bidNrs[auctionID, lotNr] = bidNrs.get((auctionID, lotNr), 0) + 1
+        bids.append(_models.Bids(
+            auctionID=auctionID, lotNr=lotNr, bidNr=bidNrs[auctionID, lotNr], isCombination=False,
+            accountID=rng.randint(1, 5), isCompany=False,
+            # Some bids without a price, they are not counted in NOB and ABP
+            bidPrice=None if rng.random() < 0.2 else float(rng.randint(1, 1000)),
+            biddingDateTime=_dt.datetime(2022, 1, 1) + _dt.timedelta(minutes=rng.randint(0, 5000)),
+            closingDateTime=_dt.datetime(2022, 1, 5) + _dt.timedelta(hours=auctionID)
+            ))
+    return bids
+
+def assert_matches_aggregates(store:_featurestore.BidderFeatureStore, location:str) -> None:
+    keys, features = store.matrix()
+    _, bidders = _aggregates.bid_statistics(location=location)
+
+    np.testing.assert_array_equal(keys, bidders[_featurestore.KEY].to_numpy())
+    np.testing.assert_allclose(features, bidders[_featurestore.FEATURES].to_numpy(dtype=np.float64), equal_nan=True)
+
+def test_rebuild_matches_aggregates(location, engine, read_engine):
+    with _orm.Session(engine) as db:
+        db.add_all(random_bids(random.Random(0), 300))
+        db.commit()
+    store = _featurestore.BidderFeatureStore(read_engine=read_engine)
+
+    store.rebuild()
+
+    assert_matches_aggregates(store, location)
+
+def test_catch_up_matches_aggregates(location, engine, read_engine):
+    bids = random_bids(random.Random(1), 300)
+    store = _featurestore.BidderFeatureStore(read_engine=read_engine)
+    store.rebuild()
+
+    # Applied bid by bid through the incremental path
+    for start in range(0, len(bids), 50):
+        with _orm.Session(engine) as db:
+            db.add_all(bids[start:start + 50])
+            db.commit()
+        store.catch_up()
+
+    assert_matches_aggregates(store, location)
+
+def test_bidder_without_priced_bids(engine, read_engine):
+    with _orm.Session(engine) as db:
+        db.add(_models.Bids(auctionID=1, lotNr=1, bidNr=1, isCombination=False, accountID=7, isCompany=False, bidPrice=None,
+                            biddingDateTime=_dt.datetime(2022, 1, 1), closingDateTime=_dt.datetime(2022, 1, 2)))
+        db.commit()
+    store = _featurestore.BidderFeatureStore(read_engine=read_engine)
+    store.rebuild()
+
+    features = store.get(auctionID=1, lotNr=1, accountID=7)
+
+    assert features['NOB'] == 0
+    assert np.isnan(features['ABP']) and np.isnan(features['HBP'])
@@ -0,0 +1,71 @@
+import datetime as _dt
+import random
+
+import pytest
+
+import database.intervals as _intervals
+
+
+def brute_force(intervals:list, start:int, end:int) -> set:
+    """
+    IDs of every interval overlapping the closed interval [start, end].
+    """
+    return {id for intervalStart, intervalEnd, id in intervals if intervalStart <= end and intervalEnd >= start}
+
+def random_interval(rng:random.Random, span:int=1000, longest:int=100) -> tuple:
+    start = rng.randrange(span)
+    # Mostly short intervals, now and then one containing many others.
+    length = rng.randrange(longest) if rng.random() < 0.9 else rng.randrange(span)
+    return start, start + length
+
+@pytest.mark.parametrize("seed", range(20))
+def test_overlapping_matches_brute_force(seed):
+    rng = random.Random(seed)
+    index = _intervals.IntervalIndex()
+    intervals = []
+    # Random (not chronological) insert order, checked after every insert.
+    for id in range(200):
+        start, end = random_interval(rng)
+        index.add(start, end, id)
+        intervals.append((start, end, id))
+        for _ in range(10):
+            queryStart, queryEnd = random_interval(rng)
+            expected = brute_force(intervals, queryStart, queryEnd)
+            found = index.overlapping(queryStart, queryEnd)
+            if expected:
+                assert found in expected
+            else:
+                assert found is None
+    assert len(index) == len(intervals)
+
+@pytest.mark.parametrize("start, end, overlaps", [
+    (0, 9, False),      # before
+    (0, 10, True),      # touching the start
+    (5, 15, True),      # partial overlap on the left
+    (12, 18, True),     # contained
+    (0, 30, True),      # containing
+    (15, 25, True),     # partial overlap on the right
+    (20, 25, True),     # touching the end
+    (21, 30, False),    # after
+    ])
+def test_overlap_cases(start, end, overlaps):
+    index = _intervals.IntervalIndex()
+    index.add(10, 20, 1)
+
+    assert (index.overlapping(start, end) == 1) is overlaps
+
+def test_out_of_order_insert_updates_running_maximum():
+    index = _intervals.IntervalIndex()
+    index.add(50, 60, 1)
+    index.add(70, 80, 2)
+    # Inserted before both, containing the gap between them.
+    index.add(0, 100, 3)
+
+    assert index.overlapping(62, 68) == 3
+    assert index.overlapping(101, 110) is None
+
+def test_to_micros_compares_datetimes_and_sqlite_text():
+    moment = _dt.datetime(2022, 1, 2, 3, 4, 5, 678)
+
+    assert _intervals.to_micros(moment) == _intervals.to_micros(str(moment))
+    assert _intervals.to_micros(moment) < _intervals.to_micros(moment + _dt.timedelta(microseconds=1))
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+import database.lotstats as _lotstats
+
+
+INSERT_BID = "INSERT INTO bids (auctionID, lotNr, bidNr, bidPrice, biddingDateTime, closingDateTime) VALUES (?, ?, ?, ?, ?, ?)"
+
+
+@pytest.fixture
+def conn(location):
+    conn = sqlite3.connect(location)
+    _lotstats.install(conn)
+    yield conn
+    conn.close()
+
+def add_bids(conn:sqlite3.Connection) -> None:
+    conn.executemany(INSERT_BID, [
+        (1, 1, 1, 10, '2022-01-01 10:00:00.000000', '2022-01-03 12:00:00.000000'),
+        (1, 1, 2, 20, '2022-01-01 09:00:00.000000', '2022-01-03 12:05:00.000000'),
+        (1, 2, 1, 15, '2022-01-02 08:00:00.000000', '2022-01-03 13:00:00.000000'),
+        (2, 1, 1, 30, '2022-01-02 08:30:00.000000', '2022-01-04 12:00:00.000000'),
+        ])
+    conn.commit()
+
+def statistics(conn:sqlite3.Connection, auctionID:int, lotNr:int) -> tuple:
+    return conn.execute(
+        f"SELECT firstBid, lotEnding, duration, numberOfBids FROM {_lotstats.STATS_TABLE} WHERE auctionID = ? AND lotNr = ?",
+        (auctionID, lotNr)
+        ).fetchone()
+
+def test_triggers_follow_inserts(conn):
+    add_bids(conn)
+
+    assert _lotstats.check_consistency(conn) == []
+    # The earlier second bid moves the first bid, the later closing time the lot ending
+    assert statistics(conn, 1, 1) == ('2022-01-01 09:00:00.000000', '2022-01-03 12:05:00.000000', pytest.approx(2 * 1440 + 185), 2)
+
+def test_triggers_follow_updates_and_deletes(conn):
+    add_bids(conn)
+
+    conn.execute("UPDATE bids SET biddingDateTime = '2022-01-01 11:00:00.000000' WHERE auctionID = 1 AND lotNr = 1 AND bidNr = 2")
+    # Moving a bid to another lot refreshes both lots
+    conn.execute("UPDATE bids SET lotNr = 2, bidNr = 2 WHERE auctionID = 1 AND lotNr = 1 AND bidNr = 1")
+    conn.execute("DELETE FROM bids WHERE auctionID = 2")
+    conn.commit()
+
+    assert _lotstats.check_consistency(conn) == []
+    assert statistics(conn, 1, 1)[0] == '2022-01-01 11:00:00.000000' and statistics(conn, 1, 1)[3] == 1
+    assert statistics(conn, 1, 2)[3] == 2
+    assert statistics(conn, 2, 1) is None
+
+def test_check_consistency_detects_drift(conn):
+    add_bids(conn)
+    _lotstats.drop_triggers(conn)
+    conn.execute(INSERT_BID, (3, 1, 1, 5, '2022-01-05 08:00:00.000000', '2022-01-06 08:00:00.000000'))
+    conn.execute(f"UPDATE {_lotstats.STATS_TABLE} SET numberOfBids = 5 WHERE auctionID = 1 AND lotNr = 2")
+    conn.execute("DELETE FROM bids WHERE auctionID = 2")
+    conn.commit()
+
+    assert sorted(_lotstats.check_consistency(conn)) == [(1, 2, 'stale'), (2, 1, 'orphaned'), (3, 1, 'missing')]
+
+    # Missing triggers are reinstalled together with a backfill
+    assert _lotstats.install(conn) is True
+    assert _lotstats.check_consistency(conn) == []
+    assert _lotstats.install(conn) is False
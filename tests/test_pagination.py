@@ -0,0 +1,70 @@
+import pytest
+import sqlalchemy.orm as _orm
+
+import database.models as _models
+import database.pagination as _pagination
+import database.services as _services
+
+
+def test_cursor_round_trip():
+    for key in [(1,), (12, 3), (2**40, 0, 7)]:
+        token = _pagination.encode_cursor(key)
+
+        assert '=' not in token
+        assert _pagination.decode_cursor(token, len(key)) == key
+
+@pytest.mark.parametrize("token", ["", "not a cursor", _pagination.encode_cursor((1, 2)), "WyJhIl0", "e30"])
+def test_invalid_cursor(token):
+    # Malformed, wrong number of values, a string value and a JSON object
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        _pagination.decode_cursor(token, 1)
+
+def test_next_cursor():
+    key = lambda record: (record,)
+
+    assert _pagination.next_cursor([1, 2, 3], 3, key) == _pagination.encode_cursor((3,))
+    # A short or empty page is the last one
+    assert _pagination.next_cursor([1, 2], 3, key) is None
+    assert _pagination.next_cursor([], 3, key) is None
+
+def pages(fetch, key, limit:int) -> list:
+    # Follow the cursors the way a client of the API does.
+    records, after = [], None
+    while True:
+        page = fetch(limit=limit, after=after)
+        records.extend(page)
+        cursor = _pagination.next_cursor(page, limit, key)
+        if cursor is None:
+            return records
+        after = _pagination.decode_cursor(cursor, len(key(page[-1])))
+
+@pytest.fixture
+def db(engine):
+    with _orm.Session(engine) as db:
+        # Gaps in the keys, so seeking and skipping differ
+        for auctionID in (1, 2, 5, 9, 10):
+            db.add(_models.Auction(id=auctionID, relatedCompany='test'))
+        for lotNr in (1, 3, 4, 8, 11, 12, 20):
+            db.add(_models.Lots(auctionID=5, lotNr=lotNr))
+            db.add(_models.Lots(auctionID=9, lotNr=lotNr + 1))
+        for bidNr in range(1, 24, 2):
+            db.add(_models.Bids(auctionID=5, lotNr=3, bidNr=bidNr))
+            db.add(_models.Bids(auctionID=5, lotNr=4, bidNr=bidNr))
+        db.commit()
+        yield db
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 100])
+def test_keyset_pages_match_full_scan(db, limit):
+    auctions = pages(lambda **kwargs: _services.get_auctions(db, skip=0, **kwargs), lambda auction: (auction.id,), limit)
+    lots = pages(
+        lambda **kwargs: _services.get_lots_by_auctionID(db, auctionID=5, skip=0, **kwargs),
+        lambda lot: (lot.auctionID, lot.lotNr), limit
+        )
+    bids = pages(
+        lambda **kwargs: _services.get_bids_by_IDs(db, auctionID=5, lotNr=3, skip=0, **kwargs),
+        lambda bid: (bid.auctionID, bid.lotNr, bid.bidNr), limit
+        )
+
+    assert [auction.id for auction in auctions] == [1, 2, 5, 9, 10]
+    assert [(lot.auctionID, lot.lotNr) for lot in lots] == [(5, lotNr) for lotNr in (1, 3, 4, 8, 11, 12, 20)]
+    assert [(bid.auctionID, bid.lotNr, bid.bidNr) for bid in bids] == [(5, 3, bidNr) for bidNr in range(1, 24, 2)]
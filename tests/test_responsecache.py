@@ -0,0 +1,91 @@
+import threading
+
+import database.responsecache as _responsecache
+
+
+TAG = ('lots', 1)
+
+
+def test_invalidate_hides_cached_response():
+    cache = _responsecache.ResponseCache(maxsize=10, ttl=60)
+    cache.put(('lots', 1, 0), TAG, cache.generation(TAG), [{'lotNr': 1}])
+    assert cache.get(('lots', 1, 0)).body == b'[{"lotNr":1}]'
+
+    cache.invalidate(TAG)
+
+    assert cache.get(('lots', 1, 0)) is None
+    # Other tags are not affected
+    cache.put(('lots', 2, 0), ('lots', 2), cache.generation(('lots', 2)), [])
+    cache.invalidate(TAG)
+    assert cache.get(('lots', 2, 0)) is not None
+
+def test_read_racing_a_write_is_not_stored():
+    cache = _responsecache.ResponseCache(maxsize=10, ttl=60)
+    generation = cache.generation(TAG)
+    # A write commits and invalidates while the response is being read
+    cache.invalidate(TAG)
+
+    response = cache.put(('lots', 1, 0), TAG, generation, [{'lotNr': 1, 'currentBid': 10}])
+
+    assert response.body == b'[{"lotNr":1,"currentBid":10}]'
+    assert cache.get(('lots', 1, 0)) is None
+    assert cache.stats()['discarded'] == 1
+
+def test_forgotten_tags_stay_invalid():
+    cache = _responsecache.ResponseCache(maxsize=3, ttl=60)
+    cache.put(('lots', 1, 0), TAG, cache.generation(TAG), [])
+    cache.invalidate(TAG)
+    # Generation from before the invalidation, taken by a read still in flight
+    stale = cache.generation(TAG) - 1
+
+    # The invalidation of TAG is pushed out of the bounded generations
+    cache.invalidate(*[('lots', auctionID) for auctionID in range(2, 10)])
+
+    assert cache.stats()['tags'] == 3
+    assert cache.get(('lots', 1, 0)) is None
+    cache.put(('lots', 1, 0), TAG, stale, [])
+    assert cache.get(('lots', 1, 0)) is None
+    # A read started after the invalidation is cached again
+    cache.put(('lots', 1, 0), TAG, cache.generation(TAG), [])
+    assert cache.get(('lots', 1, 0)) is not None
+
+def test_concurrent_reads_and_writes_never_serve_stale_data():
+    cache = _responsecache.ResponseCache(maxsize=4, ttl=60)
+    state = {'version': 0}
+    stop = threading.Event()
+    stale = []
+
+    def write():
+        for version in range(1, 2001):
+            state['version'] = version
+            cache.invalidate(TAG, ('lots', version % 7 + 2))
+        stop.set()
+
+    def read():
+        while not stop.is_set():
+            before = state['version']
+            response = cache.get(('lots', 1, 0))
+            if response is None:
+                generation = cache.generation(TAG)
+                response = cache.put(('lots', 1, 0), TAG, generation, state['version'])
+            # The write before the version seen was invalidated before that version was set, so nothing older is served
+            if int(response.body) < before - 1:
+                stale.append((int(response.body), before))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    write()
+    for reader in readers:
+        reader.join()
+
+    assert stale == []
+
+def test_etag_matching():
+    response = _responsecache.CachedResponse(b'[]')
+
+    assert response.matches(response.etag)
+    assert response.matches(f'"other", W/{response.etag}')
+    assert response.matches('*')
+    assert not response.matches('"other"')
+    assert not response.matches(None)
@@ -0,0 +1,80 @@
+import datetime as _dt
+
+import pytest
+import sqlalchemy.orm as _orm
+
+import database.models as _models
+import database.settlement as _settlement
+
+
+END = _dt.datetime(2022, 1, 10, 12)
+
+
+@pytest.fixture
+def auctions(engine):
+    with _orm.Session(engine) as db:
+        for auctionID in (1, 2):
+            db.add(_models.Auction(id=auctionID, relatedCompany='test', auctionStart=_dt.datetime(2022, 1, 1),
+                                   auctionEnd=END + _dt.timedelta(days=auctionID - 1), branchCategory='test'))
+        for auctionID, lotNr, reserveBid in [(1, 1, 10), (1, 2, 10), (1, 3, 50), (1, 4, 10), (2, 1, 10)]:
+            db.add(_models.Lots(auctionID=auctionID, lotNr=lotNr, reserveBid=reserveBid, buyerAccountID=99999, currentBid=99999,
+                                saleDate=_settlement.UNSETTLED_SALE_DATE, sold=False))
+        before, after = END - _dt.timedelta(hours=1), END + _dt.timedelta(minutes=1)
+        for auctionID, lotNr, bidNr, accountID, bidPrice, biddingDateTime in [
+                (1, 1, 1, 11, 20, before), (1, 1, 2, 12, 30, before), (1, 1, 3, 13, 30, before),  # tie, the earliest wins
+                (1, 2, 1, 21, 15, before), (1, 2, 2, 22, 100, after),                             # late bid is ignored
+                (1, 3, 1, 31, 40, before),                                                        # below the reserve
+                (2, 1, 1, 41, 25, before)]:
+            db.add(_models.Bids(auctionID=auctionID, lotNr=lotNr, bidNr=bidNr, accountID=accountID, bidPrice=bidPrice,
+                                biddingDateTime=biddingDateTime, closingDateTime=END))
+        db.commit()
+
+def lots(db:_orm.Session) -> dict:
+    return {
+        (lot.auctionID, lot.lotNr): (lot.sold, lot.currentBid, lot.buyerAccountID, lot.saleDate)
+        for lot in db.query(_models.Lots).order_by(_models.Lots.auctionID, _models.Lots.lotNr)
+        }
+
+def test_settle_auctions(engine, auctions):
+    with _orm.Session(engine) as db:
+        result = _settlement.settle_auctions(db, [1], settledAt=END)
+
+        assert result == {'auctions': 1, 'soldLots': 2, 'unsoldLots': 2}
+        assert lots(db) == {
+            (1, 1): (True, 30, 12, END),
+            (1, 2): (True, 15, 21, END),
+            (1, 3): (False, 40, 31, _settlement.UNSETTLED_SALE_DATE),
+            # A lot without bids keeps its values
+            (1, 4): (False, 99999, 99999, _settlement.UNSETTLED_SALE_DATE),
+            (2, 1): (False, 99999, 99999, _settlement.UNSETTLED_SALE_DATE)
+            }
+
+def test_settle_auctions_twice_changes_nothing(engine, auctions):
+    with _orm.Session(engine) as db:
+        _settlement.settle_auctions(db, [1], settledAt=END)
+        settled = lots(db)
+        # A bid that slipped in afterwards does not reopen the settled lots
+        db.add(_models.Bids(auctionID=1, lotNr=3, bidNr=2, accountID=32, bidPrice=500, biddingDateTime=END))
+        db.commit()
+
+        assert _settlement.settle_auctions(db, [1], settledAt=END + _dt.timedelta(hours=1)) == {
+            'auctions': 0, 'soldLots': 0, 'unsoldLots': 0
+            }
+        assert lots(db) == settled
+        assert [(row.auctionID, row.settledAt) for row in db.query(_models.AuctionSettlement)] == [(1, END)]
+
+def test_scheduler_settles_closed_auctions_once(engine, read_engine, auctions):
+    with _orm.Session(engine) as db:
+        scheduler = _settlement.SettlementScheduler(
+            read_engine=read_engine, submit=lambda operation, **kwargs: operation(db, **kwargs), batch=1
+            )
+
+        assert scheduler.catch_up() == 2
+        assert scheduler.settle_due(END - _dt.timedelta(seconds=1))['auctions'] == 0
+        assert scheduler.settle_due(END)['auctions'] == 1
+        assert scheduler.catch_up() == 0
+        assert scheduler.settle_due(END + _dt.timedelta(days=2)) == {'auctions': 1, 'soldLots': 1, 'unsoldLots': 0}
+        assert scheduler.stats()['queued'] == 0
+
+        # Loaded from scratch (as after a restart), nothing is left to settle
+        assert _settlement.SettlementScheduler(read_engine=read_engine).catch_up() == 0
@@ -0,0 +1,27 @@
+import os
+
+import database.snapshot as _snapshot
+
+
+def make_folders(directory, *folders) -> None:
+    for folder in folders:
+        os.makedirs(os.path.join(directory, folder))
+
+def age(directory, folder, seconds:float) -> None:
+    path = os.path.join(directory, folder)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+def test_remove_stale_keeps_referenced_and_recent_folders(tmp_path):
+    directory = str(tmp_path)
+    make_folders(directory, 'lots-current', 'lots-old', 'lots-in-progress', 'bids-other-process')
+    for folder in ('lots-current', 'lots-old', 'bids-other-process'):
+        age(directory, folder, 2 * _snapshot.STALE_GRACE)
+    # Another process swapped in its manifest after ours was built
+    _snapshot.write_manifest(directory, {'key': {}, 'tables': {'bids': {'folder': 'bids-other-process'}}})
+
+    _snapshot.remove_stale(directory, {'key': {}, 'tables': {'lots': {'folder': 'lots-current'}}})
+
+    assert sorted(entry for entry in os.listdir(directory) if entry != _snapshot.MANIFEST) == [
+        'bids-other-process', 'lots-current', 'lots-in-progress'
+        ]
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import database.sync as _sync
+
+
+ROWS = [
+    (1, 'A', '2022-01-01 08:00:00', '2022-01-10 12:00:00', 'cars'),
+    (2, 'B', '2022-01-02 08:00:00', '2022-01-11 12:00:00', 'tools'),
+    (4, 'C', '2022-01-03 08:00:00', '2022-01-12 12:00:00', 'cars'),
+    (5, 'D', '2022-01-04 08:00:00', '2022-01-13 12:00:00', 'art'),
+    (7, 'E', '2022-01-05 08:00:00', '2022-01-14 12:00:00', 'tools')
+    ]
+
+
+@pytest.fixture
+def conn(location):
+    conn = sqlite3.connect(location)
+    _sync.create_state_table(conn)
+    yield conn
+    conn.close()
+
+def write_csv(path, rows:list) -> str:
+    pd.DataFrame(rows, columns=['id', 'relatedCompany', 'auctionStart', 'auctionEnd', 'branchCategory']).to_csv(path, index=False)
+    return str(path)
+
+def sync(conn:sqlite3.Connection, csv_path:str, force:bool=False) -> dict:
+    # Small chunks, so the counts are summed over several transactions
+    return _sync.sync_table(conn, 'auctions', csv_path, chunksize=2, force=force)
+
+def auctions(conn:sqlite3.Connection) -> list:
+    return conn.execute("SELECT id, relatedCompany, auctionStart, auctionEnd, branchCategory FROM auctions ORDER BY id").fetchall()
+
+def test_first_sync_inserts_everything(conn, tmp_path):
+    counts = sync(conn, write_csv(tmp_path / "auctions.csv", ROWS))
+
+    assert counts == {'read': 5, 'new': 5, 'changed': 0, 'skipped': 0, 'unchangedFile': False}
+    assert auctions(conn) == ROWS
+
+def test_unchanged_file_is_skipped(conn, tmp_path):
+    csv_path = write_csv(tmp_path / "auctions.csv", ROWS)
+    sync(conn, csv_path)
+
+    assert sync(conn, csv_path) == {'read': 0, 'new': 0, 'changed': 0, 'skipped': 0, 'unchangedFile': True}
+    # Forced, every row is read again but none is written
+    assert sync(conn, csv_path, force=True) == {'read': 5, 'new': 0, 'changed': 0, 'skipped': 5, 'unchangedFile': False}
+
+def test_delta_sync(conn, tmp_path):
+    sync(conn, write_csv(tmp_path / "auctions.csv", ROWS))
+    # Created through the API between two syncs, moves the watermark
+    conn.execute("INSERT INTO auctions (id, relatedCompany) VALUES (8, 'API')")
+    conn.commit()
+    delta = [
+        ROWS[0],
+        (2, 'B', '2022-01-02 08:00:00', '2022-01-15 12:00:00', 'tools'),  # auction end moved
+        (3, 'F', '2022-01-06 08:00:00', '2022-01-16 12:00:00', 'cars'),   # new, below the watermark
+        (9, 'G', '2022-01-07 08:00:00', '2022-01-17 12:00:00', 'art')     # new, above the watermark
+        ]
+
+    counts = sync(conn, write_csv(tmp_path / "delta.csv", delta))
+
+    assert counts == {'read': 4, 'new': 2, 'changed': 1, 'skipped': 1, 'unchangedFile': False}
+    assert auctions(conn) == sorted(ROWS[:1] + delta[1:] + ROWS[2:] + [(8, 'API', None, None, None)])
+
+def test_sync_marker_follows_file(conn, tmp_path):
+    csv_path = write_csv(tmp_path / "auctions.csv", ROWS)
+    sync(conn, csv_path)
+    first = conn.execute("SELECT fileHash, syncedAt FROM sync_state WHERE tableName = 'auctions'").fetchone()
+
+    sync(conn, csv_path)
+    assert conn.execute("SELECT fileHash, syncedAt FROM sync_state WHERE tableName = 'auctions'").fetchone() == first
+
+    sync(conn, write_csv(csv_path, ROWS[:2]))
+    fileHash, syncedAt = conn.execute("SELECT fileHash, syncedAt FROM sync_state WHERE tableName = 'auctions'").fetchone()
+    assert fileHash == _sync.file_hash(csv_path) != first[0]
+    assert syncedAt >= first[1]
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+import sqlalchemy as _sql
+
+import database.writer as _writer
+
+
+def insert_auction(db, id:int, fail:bool=False):
+    db.execute(_sql.text("INSERT INTO auctions (id, relatedCompany) VALUES (:id, 'test')"), {'id': id})
+    if fail:
+        raise ValueError(f"Auction {id} failed")
+    return id
+
+def auction_ids(engine) -> list:
+    with engine.connect() as conn:
+        return [id for (id,) in conn.execute(_sql.text("SELECT id FROM auctions ORDER BY id"))]
+
+@pytest.fixture
+def write_queue(session_factory):
+    # A long max_delay, so everything submitted at once ends up in one batch.
+    write_queue = _writer.WriteQueue(session_factory=session_factory, max_batch=10, max_delay=0.5)
+    yield write_queue
+    write_queue.stop()
+
+def test_batch_commits_once(write_queue, engine):
+    futures = [write_queue.submit(insert_auction, id=id) for id in range(1, 11)]
+
+    assert [future.result(timeout=5) for future in futures] == list(range(1, 11))
+    assert auction_ids(engine) == list(range(1, 11))
+    stats = write_queue.stats()
+    assert stats['commits'] == 1 and stats['maxBatchSize'] == 10
+    assert stats['committed'] == 10 and stats['failed'] == 0 and stats['replays'] == 0
+
+def test_failing_operation_is_replayed_alone(write_queue, engine):
+    futures = [write_queue.submit(insert_auction, id=id, fail=id == 3) for id in range(1, 6)]
+
+    with pytest.raises(ValueError, match="Auction 3 failed"):
+        futures[2].result(timeout=5)
+    assert [futures[idx].result(timeout=5) for idx in (0, 1, 3, 4)] == [1, 2, 4, 5]
+    # The insert of the failed operation is rolled back with it
+    assert auction_ids(engine) == [1, 2, 4, 5]
+    stats = write_queue.stats()
+    assert stats['replays'] == 1 and stats['committed'] == 4 and stats['failed'] == 1
+
+def test_full_queue_rejects(session_factory):
+    write_queue = _writer.WriteQueue(session_factory=session_factory, maxsize=1, max_batch=1, submit_timeout=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def block(db):
+        started.set()
+        release.wait(5)
+
+    try:
+        running = write_queue.submit(block)
+        started.wait(5)
+        queued = write_queue.submit(insert_auction, id=1)
+
+        with pytest.raises(_writer.WriteQueueFull):
+            write_queue.submit_nowait(insert_auction, id=2)
+        with pytest.raises(_writer.WriteQueueFull):
+            write_queue.submit(insert_auction, id=3)
+        assert write_queue.stats()['rejected'] == 1
+
+        release.set()
+        running.result(timeout=5)
+        assert queued.result(timeout=5) == 1
+    finally:
+        release.set()
+        write_queue.stop()